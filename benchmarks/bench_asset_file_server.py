@@ -0,0 +1,97 @@
+"""
+Compares requests per second serving resource pack files with a FileResponse per request, vs. AssetFileServer,
+for a sprite heavy first load (cold browser cache) and a revalidating load (If-None-Match).
+
+Usage (from the project folder):
+    python -m benchmarks.bench_asset_file_server
+"""
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import FileResponse
+from starlette.routing import Route
+
+from web.asset_file_server import AssetFileServer
+
+
+class _AssetRecord:
+    def __init__(self, folder):
+        self.folder = folder
+
+    def get_file_names(self, refresh_from_disk=False):
+        return sorted(os.listdir(self.folder))
+
+    def get_file_path(self, name):
+        return os.path.join(self.folder, name)
+
+
+class _Pack:
+    def __init__(self, folder, slugs):
+        self.name = "bench"
+        self.assets = {slug: _AssetRecord(os.path.join(folder, slug)) for slug in slugs}
+
+    def get_assets(self):
+        return self.assets
+
+    def __getitem__(self, slug):
+        return self.assets[slug]
+
+    def get_modification_time(self):
+        return datetime.datetime(2023, 1, 1)
+
+
+def make_pack(folder, num_sprites=300):
+    rng = np.random.default_rng(1)
+    slugs = [f"sprite-{i:04d}" for i in range(num_sprites)]
+    for slug in slugs:
+        os.makedirs(os.path.join(folder, slug))
+        for file_name, size in [("_anim_idle.png", 20_000), ("_animation.css", 600), ("_preview.jpg", 4_000)]:
+            with open(os.path.join(folder, slug, file_name), "wb") as f:
+                f.write(rng.integers(0, 256, size, dtype=np.uint8).tobytes())
+    return _Pack(folder, slugs)
+
+
+async def requests_per_second(app, urls, headers_for_url):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        for url in urls:
+            r = await client.get(url, headers=headers_for_url(url))
+            assert r.status_code in (200, 304)
+        return len(urls) / (time.perf_counter() - started)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        pack = make_pack(folder)
+        server = AssetFileServer()
+        started = time.perf_counter()
+        server.index_pack(pack)
+        print(f"indexed {len(pack.assets)} assets in {time.perf_counter() - started:.2f}s")
+
+        async def old_endpoint(request):
+            return FileResponse(pack[request.path_params["slug"]].get_file_path(request.path_params["file"]))
+
+        async def new_endpoint(request):
+            return server.response(request, pack, request.path_params["slug"], request.path_params["file"])
+
+        urls = [f"/{slug}/{file_name}" for slug in pack.assets
+                for file_name in ["_anim_idle.png", "_animation.css", "_preview.jpg"]]
+        etags = {url: server.get_info(pack, *url.strip("/").split("/")).etag for url in urls}
+
+        for name, endpoint in [("FileResponse", old_endpoint), ("AssetFileServer", new_endpoint)]:
+            app = Starlette(routes=[Route("/{slug}/{file}", endpoint)])
+            cold = asyncio.run(requests_per_second(app, urls, lambda url: {}))
+            warm = asyncio.run(requests_per_second(app, urls, lambda url: {}))
+            revalidate = asyncio.run(requests_per_second(app, urls, lambda url: {"If-None-Match": etags[url]}))
+            print(f"{name:>16}: first load {cold:6.0f} req/s, second load {warm:6.0f} req/s, "
+                  f"revalidate {revalidate:6.0f} req/s")
+
+
+if __name__ == '__main__':
+    main()
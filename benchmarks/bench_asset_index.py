@@ -0,0 +1,61 @@
+"""
+Compares finding assets with a linear scan (fnmatch / isinstance over every asset), vs. an AssetIndex.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_asset_index [number of assets]
+"""
+import fnmatch
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from chosm.asset_index import AssetIndex
+
+
+@dataclass
+class _Asset:
+    name: str
+    file_id: int
+    type_name: str
+    tags: List[str] = field(default_factory=list)
+
+
+def time_it(fn, repeats=20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats
+
+
+def main():
+    num_assets = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    types = ["sprite", "map", "palette", "npc"]
+    assets = [_Asset(f"{['tree', 'grass', 'dragon', 'wall'][i % 4]}_{i:06d}.wal", i, types[i % len(types)],
+                     ["outdoor"] if i % 7 == 0 else []) for i in range(num_assets)]
+
+    started = time.perf_counter()
+    index = AssetIndex(assets, key_fields=dict(name=lambda a: a.name, id=lambda a: a.file_id),
+                       tag_fields=dict(type=lambda a: [a.type_name], tag=lambda a: a.tags))
+    print(f"{num_assets} assets, index built in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    cases = [
+        ("exact name", lambda: [a for a in assets if a.type_name == "sprite" and a.name == "grass_000101.wal"],
+         lambda: index.find(type="sprite", name="grass_000101.wal")),
+        ("by id", lambda: [a for a in assets if a.type_name == "map" and a.file_id == 9001],
+         lambda: index.find(type="map", id=9001)),
+        ("prefix glob", lambda: [a for a in assets if fnmatch.fnmatch(a.name, "dragon_0001*")],
+         lambda: index.find(name="dragon_0001*")),
+        ("type + tag + glob", lambda: [a for a in assets if a.type_name == "sprite" and "outdoor" in a.tags
+                                       and fnmatch.fnmatch(a.name, "*tree*")],
+         lambda: index.find(type="sprite", tag="outdoor", name="*tree*")),
+    ]
+    for name, linear, indexed in cases:
+        assert linear() == indexed(), name
+        t_linear, t_indexed = time_it(linear), time_it(indexed)
+        print(f"{name:18s} linear={t_linear * 1e6:9.1f}us, indexed={t_indexed * 1e6:9.1f}us, "
+              f"speedup={t_linear / t_indexed:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
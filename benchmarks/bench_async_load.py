@@ -0,0 +1,133 @@
+"""
+A load test, reporting the latency (p50 / p99) of fast requests (like /do_action) while other clients make slow
+requests (regenerating ground masks), with the slow work done on the event loop vs in a BoundedExecutor.
+
+The server is a small FastAPI app in the shape of web/chosm.py, driven in process (httpx, no sockets), so
+the numbers are the server's latency only.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_async_load
+"""
+import asyncio
+import io
+import os
+import time
+import warnings
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from PIL import Image
+from starlette import status
+
+from game_engine.ground_mask_atlas import ViewConfig
+from helpers.bounded_executor import BoundedExecutor, ExecutorBusyError
+
+
+def regenerate_mask(steps_fwd: int, steps_right: int) -> bytes:
+    """
+    The work of /download/ground_mask/..., see: web.chosm.draw_ground_mask
+    """
+    view_config = ViewConfig(size=(1920, 1024), view_dist=6, horizon_screen_ratio=0.5,
+                             local_tile_ratio=0.9, bird_eye_vs_worm_eye=0)
+    img = view_config.make_composer().draw_mask(steps_fwd, steps_right)
+    img2 = Image.new("LA", img.size, (255, 255))
+    img2.putalpha(img)
+    f = io.BytesIO()
+    img2.save(f, format="webp")
+    return f.getvalue()
+
+
+def make_app(executor: BoundedExecutor = None) -> FastAPI:
+    """
+    :param executor: Where the slow work is run, None to run it on the event loop.
+    """
+    app = FastAPI()
+    state = {"moves": 0}
+
+    @app.exception_handler(ExecutorBusyError)
+    async def executor_busy_handler(request: Request, e: ExecutorBusyError):
+        return PlainTextResponse("busy", status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                 headers={"Retry-After": "1"})
+
+    @app.post("/do_action", response_class=ORJSONResponse)
+    async def do_action(request: Request):
+        data = await request.json()
+        state["moves"] += 1 if data.get("action") == "move_fwd" else 0
+        return ORJSONResponse({"message": "Move received"})
+
+    @app.get("/download/ground_mask/{steps_fwd}/{steps_right}")
+    async def ground_mask(steps_fwd: int, steps_right: int):
+        if executor is None:
+            data = regenerate_mask(steps_fwd, steps_right)
+        else:
+            data = await executor.run(regenerate_mask, steps_fwd, steps_right)
+        return PlainTextResponse(str(len(data)))
+
+    return app
+
+
+async def run_load(app: FastAPI, num_players: int, num_slow_clients: int, duration: float):
+    """
+    :return: (do_action latencies in seconds, number of slow requests done, number shed with a 503)
+    """
+    transport = httpx.ASGITransport(app=app)
+    latencies, slow_done, slow_shed = [], [0], [0]
+    end_time = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def player(i: int):
+            # an open loop, each player sends a move every 50ms, and the latency is from when it was due to be
+            # sent. Otherwise a stalled event loop would just send fewer requests (coordinated omission).
+            due = time.perf_counter() + i * 0.001
+            while due < end_time:
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                r = await client.post("/do_action", json={"action": "move_fwd"})
+                latencies.append(time.perf_counter() - due)
+                assert r.status_code == 200
+                due += 0.05
+
+        async def slow_client(i: int):
+            n = 0
+            while time.perf_counter() < end_time:
+                r = await client.get(f"/download/ground_mask/{2 + (i + n) % 4}/{(n % 5) - 2}")
+                if r.status_code == 503:
+                    slow_shed[0] += 1
+                    await asyncio.sleep(0.05)
+                else:
+                    slow_done[0] += 1
+                n += 1
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*[player(i) for i in range(num_players)],
+                             *[slow_client(i) for i in range(num_slow_clients)])
+    return np.array(latencies), slow_done[0], slow_shed[0]
+
+
+def main():
+    num_players, num_slow_clients, duration = 20, 4, 5.0
+    warnings.simplefilter("ignore")  # FastAPI's ORJSONResponse deprecation, on every request
+    t = time.perf_counter()
+    regenerate_mask(3, 1)
+    print(f"One mask regeneration: {(time.perf_counter() - t) * 1000:.1f}ms, cpus: {os.cpu_count()}")
+    print(f"{num_players} players calling /do_action, {num_slow_clients} clients regenerating masks, "
+          f"for {duration:.0f}s each (latency is from when a move was due to be sent)\n")
+
+    print(f"{'slow work':>28} {'do_action':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'masks':>6} {'shed':>5}")
+    configs = [("no slow requests", None, 0),
+               ("on the event loop", None, num_slow_clients),
+               ("BoundedExecutor (threads)", BoundedExecutor("render", max_workers=2, max_pending=8), num_slow_clients),
+               ("BoundedExecutor (processes)", BoundedExecutor("render", max_workers=2, max_pending=8,
+                                                               use_processes=True), num_slow_clients)]
+    for label, executor, num_slow in configs:
+        latencies, slow_done, slow_shed = asyncio.run(run_load(make_app(executor), num_players, num_slow, duration))
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{label:>28} {len(latencies):>10} {p50:>8.2f} {p99:>8.2f} {latencies.max() * 1000:>8.2f} "
+              f"{slow_done:>6} {slow_shed:>5}")
+        if executor is not None:
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmarks CCFile.bootstrap with differing numbers of worker processes.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_bootstrap [path/to/dos/folder]
+"""
+import logging
+import os
+import sys
+import time
+
+from mam_game.cc_file import load_cc_file
+from mam_game.mam_constants import MAMVersion, Platform
+
+
+def time_bootstrap(folder, workers):
+    ver, platform = MAMVersion.DARKSIDE, Platform.PC_DOS
+    dark_cc = load_cc_file(os.path.join(folder, "DARK.CC"), ver, platform)
+    dark_cur = load_cc_file(os.path.join(folder, "DARK.CUR"), ver, platform)
+    mm5_cc = dark_cc.merge(dark_cur, to_copy=False)
+
+    started = time.perf_counter()
+    mm5_cc.bootstrap(workers=workers)
+    return time.perf_counter() - started, [r.slug for r in mm5_cc._resources]
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    folder = sys.argv[1] if len(sys.argv) > 1 else "game_files/dos"
+
+    results = {}
+    worker_counts = [1] + [n for n in [2, 4, 8, 16] if n <= os.cpu_count()]
+    for workers in worker_counts:
+        results[workers] = time_bootstrap(folder, workers)
+
+    base_time, base_slugs = results[1]
+    print()
+    for workers, (t, slugs) in results.items():
+        print(f"workers={workers}: {t:.2f}s, speedup={base_time / t:.2f}x, "
+              f"same resource order={slugs == base_slugs}")
+
+
+if __name__ == '__main__':
+    main()
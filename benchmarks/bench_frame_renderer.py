@@ -0,0 +1,74 @@
+"""
+Reports the frame time of rendering the view on the server (see: /game/frame.webp), uncached and cached.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_frame_renderer
+"""
+import random
+import time
+
+import numpy as np
+from PIL import Image
+
+from game_engine.frame_renderer import FrameRenderer
+from game_engine.map import Map, MapInstance, AssetLut
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from mam_game.mam_constants import Direction
+
+
+def make_sprite(slug: str) -> Image.Image:
+    # a noisy sprite, with a transparent border (like most env sprites)
+    rng = np.random.default_rng(len(slug))
+    rgba = rng.integers(0, 256, (96, 96, 4), dtype=np.uint8)
+    rgba[:, :, 3] = 255
+    if slug.startswith("env"):
+        rgba[:16, :, 3] = 0
+        rgba[:, :16, 3] = 0
+    return Image.fromarray(rgba, "RGBA")
+
+
+def make_map(w=128, h=128):
+    rng = np.random.default_rng(1)
+    luts = [AssetLut("ground", {0: None, 2: "gnd-grass", 7: "gnd-water"}),
+            AssetLut("env", {0: None, 1: "env-tree", 2: "env-rock", 4: "env-bush"})]
+    the_map = Map("bench", w, h, ["ground", "env"], luts)
+    the_map.set_layers({"ground": rng.choice([2, 2, 2, 7, 0], w * h), "env": rng.choice([0, 0, 1, 2, 4], w * h)})
+    return the_map
+
+
+def main():
+    svp = SingleVanishingPointPainting([], [], size=(1920, 1024), view_dist=6)
+    the_map = MapInstance(make_map())
+    random.seed(3)
+    positions = [(random.randrange(the_map.width), random.randrange(the_map.height), random.choice(list(Direction)))
+                 for _ in range(200)]
+
+    for size in [(960, 512), (1920, 1024)]:
+        renderer = FrameRenderer(svp, make_sprite, size=size, sky_slug="sky")
+
+        started = time.perf_counter()
+        renderer.render(the_map, *positions[0])
+        warm_up = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for x, y, facing in positions:
+            renderer.render(the_map, x, y, facing)
+        render_time = (time.perf_counter() - started) / len(positions)
+
+        started = time.perf_counter()
+        for x, y, facing in positions:
+            renderer.get_frame(the_map, x, y, facing)
+        encoded_time = (time.perf_counter() - started) / len(positions)
+
+        started = time.perf_counter()
+        for x, y, facing in positions:
+            renderer.get_frame(the_map, x, y, facing)
+        cached_time = (time.perf_counter() - started) / len(positions)
+
+        print(f"{size}: first frame (builds sprite/mask caches) {warm_up * 1000:.0f}ms, "
+              f"render {render_time * 1000:.1f}ms, render + webp {encoded_time * 1000:.1f}ms, "
+              f"cached {cached_time * 1e6:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Compares generating the ground masks one at a time (as the /download/ground_mask endpoint does on a cache miss),
+vs. building a single mask atlas with a process pool.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_ground_mask_atlas
+"""
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from game_engine.ground_mask_atlas import ViewConfig, build_ground_mask_atlases, get_mask_steps
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+
+
+def main():
+    config = ViewConfig(size=(1920, 1024), view_dist=6)
+    steps = get_mask_steps(config)
+    print(f"{len(steps)} masks of {config.size}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        started = time.perf_counter()
+        for steps_f, steps_r in steps:
+            svp = SingleVanishingPointPainting([], [], size=config.size, view_dist=config.view_dist)
+            img = svp.draw_mask(steps_f, steps_r)
+            img2 = Image.new("LA", img.size, (255, 255))
+            img2.putalpha(img)
+            img2.save(os.path.join(folder, f"{steps_f}_{steps_r}.webp"))
+        print(f"  one file per mask:  {time.perf_counter() - started:.2f}s, {len(steps)} http requests")
+
+        for workers in [None, 0]:
+            started = time.perf_counter()
+            atlas = build_ground_mask_atlases([config], workers=workers)[config]
+            files = atlas.save(folder)
+            print(f"  atlas, workers={str(workers):>4}: {time.perf_counter() - started:.2f}s, "
+                  f"{atlas.image.size} image of {os.path.getsize(files[0]) / 1024:.0f}KiB, 2 http requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Reports the time (and memory) of a login, ie: load_world + GameState, as the number of logins grows.
+Compares the pack's map cache, with loading (parsing map.json) every time.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_login
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from chosm.resource_pack import ResourcePack, ResourcePackInfo
+from game_engine.game_state import GameState
+from game_engine.map import Map
+
+LAYERS = ["height", "ground", "surface", "wall", "env", "building"]
+
+
+def make_pack(folder: str, num_maps: int = 4, size: int = 64) -> str:
+    ResourcePackInfo("bench-pack", "admin", True).save_info_file(folder)
+    rng = np.random.default_rng(1)
+    map_names = [f"map{i}" for i in range(num_maps)]
+    for name in map_names + ["unused"]:
+        the_map = Map(name, size, size, LAYERS, [])
+        the_map.set_layers({"ground": rng.choice([2, 2, 2, 7, 0], size * size),
+                            "env": rng.choice([0, 0, 1, 2, 4], size * size)})
+        write_asset(folder, f"map-{name}", name, "map", "map.json", the_map.asdict())
+    write_asset(folder, "world-main", "main", "world", "world_info.json",
+                dict(world_name="main", map_names=map_names, spell_names=[], default_map=map_names[0]))
+    return folder
+
+
+def write_asset(pack_folder, slug, name, type_name, file_name, d):
+    os.makedirs(os.path.join(pack_folder, slug))
+    with open(os.path.join(pack_folder, slug, "info.json"), "wt") as f:
+        json.dump(dict(id=0, name=name, type_name=type_name, created="2023-01-01T00:00:00+00:00", slug=slug), f)
+    with open(os.path.join(pack_folder, slug, file_name), "wt") as f:
+        json.dump(d, f)
+
+
+def time_logins(pack: ResourcePack, num_logins: int, cached: bool):
+    tracemalloc.start()
+    games, times = [], []
+    for _ in range(num_logins):
+        if not cached:
+            pack._map_cache.invalidate()
+        started = time.perf_counter()
+        games.append(GameState(pack.load_world("main", pin=True), pack, maps_pinned=True))
+        times.append(time.perf_counter() - started)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return times, memory
+
+
+def main():
+    num_logins = 50
+    with tempfile.TemporaryDirectory() as folder:
+        pack = ResourcePack(make_pack(folder))
+        for cached in [False, True]:
+            times, memory = time_logins(pack, num_logins, cached)
+            print(f"cached={cached}: first login={times[0] * 1000:.1f}ms, "
+                  f"mean of the last {num_logins - 1}={np.mean(times[1:]) * 1000:.2f}ms, "
+                  f"memory for {num_logins} games={memory / 1024 / 1024:.1f}MiB")
+            pack._map_cache.invalidate()
+
+
+if __name__ == '__main__':
+    main()
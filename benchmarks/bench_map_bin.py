@@ -0,0 +1,60 @@
+"""
+Compares loading a large (combined overworld sized) map from map.json vs. map.bin
+
+Usage (from the project folder):
+    python -m benchmarks.bench_map_bin
+"""
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from game_engine.map import Map, AssetLut, load_map_from_dict
+from game_engine.map_bin import save_map_bin, load_map_bin
+from helpers.misc import my_json_dumps
+
+LAYERS = ["height", "ground", "surface", "wall", "env", "building",
+          "has_grate", "no_rest", "has_drain", "has_event", "has_object"]
+
+
+def make_map(w, h):
+    rng = np.random.default_rng(1)
+    the_map = Map("overworld", w, h, LAYERS, [AssetLut("ground", {i: f"sprite-{i}" for i in range(16)})])
+    the_map.set_layers({"ground": rng.choice([2, 2, 2, 7, 0], w * h), "env": rng.choice([0, 0, 1, 2, 4], w * h),
+                        "has_event": rng.random(w * h) < 0.01})
+    return the_map
+
+
+def best_of(fn, repeats=5):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    w, h = 256, 256
+    the_map = make_map(w, h)
+    with tempfile.TemporaryDirectory() as folder:
+        json_path, bin_path = os.path.join(folder, "map.json"), os.path.join(folder, "map.bin")
+        with open(json_path, "wt") as f:
+            f.write(my_json_dumps(the_map.asdict()))
+        save_map_bin(the_map, bin_path)
+
+        def load_json():
+            with open(json_path, "rt") as f:
+                return load_map_from_dict(json.load(f))
+
+        print(f"{w}x{h} map, {len(LAYERS)} layers")
+        print(f"map.json: {os.path.getsize(json_path) / 1024:8.0f}KiB, load={best_of(load_json, 2) * 1000:8.2f}ms")
+        t_bin = best_of(lambda: load_map_bin(bin_path))
+        t_mmap = best_of(lambda: load_map_bin(bin_path, use_mmap=True))
+        print(f"map.bin:  {os.path.getsize(bin_path) / 1024:8.0f}KiB, load={t_bin * 1000:8.2f}ms, mmap={t_mmap * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Benchmarks decoding every maze in a .cur file.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_map_loader [path/to/DARK.CUR]
+"""
+import logging
+import sys
+import time
+
+from mam_game.cc_file import load_cc_file
+from mam_game.map_file_decoder import load_map_file
+from mam_game.mam_constants import MAMVersion, Platform
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    path = sys.argv[1] if len(sys.argv) > 1 else "game_files/dos/DARK.CUR"
+    ver, platform = MAMVersion.DARKSIDE, Platform.PC_DOS
+
+    cc_file = load_cc_file(path, ver, platform)
+    raw_files = cc_file.get_raw_files("maze*.dat")
+    for raw in raw_files:
+        _ = raw.data  # decrypt first, so only decoding is timed
+
+    started = time.perf_counter()
+    maps = [load_map_file(raw, None, None, ver, platform) for raw in raw_files]
+    elapsed = time.perf_counter() - started
+    print(f"decoded {len(maps)} mazes in {elapsed * 1000:.1f}ms ({elapsed * 1000 / max(len(maps), 1):.2f}ms per maze)")
+
+
+if __name__ == '__main__':
+    main()
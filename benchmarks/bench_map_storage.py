@@ -0,0 +1,75 @@
+"""
+Compares the Map (ArchetypedTable) and ColumnarMap (numpy) storage backends: memory, and read speed.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_map_storage [path/to/baked/map.json]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from game_engine.map import Map, ColumnarMap, load_map_from_dict
+
+
+def make_map_dict(w=128, h=128):
+    rng = np.random.default_rng(1)
+    layers = {
+        "height": np.zeros(w * h, dtype=int),
+        "ground": rng.choice([2, 2, 2, 7, 0], w * h),
+        "surface": rng.choice([0, 0, 0, 0, 3], w * h),
+        "wall": np.zeros(w * h, dtype=int),
+        "env": rng.choice([0, 0, 1, 2, 4], w * h),
+        "building": rng.choice([0] * 20 + [5, 17], w * h),
+    }
+    for flag in ["has_grate", "no_rest", "has_drain", "has_event", "has_object"]:
+        layers[flag] = rng.random(w * h) < 0.05
+    the_map = Map("bench", w, h, list(layers.keys()), [])
+    the_map.set_layers(layers)
+    return json.loads(json.dumps(the_map.asdict()))
+
+
+def measure(map_type, d):
+    tracemalloc.start()
+    the_map = load_map_from_dict(d, map_type)
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    w, h = the_map.size()
+    coords = [(x, y) for y in range(h) for x in range(w)]
+    started = time.perf_counter()
+    for x, y in coords:
+        _ = the_map[x, y, "ground"]
+    cell_time = (time.perf_counter() - started) / len(coords)
+
+    started = time.perf_counter()
+    for x, y in coords[:2000]:
+        if map_type is ColumnarMap:
+            _ = the_map.region(x - 5, y - 5, x + 6, y + 6, "ground")
+        else:
+            _ = [the_map[xx, yy, "ground"] for yy in range(max(y - 5, 0), min(y + 6, h))
+                 for xx in range(max(x - 5, 0), min(x + 6, w))]
+    region_time = (time.perf_counter() - started) / 2000
+
+    return the_map, mem, cell_time, region_time
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rt") as f:
+            d = json.load(f)
+    else:
+        d = make_map_dict()
+    print(f"map: {d['width']}x{d['height']}, {len(d['layer_names'])} layers")
+
+    for map_type in [Map, ColumnarMap]:
+        the_map, mem, cell_time, region_time = measure(map_type, d)
+        print(f"{map_type.__name__:>12}: memory={mem / 1024:8.1f}KiB, "
+              f"cell read={cell_time * 1e6:.2f}us, 11x11 region read={region_time * 1e6:.1f}us")
+    print(f"ColumnarMap memory report: {the_map.memory_report()}")
+
+
+if __name__ == '__main__':
+    main()
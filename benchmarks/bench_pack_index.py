@@ -0,0 +1,63 @@
+"""
+Compares loading a resource pack by scanning every asset folder (a cold start), vs. loading it from the
+pack index (a warm start).
+
+Usage (from the project folder):
+    python -m benchmarks.bench_pack_index [number of assets]
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from chosm.resource_pack import ResourcePack, ResourcePackInfo, PACK_INDEX_FOLDER
+
+
+def make_pack(folder: str, num_assets: int) -> str:
+    pack_folder = os.path.join(folder, "bench-pack")
+    os.makedirs(pack_folder)
+    ResourcePackInfo("bench-pack", "admin", True).save_info_file(pack_folder)
+    animations = [dict(slug=slug, frame_idx_list=list(range(8)), ms_per_frame=[100] * 8)
+                  for slug in ["idle", "walk", "attack"]]
+    for i in range(num_assets):
+        slug = f"sprite-thing-{i:05d}"
+        os.makedirs(os.path.join(pack_folder, slug))
+        info = dict(id=i, name=f"thing-{i:05d}", type_name="sprite", created="2023-01-01T00:00:00+00:00",
+                    slug=slug, width=64, height=64, animations=animations)
+        with open(os.path.join(pack_folder, slug, "info.json"), "wt") as f:
+            json.dump(info, f, indent=2)
+    return pack_folder
+
+
+def time_load(pack_folder: str, cold: bool, repeats: int = 5) -> float:
+    times = []
+    for _ in range(repeats):
+        if cold:
+            shutil.rmtree(os.path.join(pack_folder, PACK_INDEX_FOLDER), ignore_errors=True)
+        started = time.perf_counter()
+        ResourcePack(pack_folder)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    num_assets = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as folder:
+        pack_folder = make_pack(folder, num_assets)
+        cold = time_load(pack_folder, cold=True)
+        ResourcePack(pack_folder)  # write the index
+        warm = time_load(pack_folder, cold=False)
+        index_size = os.path.getsize(os.path.join(pack_folder, PACK_INDEX_FOLDER, "pack_index.bin"))
+
+    print(f"{num_assets} assets, index size={index_size / 1024:.0f}KiB")
+    print(f"cold (scan):  {cold * 1000:.1f}ms")
+    print(f"warm (index): {warm * 1000:.1f}ms, speedup={cold / warm:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
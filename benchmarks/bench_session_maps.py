@@ -0,0 +1,60 @@
+"""
+Reports the memory used per session, by the MapInstance overlays of a shared map.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_session_maps
+"""
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from game_engine.map import Map, ColumnarMap, MapInstance
+
+
+LAYERS = ["height", "ground", "surface", "wall", "env", "building",
+          "has_grate", "no_rest", "has_drain", "has_event", "has_object"]
+
+
+def make_map(map_type, w=256, h=256):
+    rng = np.random.default_rng(1)
+    the_map = map_type("overworld", w, h, LAYERS, [])
+    the_map.set_layers({"ground": rng.choice([2, 2, 2, 7, 0], w * h), "env": rng.choice([0, 0, 1, 2, 4], w * h)})
+    return the_map
+
+
+def bytes_per_session(base_map, num_sessions, num_changes):
+    random.seed(2)
+    tracemalloc.start()
+    sessions = []
+    for _ in range(num_sessions):
+        instance = MapInstance(base_map)
+        for _ in range(num_changes):
+            x, y = random.randrange(base_map.width), random.randrange(base_map.height)
+            instance[x, y] = {"building": 3, "has_event": True}
+        sessions.append(instance)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / num_sessions, sessions
+
+
+def main():
+    for map_type in [Map, ColumnarMap]:
+        base_map = make_map(map_type)
+        for num_changes in [0, 10, 1000]:
+            per_session, sessions = bytes_per_session(base_map, 100, num_changes)
+
+            # reads fall through to the base map
+            instance = sessions[0]
+            started = time.perf_counter()
+            for x in range(256):
+                _ = instance[x, 7, "ground"]
+            read_time = (time.perf_counter() - started) / 256
+
+            print(f"{map_type.__name__:>12} 256x256, {num_changes:5} changes: "
+                  f"{per_session / 1024:8.1f}KiB per session, cell read={read_time * 1e6:.2f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Reports the cost of login (create_session), lookup (get_active_session) and tick, as the number of sessions
+grows to 100k, for the original scanning SessionManager vs the sharded SessionStore.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_sessions
+"""
+import os
+import time
+
+from game_engine.session import Session, SessionStore
+
+
+class _GameState:
+    def release(self):
+        pass
+
+
+def load_game(user_name):
+    return _GameState()
+
+
+class ScanningSessions:
+    """
+    The original SessionManager: every login counts the open sessions, and finds the user's sessions, with a scan.
+    """
+    def __init__(self, max_sessions: int, time_out_in_minutes: float = 60):
+        self._sessions = {}
+        self.max_sessions = max_sessions
+        self.time_out_in_minutes = time_out_in_minutes
+
+    def add(self, session: Session):
+        self._sessions[session.session_id] = session
+
+    def create_session(self, user_name, load_game) -> str:
+        active_sessions = sum(1 for s in self._sessions.values() if s.is_open())
+        if active_sessions > self.max_sessions:
+            raise ValueError("Server full, try again later.")
+        user_sessions = [s for k, s in self._sessions.items() if s.user_name == user_name]
+        user_open_sessions = [s for s in user_sessions if s.is_open()]
+        if len(user_open_sessions) > 0:
+            return user_open_sessions[0].session_id
+        session_id = os.urandom(32).hex()
+        s = Session(user_name, session_id, load_game(user_name))
+        self._sessions[s.session_id] = s
+        return s.session_id
+
+    def get_active_session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.ping()
+            if session.is_open():
+                return session
+        return None
+
+    def tick(self):
+        for s in [s for s in self._sessions.values() if s.last_ping_in_minutes() > self.time_out_in_minutes]:
+            s.close()
+
+
+def fill(store, num_sessions: int):
+    for i in range(num_sessions):
+        store.add(Session(f"user{i}", os.urandom(32).hex(), _GameState()))
+
+
+def time_per_call(fn, n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main():
+    print(f"{'sessions':>10} {'store':>10} {'login us':>10} {'lookup us':>10} {'tick ms':>10}")
+    for num_sessions in [1_000, 10_000, 100_000]:
+        for label, store in [("scanning", ScanningSessions(max_sessions=num_sessions + 10_000)),
+                             ("sharded", SessionStore(max_sessions=num_sessions + 10_000))]:
+            fill(store, num_sessions)
+            session_ids = [s.session_id for s in (store.sessions() if isinstance(store, SessionStore)
+                                                  else store._sessions.values())]
+            num_logins = 20 if label == "scanning" else 2000
+            login_us = time_per_call(lambda i: store.create_session(f"new_user{i}", load_game), num_logins)
+            lookup_us = time_per_call(lambda i: store.get_active_session(session_ids[i % len(session_ids)]), 10_000)
+            started = time.perf_counter()
+            store.tick()
+            tick_ms = (time.perf_counter() - started) * 1000
+            print(f"{num_sessions:>10} {label:>10} {login_us:>10.2f} {lookup_us:>10.2f} {tick_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
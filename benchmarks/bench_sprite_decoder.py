@@ -0,0 +1,62 @@
+"""
+Benchmarks the sprite decoder, against the original (reference) decoder.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_sprite_decoder [path/to/DARK.CC]
+"""
+import logging
+import sys
+import time
+
+import numpy as np
+
+from mam_game.cc_file import load_cc_file
+from mam_game.mam_constants import MAMVersion, Platform, MAMFileParseError
+from mam_game.pal_file_decoder import get_default_pal
+from mam_game.sprite_file_decoder import load_sprite_file, load_sprite_file_reference
+
+
+def time_decoder(decoder, raw_files, pal, ver, platform):
+    sprites = {}
+    started = time.perf_counter()
+    for raw in raw_files:
+        try:
+            sprites[raw.file_name] = decoder(raw, pal, ver, platform)
+        except MAMFileParseError as e:
+            sprites[raw.file_name] = None
+            logging.warning(str(e))
+    return sprites, time.perf_counter() - started
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    path = sys.argv[1] if len(sys.argv) > 1 else "game_files/dos/DARK.CC"
+    ver, platform = MAMVersion.DARKSIDE, Platform.PC_DOS
+
+    cc_file = load_cc_file(path, ver, platform)
+    pal = get_default_pal(ver, platform)
+
+    for ext in ["mon", "att", "wal", "srf"]:
+        raw_files = cc_file.get_raw_files(f"*.{ext}")
+        ref_sprites, ref_time = time_decoder(load_sprite_file_reference, raw_files, pal, ver, platform)
+        new_sprites, new_time = time_decoder(load_sprite_file, raw_files, pal, ver, platform)
+
+        # check the output is pixel identical
+        mismatched = []
+        for name, ref in ref_sprites.items():
+            new = new_sprites[name]
+            if ref is None or new is None:
+                if ref is not new:
+                    mismatched.append(name)
+            elif not all(np.array_equal(np.array(a), np.array(b)) for a, b in zip(ref.frames, new.frames)):
+                mismatched.append(name)
+
+        print(f".{ext}: files={len(raw_files)}, "
+              f"reference={ref_time:.2f}s, numpy={new_time:.2f}s, speedup={ref_time / max(new_time, 1e-9):.1f}x, "
+              f"mismatched={len(mismatched)}")
+        for name in mismatched:
+            print(f"  - output differs: {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmarks the compiled record readers against the value at a time stream helpers,
+using the record formats of the cc file TOC, maps and the monster database.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_stream_helpers
+"""
+import io
+import random
+import time
+
+import helpers.stream_helpers as sh
+from mam_game.map_file_decoder import _map_meta_data_format
+from mam_game.npc_db_decoder import _monster_record_format
+
+
+def time_it(fn, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats
+
+
+def main():
+    random.seed(1)
+    toc_format = [("file_id", "uint16"), ("offset", "uint24"), ("length", "uint16"), ("padding", "byte")]
+    map_format = [("wall_data", "uint16[256]"), ("cell_flags", "byte[256]")]
+
+    cases = [
+        # name, record format, n, the original (value at a time) reader
+        ("toc (1000 files)", toc_format, 1000,
+         lambda f: sh.read_dict(f, toc_format, n=1000)),
+        ("map tiles", map_format, 1,
+         lambda f: (sh.read_uint16_array(f, 256), sh.read_byte_array(f, 256))),
+        ("map meta data", _map_meta_data_format, 1,
+         lambda f: (sh.read_uint16(f), sh.read_uint16_array(f, 4), sh.read_uint16(f), sh.read_uint16(f),
+                    sh.read_byte_array(f, 16), sh.read_byte_array(f, 16), sh.read_byte(f))),
+        ("monsters (150)", _monster_record_format, 150,
+         lambda f: [(sh.read_string(f, size=16),
+                     sh.read_list(f, "uint32,uint16,byte,byte,byte,byte"),
+                     sh.read_list(f, "uint16,byte,byte,byte,byte,byte,byte"),
+                     sh.read_byte_array(f, 7),
+                     sh.read_list(f, "byte,uint16,byte,byte,byte,byte,byte,byte,byte"),
+                     sh.read_string(f, size=8), sh.read_byte(f)) for _ in range(150)]),
+    ]
+
+    for name, record_format, n, original in cases:
+        data = random.randbytes(sh.compile_record_format(record_format).size * n)
+        before = time_it(lambda: original(io.BytesIO(data)), 50)
+        after = time_it(lambda: sh.read_record_tuples(io.BytesIO(data), record_format, n), 50)
+        print(f"{name:>18}: before={before * 1e6:9.1f}us, after={after * 1e6:9.1f}us, "
+              f"speedup={before / after:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
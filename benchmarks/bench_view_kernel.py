@@ -0,0 +1,83 @@
+"""
+Reports the frames per second (per core) of building the first person render lists, for the tile at a time
+loop vs. the precomputed view kernel.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_view_kernel
+"""
+import random
+import time
+
+import numpy as np
+
+from game_engine.map import Map, ColumnarMap, MapInstance, AssetLut
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.view_kernel import build_render_lists, lut_to_array, get_view_kernel
+from mam_game.mam_constants import Direction
+
+
+def make_map(w=128, h=128):
+    rng = np.random.default_rng(1)
+    luts = [AssetLut("ground", {0: None, 2: "grass", 7: "water"}),
+            AssetLut("env", {0: None, 1: "tree", 2: "rock", 4: "bush"})]
+    the_map = Map("bench", w, h, ["ground", "env"], luts)
+    the_map.set_layers({"ground": rng.choice([2, 2, 2, 7, 0], w * h), "env": rng.choice([0, 0, 1, 2, 4], w * h)})
+    return the_map
+
+
+def render_by_tile(the_map, x, y, facing, svp, map_lut):
+    # as per the original game_view(...) loop
+    ground_render_list, env_render_list = [], []
+    for step_f in reversed(range(svp.view_dist)):
+        fov = svp.fov_table[step_f]
+        for step_r in range(-fov, fov + 1):
+            tx, ty = facing.right().walk_from(*facing.walk_from(x, y, step_f), step_r)
+            if not (0 <= tx < the_map.width and 0 <= ty < the_map.height):
+                continue
+            tile = the_map[tx, ty]
+            gnd_class = map_lut["ground"][tile["ground"]]
+            if gnd_class is not None:
+                ground_render_list.append((step_f, step_r, gnd_class))
+            env_class = map_lut["env"][tile["env"]]
+            if env_class is not None:
+                b, a, c, d = svp.get_tile_polygon(step_f, step_r)
+                env_render_list.append((max(a[1], b[1], c[1], d[1]) / svp.height, min(a[0], b[0]) / svp.width,
+                                        svp.get_sprite_scale(step_f) * 1.3, env_class))
+    return ground_render_list, env_render_list
+
+
+def fps(render, positions):
+    started = time.perf_counter()
+    for x, y, facing in positions:
+        render(x, y, facing)
+    return len(positions) / (time.perf_counter() - started)
+
+
+def main():
+    started = time.perf_counter()
+    svp = SingleVanishingPointPainting([], [], size=(1920, 1024), view_dist=6)
+    for facing in Direction:
+        get_view_kernel(svp, facing)
+    print(f"svp + view kernels built in {time.perf_counter() - started:.2f}s, "
+          f"{len(get_view_kernel(svp, Direction.NORTH))} tiles per frame")
+
+    base = make_map()
+    random.seed(3)
+    positions = [(random.randrange(base.width), random.randrange(base.height), random.choice(list(Direction)))
+                 for _ in range(2000)]
+
+    for name, the_map in [("Map", base), ("ColumnarMap", ColumnarMap("bench", 128, 128, base.layer_names, base.luts)),
+                          ("MapInstance", MapInstance(base))]:
+        if isinstance(the_map, ColumnarMap):
+            the_map.set_layers(base.get_layers())
+        map_lut = {lut.name: dict(lut.items()) for lut in the_map.luts}
+        css_luts = {lut.name: lut_to_array(lut, lambda slug: slug) for lut in the_map.luts}
+
+        old_fps = fps(lambda x, y, f: render_by_tile(the_map, x, y, f, svp, map_lut), positions)
+        new_fps = fps(lambda x, y, f: build_render_lists(the_map, x, y, f, svp, css_luts), positions)
+        print(f"{name:>12}: tile loop {old_fps:8.0f} fps/core ({1000 / old_fps:.3f}ms), "
+              f"view kernel {new_fps:8.0f} fps/core ({1000 / new_fps:.3f}ms)")
+
+
+if __name__ == '__main__':
+    main()
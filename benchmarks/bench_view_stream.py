@@ -0,0 +1,96 @@
+"""
+Reports the server cost (time and bytes) of a move, as a whole page reload (world_view.html) vs a view diff
+sent over the game channel (/game/ws, see ViewStream).
+
+The page time is just rendering the template, it doesn't count the extra requests a reload makes (css bundle,
+ground mask atlas), so the real difference is larger.
+
+Usage (from the project folder):
+    python -m benchmarks.bench_view_stream
+"""
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import jinja2
+import numpy as np
+
+from game_engine.ground_mask_atlas import mask_class_name
+from game_engine.map import Map, AssetLut
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.view_kernel import build_view_slots, get_css_class_luts, get_view_kernel
+from game_engine.view_stream import ViewStream
+from mam_game.mam_constants import Direction
+
+
+class _Pack:
+    name = "bench-pack"
+
+    def __getitem__(self, slug):
+        return SimpleNamespace(idle_animation={"class": f"sprite-{slug}-idle-animation"})
+
+
+def make_map(w=128, h=128):
+    rng = np.random.default_rng(1)
+    luts = [AssetLut("ground", {0: None, 2: "ground-grass", 7: "ground-water", 9: "ground-dirt"}),
+            AssetLut("env", {0: None, 1: "env-tree", 2: "env-rock", 4: "env-bush"})]
+    the_map = Map("bench", w, h, ["ground", "env"], luts)
+    # patches of ground, so a move changes some (not all) tiles
+    ground = np.repeat(np.repeat(rng.choice([2, 2, 7, 9], (w // 4, h // 4)), 4, axis=0), 4, axis=1)
+    the_map.set_layers({"ground": ground.flatten(), "env": rng.choice([0, 0, 0, 1, 2, 4], w * h)})
+    return the_map
+
+
+def random_walk(num_moves, w, h):
+    rng = random.Random(1)
+    x, y, facing = w // 2, h // 2, Direction.NORTH
+    moves = []
+    for _ in range(num_moves):
+        match rng.choice(["fwd", "fwd", "fwd", "left", "right"]):
+            case "fwd":
+                x, y = facing.walk_from(x, y)
+                x, y = min(max(x, 0), w - 1), min(max(y, 0), h - 1)
+            case "left":
+                facing = facing.left()
+            case "right":
+                facing = facing.right()
+        moves.append((x, y, facing))
+    return moves
+
+
+def main():
+    svp = SingleVanishingPointPainting([], [], size=(1920, 1024), view_dist=6)
+    the_map, pack = make_map(), _Pack()
+    moves = random_walk(2000, the_map.width, the_map.height)
+    template = jinja2.Environment(loader=jinja2.FileSystemLoader("web/templates")).get_template("world_view.html")
+
+    def render_page(x, y, facing):
+        map_lut = get_css_class_luts(pack, the_map)
+        kernel = get_view_kernel(svp, facing)
+        ground_slots, env_slots = build_view_slots(the_map, x, y, facing, svp, map_lut)
+        return template.render(url_for=lambda name, **kwargs: f"/{name}/" + "/".join(map(str, kwargs.values())),
+                               pack=pack, pack_name=pack.name, session=True,
+                               game_state=SimpleNamespace(party=SimpleNamespace(pos_x=x, pos_y=y, facing=facing)),
+                               current_map=the_map, ground_mask_css="mask.css", server_render=False,
+                               mask_class_name=mask_class_name,
+                               ground_slots=[item + (c,) for item, c in zip(kernel.ground_items, ground_slots)],
+                               env_slots=[item + (c,) for item, c in zip(kernel.env_items, env_slots)])
+
+    stream = ViewStream(svp)
+
+    def send_diff(x, y, facing):
+        return json.dumps(stream.update(pack, the_map, x, y, facing), separators=(",", ":"))
+
+    print(f"{len(moves)} moves, {len(get_view_kernel(svp, Direction.NORTH))} view slots\n")
+    print(f"{'per move':>22} {'ms':>8} {'bytes':>8}")
+    for label, render in [("page reload", render_page), ("game channel diff", send_diff)]:
+        render(*moves[0])  # warm up (template compile, the first full view)
+        started = time.perf_counter()
+        num_bytes = sum(len(render(*move).encode("utf-8")) for move in moves)
+        elapsed = time.perf_counter() - started
+        print(f"{label:>22} {elapsed / len(moves) * 1000:>8.3f} {num_bytes / len(moves):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
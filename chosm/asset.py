@@ -41,6 +41,9 @@ class Asset(object):
         self.created_timestamp = datetime.datetime.now().astimezone().replace(microsecond=0).isoformat()
         self.tags: List[str] = []
 
+        # identifies the source data (and decoder) this asset was created from, used to skip unchanged assets on bake.
+        self.source_hash: str = None
+
     def change_name(self, name: str):
         assert (isinstance(name, str))
         self.name: str = name
@@ -63,6 +66,8 @@ class Asset(object):
         d = {"id": self.file_id, "name": self.name, "type_name": self.get_type_name(),
              "slug": self.slug, "created": self.created_timestamp,
              "tags": self.tags}
+        if self.source_hash is not None:
+            d["source_hash"] = self.source_hash
         return d
 
     def _gen_preview_image(self, preview_size) -> Image.Image:
@@ -0,0 +1,110 @@
+import collections
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+
+
+@dataclass
+class _Entry:
+    version: Hashable
+    future: Future  # done once loaded, so concurrent gets can wait on the same load
+    pins: int = 0
+
+
+class AssetCache:
+    """
+    A bounded LRU of things loaded from assets (eg: maps), by key (eg: the asset slug).
+
+    Notes:
+      - Pinned entries (eg: maps used by active sessions) are not evicted, and don't count towards max_size.
+      - Loading is single-flight, concurrent gets of the same key wait for one load.
+      - Each entry has a version (eg: the file's mtime), an entry is reloaded if the version changes.
+    """
+    def __init__(self, max_size: int = 16):
+        """
+        :param max_size: The max number of unpinned entries.
+        """
+        self.max_size = max_size
+        self._entries: collections.OrderedDict[Hashable, _Entry] = collections.OrderedDict()
+        self._lock = Lock()
+        self.num_loads = 0
+
+    def get(self, key: Hashable, version: Hashable, load: Callable[[], Any], pin: bool = False) -> Any:
+        """
+        Gets a cached value, or loads it.
+        :param version: If this differs from the cached version, the value is reloaded.
+        :param load: () -> value
+        :param pin: Also pin the entry (it needs an unpin), as part of the lookup so it can't be evicted first.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and \
+                    not (entry.future.done() and entry.future.exception() is not None):
+                self._entries.move_to_end(key)
+                loader = False
+            else:
+                # pins belong to the key, so they carry over to the new version
+                entry = _Entry(version, Future(), entry.pins if entry is not None else 0)
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                loader = True
+            if pin:
+                entry.pins += 1
+            if loader:
+                self._evict()
+
+        if loader:
+            try:
+                entry.future.set_result(load())
+                self.num_loads += 1
+            except BaseException as e:
+                logging.error(f"Error loading: key={key}, error='{e}'")
+                entry.future.set_exception(e)
+        try:
+            return entry.future.result()
+        except BaseException:
+            if pin:
+                self.unpin(key)  # nothing was loaded, so nothing is pinned
+            raise
+
+    def pin(self, key: Hashable) -> bool:
+        """
+        Stops an entry from being evicted (counted, so each pin needs an unpin).
+        :return: False if the entry isn't cached (so wasn't pinned), see: get(..., pin=True)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries[key].pins += 1
+                return True
+            return False
+
+    def unpin(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.pins > 0:
+                entry.pins -= 1
+                self._evict()
+
+    def invalidate(self, key: Hashable = None):
+        """
+        :param key: The key to drop, or None for everything. Pinned entries are kept, but reloaded on the next get.
+        """
+        with self._lock:
+            for k in [k for k in self._entries if key is None or k == key]:
+                if self._entries[k].pins > 0:
+                    self._entries[k].version = None
+                else:
+                    del self._entries[k]
+
+    def _evict(self):
+        unpinned = [k for k, e in self._entries.items() if e.pins == 0]
+        for k in unpinned[:max(0, len(unpinned) - self.max_size)]:
+            del self._entries[k]
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,162 @@
+import fnmatch
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class AssetQueryError(Exception):
+    pass
+
+
+@lru_cache(maxsize=1024)
+def compile_glob(pattern: str) -> Tuple[str, Optional[re.Pattern]]:
+    """
+    Splits a glob into its literal prefix, and a compiled regex of the whole glob.
+    eg: "tree*.wal" -> ("tree", re.compile(...)), "tree.wal" -> ("tree.wal", None)
+    :return: (literal prefix, regex) with the regex None if the glob has no wildcards.
+    """
+    m = re.search(r"[*?\[]", pattern)
+    if m is None:
+        return pattern, None
+    return pattern[:m.start()], re.compile(fnmatch.translate(pattern))
+
+
+def parse_query(text: str) -> Dict[str, str]:
+    """
+    eg: "type=sprite tag=outdoor name=*tree*" -> {"type": "sprite", "tag": "outdoor", "name": "*tree*"}
+        "tag=tile,outdoor" -> {"tag": ["tile", "outdoor"]}, ie: tagged with both.
+    """
+    terms = {}
+    for term in text.split():
+        field, sep, value = term.partition("=")
+        if sep == "" or len(field) == 0:
+            raise AssetQueryError(f"Expected field=value, got: '{term}'")
+        value = value.strip()
+        terms[field.strip().lower()] = value.split(",") if "," in value else value
+    return terms
+
+
+class AssetIndex:
+    """
+    Indexes assets (or asset records) by name, type and tags, so queries don't scan every asset.
+
+    There are two kinds of field:
+      - key fields (eg: name, slug), which are matched with a glob. Literal globs are a dict lookup,
+        and globs with a literal prefix (eg: "dragon*") only test the names in the prefix's range of a sorted array.
+      - tag fields (eg: type, tag, role), each item can have many values, held in an inverted index.
+
+    Results are in the order the items were added to the index.
+
+    By example:
+        index.find(type="sprite", tag="outdoor", name="*tree*")
+        index.query("type=sprite tag=outdoor name=*tree*")
+    """
+    def __init__(self, items: Iterable[Any],
+                 key_fields: Dict[str, Callable[[Any], Any]],
+                 tag_fields: Dict[str, Callable[[Any], Iterable[Any]]]):
+        """
+        :param key_fields: {field: item -> value}, a value of None is not indexed.
+        :param tag_fields: {field: item -> values}
+        """
+        self._key_fields = key_fields
+        self._tag_fields = tag_fields
+
+        self._items: List[Any] = []
+        self._sorted_keys: Dict[str, List[Tuple[str, int]]] = {f: [] for f in key_fields}  # [(key, item_idx), ...]
+        self._exact_keys: Dict[str, Dict[Any, List[int]]] = {f: {} for f in key_fields}
+        self._tags: Dict[str, Dict[Any, Set[int]]] = {f: {} for f in tag_fields}
+
+        self.extend(items)
+
+    def extend(self, items: Iterable[Any]):
+        """
+        Adds items to the index, eg: assets created since it was built.
+        """
+        for item in items:
+            idx = len(self._items)
+            self._items.append(item)
+            for field, get_key in self._key_fields.items():
+                key = get_key(item)
+                if key is None:
+                    continue
+                self._exact_keys[field].setdefault(key, []).append(idx)
+                if isinstance(key, str):
+                    self._sorted_keys[field].append((key, idx))
+            for field, get_tags in self._tag_fields.items():
+                for tag in get_tags(item):
+                    self._tags[field].setdefault(tag, set()).add(idx)
+
+        # the existing keys are a sorted run, so (with timsort) this is about O(n + new log new)
+        for keys in self._sorted_keys.values():
+            keys.sort()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _match_key(self, field: str, value: Any) -> List[int]:
+        if not isinstance(value, str):
+            return self._exact_keys[field].get(value, [])
+
+        prefix, regex = compile_glob(value)
+        if regex is None:
+            return self._exact_keys[field].get(value, [])
+
+        keys = self._sorted_keys[field]
+        matches = []
+        for i in range(bisect_left(keys, (prefix,)), len(keys)):
+            key, idx = keys[i]
+            if not key.startswith(prefix):
+                break
+            if regex.match(key):
+                matches.append(idx)
+        return matches
+
+    def find_indices(self, **terms) -> List[int]:
+        """
+        The positions (in the order added) of the items matching every term.
+        A tag field can be given a list of values, to match items with all of them.
+        """
+        matches: List[Set[int]] = []
+        unanchored_globs = []  # globs without a literal prefix, eg: "*tree*"
+        for field, value in terms.items():
+            if value is None:
+                continue
+            if field in self._tag_fields:
+                for tag in (value if isinstance(value, (list, tuple, set)) else [value]):
+                    matches.append(self._tags[field].get(tag, set()))
+            elif field in self._key_fields:
+                prefix, regex = compile_glob(value) if isinstance(value, str) else (None, None)
+                if prefix == "" and regex is not None:
+                    unanchored_globs.append((field, regex))
+                else:
+                    matches.append(set(self._match_key(field, value)))
+            else:
+                raise AssetQueryError(f"Unknown field: {field}, expected one of: "
+                                      f"{', '.join(list(self._key_fields) + list(self._tag_fields))}")
+
+        if len(matches) == 0:
+            result = range(len(self._items))
+        else:
+            matches.sort(key=len)
+            result = set(matches[0])
+            for m in matches[1:]:
+                result.intersection_update(m)
+
+        # an unanchored glob has to test every key, so just test the keys of the other terms' matches.
+        for field, regex in unanchored_globs:
+            get_key = self._key_fields[field]
+            result = [i for i in result if isinstance(key := get_key(self._items[i]), str) and regex.match(key)]
+        return sorted(result)
+
+    def find(self, **terms) -> List[Any]:
+        """
+        eg: index.find(type="sprite", name="*tree*")
+        """
+        return [self._items[i] for i in self.find_indices(**terms)]
+
+    def query(self, text: str) -> List[Any]:
+        """
+        eg: index.query("type=sprite tag=outdoor name=*tree*")
+        """
+        return self.find(**parse_query(text))
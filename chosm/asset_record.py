@@ -5,10 +5,11 @@ import logging
 import os
 from os.path import join
 from threading import Lock
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from chosm.asset import Asset
 from chosm.game_constants import AssetTypes, parse_asset_type
 from game_engine.map import load_map_from_dict, Map
+from game_engine.map_bin import load_map_bin
 from helpers.why import Why
 
 import weakref
@@ -39,8 +40,12 @@ def _is_hidden_file(folder: str, file_name: str):
 
 
 class AssetRecord(collections.abc.Mapping):
-    def __init__(self, asset_path: str):
-        if not os.path.isdir(asset_path):
+    def __init__(self, asset_path: str, cached: Tuple[Dict[str, Any], float, float] = None):
+        """
+        :param cached: (info, mtime_info, mtime_folder), eg: from a resource pack's index. The record is created
+                       without reading info.json; a later refresh() re-reads it if the mtimes have changed.
+        """
+        if cached is None and not os.path.isdir(asset_path):
             raise NotADirectoryError(asset_path)
 
         # bootstrap from info.json
@@ -69,7 +74,17 @@ class AssetRecord(collections.abc.Mapping):
 
         self._refresh_lock = Lock()
 
-        self.refresh()
+        if cached is not None:
+            self._set_info(*cached)
+        else:
+            self.refresh()
+
+    def has_changed(self) -> bool:
+        """
+        True if info.json or the asset folder were modified since the record was read.
+        """
+        return os.path.getmtime(join(self.folder, "info.json")) != self._mtime_info or \
+            os.path.getmtime(self.folder) != self._mtime_folder
 
     def refresh(self, forced=False):
         """
@@ -83,31 +98,39 @@ class AssetRecord(collections.abc.Mapping):
             mtime_folder = os.path.getmtime(self.folder)
 
             if forced or mtime_info != self._mtime_info or mtime_folder != self._mtime_folder:
-                self.info: Dict[str, Any] = self._read_info_file()
-                self.file_id: int = self.info["id"]
-                self.name: str = self.info["name"]
-                self.asset_type: str = parse_asset_type(self.info["type_name"])
-                self.asset_type_as_string = str(self.asset_type)
-                self.created_timestamp: str = self.info["created"]
-                self.slug: str = self.info["slug"]
+                self._set_info(self._read_info_file(), mtime_info, mtime_folder)
+                return True
 
-                self._file_names: List[str] = None
-                self._file_paths: List[str] = None
+            return False
 
-                self._mtime_info = mtime_info
-                self._mtime_folder = mtime_folder
+    def _set_info(self, info: Dict[str, Any], mtime_info: float, mtime_folder: float):
+        self.info: Dict[str, Any] = info
+        self.file_id: int = self.info["id"]
+        self.name: str = self.info["name"]
+        self.asset_type: str = parse_asset_type(self.info["type_name"])
+        self.asset_type_as_string = str(self.asset_type)
+        self.created_timestamp: str = self.info["created"]
+        self.slug: str = self.info["slug"]
 
-                if "animations" in self.info:
-                    self.animations = {}
-                    for anim_info in self.info["animations"]:
-                        self.animations[anim_info["slug"]] = anim_info
+        self._file_names: List[str] = None
+        self._file_paths: List[str] = None
 
-                    if "idle" in self.animations:
-                        self.idle_animation = self.animations["idle"]
+        self._mtime_info = mtime_info
+        self._mtime_folder = mtime_folder
 
-                return True
+        if "animations" in self.info:
+            self.animations = {}
+            for anim_info in self.info["animations"]:
+                self.animations[anim_info["slug"]] = anim_info
 
-            return False
+            if "idle" in self.animations:
+                self.idle_animation = self.animations["idle"]
+
+    def get_index_entry(self) -> Tuple[Dict[str, Any], float, float]:
+        """
+        What a resource pack's index stores for this record, see: AssetRecord(..., cached=...)
+        """
+        return self.info, self._mtime_info, self._mtime_folder
 
     def _refresh_file_list(self, force=False):
         if self._file_names is None or force:
@@ -223,6 +246,25 @@ class AssetRecord(collections.abc.Mapping):
     def load_asset(self) -> Asset:
         return NotImplemented
 
+    def get_map_file_name(self) -> str:
+        """
+        The file a map is loaded from, map.bin if it was baked (see: MapAsset.bake), else map.json
+        """
+        return "map.bin" if os.path.isfile(join(self.folder, "map.bin")) else "map.json"
+
+    def read_map(self, new_name: str = None) -> Map:
+        """
+        Loads a map from map.bin, or map.json (without any caching, see: ResourcePack.load_map)
+        """
+        logging.info("loading map: asset = " + self.slug)
+        if self.get_map_file_name() == "map.bin":
+            the_map = load_map_bin(join(self.folder, "map.bin"))
+        else:
+            the_map = load_map_from_dict(self.load_json_file("map.json"))
+        if new_name is not None:
+            the_map.name = str(new_name)
+        return the_map
+
     def load_map(self, new_name: str = None) -> Map:
         """
         Loads a map, or returns a cached copy.
@@ -238,11 +280,7 @@ class AssetRecord(collections.abc.Mapping):
                 return the_map
 
         # no existing copy of the map
-        logging.info("loading map: asset = " + self.slug)
-        d = self.load_json_file("map.json")
-        the_map = load_map_from_dict(d)
-        if new_name is not None:
-            the_map.name = str(new_name)
+        the_map = self.read_map(new_name)
         self._the_map_ref = weakref.ref(the_map)
 
         return the_map
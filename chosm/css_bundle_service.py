@@ -0,0 +1,141 @@
+import datetime
+import gzip
+import logging
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple, List
+
+import xxhash
+
+from chosm.game_constants import AssetTypes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def patch_css(css: str, sprite_css_path: str) -> str:
+    """
+    Resolves the relative url('...') imports of a sprite's css file, so it can be bundled with others.
+    :param sprite_css_path: The url path of the folder the css file is served from.
+    """
+    old_tokens = ["url('", 'url("']
+    new_tokens = [f"url('{sprite_css_path}/", f'url("{sprite_css_path}/']
+    for old_token, new_token in zip(old_tokens, new_tokens):
+        css = css.replace(old_token, new_token)
+    return css
+
+
+@dataclass(frozen=True)
+class CssBundle:
+    """
+    A bundle of css, pre-compressed for serving.
+    """
+    css: bytes
+    gzip: bytes
+    brotli: Optional[bytes]
+    etag: str  # a strong etag of the uncompressed css, eg: '"8a6d42c3f8e1b4a2"', see: web.asset_file_server.encoding_etag
+
+    @staticmethod
+    def from_css(css: str) -> 'CssBundle':
+        data = css.encode("utf-8")
+        return CssBundle(css=data,
+                         gzip=gzip.compress(data, compresslevel=9, mtime=0),
+                         brotli=brotli.compress(data, mode=brotli.MODE_TEXT) if brotli is not None else None,
+                         etag=f'"{xxhash.xxh64(data).hexdigest()}"')
+
+    def get_encoded(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """
+        The smallest encoding the client accepts.
+        :param accept_encoding: The Accept-Encoding header.
+        :return: (data, content encoding), the encoding is None for uncompressed css.
+        """
+        accepted = [q.split(";")[0].strip() for q in (accept_encoding or "").split(",")]
+        if self.brotli is not None and "br" in accepted:
+            return self.brotli, "br"
+        if "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.css, None
+
+
+class CssBundleService:
+    """
+    Keeps in memory bundles of the css of a resource pack's sprites (one css file per sprite, as the
+    animation is done in css); for the whole pack, and for each map (just the sprites in the map's luts).
+
+    Notes:
+      - A map baked with an atlas (see: MapAsset.bake) is bundled from its _atlas.css, so the browser loads a few
+        atlas textures rather than every sprite's sprite sheet.
+      - Each sprite's css file is read once per build.
+      - Bundles are rebuilt if the pack's modification time changes, so serving a bundle does not touch the disk.
+    """
+    def __init__(self, get_sprite_css_path: Callable[[str, str], str]):
+        """
+        :param get_sprite_css_path: (pack_name, asset_slug) -> the url path of the folder an asset's (eg: a sprite's)
+                                    css is served from.
+        """
+        self.get_sprite_css_path = get_sprite_css_path
+        # {pack_name: (pack modification time, {map_name or None: bundle})}
+        self._bundles: Dict[str, Tuple[datetime.datetime, Dict[Optional[str], CssBundle]]] = {}
+        self._sprite_css: Dict[str, Dict[str, str]] = {}  # {pack_name: {slug: patched css}}
+        self._lock = Lock()
+
+    def _load_sprite_css(self, pack) -> Dict[str, str]:
+        sprite_css = {}
+        for sprite in pack.get_assets_by_type(AssetTypes.SPRITE).values():
+            with open(sprite.get_file_path('_animation.css'), "rt") as f:
+                sprite_css[sprite.slug] = patch_css(f.read(), self.get_sprite_css_path(pack.name, sprite.slug))
+        return sprite_css
+
+    def _make_bundle(self, pack, map_name: Optional[str]) -> CssBundle:
+        sprite_css = self._sprite_css[pack.name]
+        if map_name is None:
+            slugs = list(sprite_css.keys())
+        else:
+            map_rec = pack[AssetTypes.MAP, map_name]
+            if "_atlas.css" in map_rec.get_file_names():
+                with open(map_rec.get_file_path("_atlas.css"), "rt") as f:
+                    return CssBundle.from_css(patch_css(f.read(), self.get_sprite_css_path(pack.name, map_rec.slug)))
+            slugs = [s.slug for s in pack.get_sprites_for_map(map_name)]
+        return CssBundle.from_css("\n".join(sprite_css[slug] for slug in slugs if slug in sprite_css))
+
+    def build(self, pack, map_names: List[str] = None):
+        """
+        (Re)builds the whole pack bundle, and the bundles of its maps.
+        :param map_names: The maps to bundle, None for every map in the pack.
+        """
+        if map_names is None:
+            map_names = [ma.name for ma in pack.get_assets_by_type(AssetTypes.MAP).values()]
+        print(f"Building css bundles: pack={pack.name}, {len(map_names)} maps")
+        with self._lock:
+            modification_time = pack.get_modification_time()
+            self._sprite_css[pack.name] = self._load_sprite_css(pack)
+            bundles = {None: self._make_bundle(pack, None)}
+            for map_name in map_names:
+                bundles[map_name] = self._make_bundle(pack, map_name)
+            self._bundles[pack.name] = (modification_time, bundles)
+
+    def invalidate(self, pack_name: str):
+        """
+        The pack's bundles are rebuilt when next requested, eg: because a sprite changed (see: PackWatcher).
+        """
+        with self._lock:
+            if pack_name in self._bundles:
+                self._bundles[pack_name] = (None, self._bundles[pack_name][1])
+
+    def get_bundle(self, pack, map_name: str = None) -> CssBundle:
+        """
+        Gets a bundle, building it if the pack changed or the map was not bundled yet.
+        :param map_name: None for the whole pack. Can be a map name, or its slug.
+        """
+        modification_time, bundles = self._bundles.get(pack.name, (None, {}))
+        if modification_time != pack.get_modification_time():
+            logging.info(f"css bundles out of date, rebuilding: pack={pack.name}")
+            self.build(pack, [k for k in bundles.keys() if k is not None] or None)
+            modification_time, bundles = self._bundles[pack.name]
+
+        if map_name not in bundles:
+            with self._lock:
+                bundles[map_name] = self._make_bundle(pack, map_name)
+        return bundles[map_name]
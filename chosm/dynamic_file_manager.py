@@ -55,9 +55,14 @@ class DynamicFileManager:
     Some files are procedurally generated, and need to be refreshed if the code base changes.
 
     This class manages a store of such files, in hierarchy on the filesystem.
+
+    Notes:
+      - With shared_state (a SharedStateDB), the worker processes of a server share which files were regenerated,
+        so a worker doesn't keep using its cached (expired) metadata for a file another worker has since rebuilt.
     """
-    def __init__(self, base_dir: str, expiration_time_stamp=None):
+    def __init__(self, base_dir: str, expiration_time_stamp=None, shared_state=None):
         self.base_dir = str(pathlib.Path(base_dir).absolute())
+        self.shared_state = shared_state
         # eg: path, m_time = file_map[("ground_tiles", "blured", "foo.png")]
         self.cached_file_info: Dict[Tuple, Tuple[str, int]] = {}
 
@@ -118,7 +123,13 @@ class DynamicFileManager:
             path, m_time = self.cached_file_info[parts]
             m_time = int(m_time)
             valid = m_time > expiration_time
-            # TODO: if this is not valid, we may want to drop the cached info and see if it was updated.
+            if not valid and self.shared_state is not None:
+                # another worker may have regenerated it
+                shared_m_time = self.shared_state.get_file_m_time("/".join(parts))
+                if shared_m_time is not None and int(shared_m_time) > m_time:
+                    m_time = int(os.stat(dest_file).st_mtime)
+                    self.cached_file_info[parts] = (dest_file, m_time)
+                    valid = m_time > expiration_time
             # print("m_time > expiration_time", m_time, expiration_time, m_time > expiration_time)
             return path, valid
 
@@ -138,6 +149,11 @@ class DynamicFileManager:
         parts = tuple(parts)
         if parts in self.cached_file_info:
             del self.cached_file_info[parts]
+        if self.shared_state is not None:
+            # tell the other workers the file was regenerated
+            dest_file = join(self.base_dir, *parts)
+            if os.path.isfile(dest_file):
+                self.shared_state.set_file_m_time("/".join(parts), os.stat(dest_file).st_mtime)
 
 
 def main():
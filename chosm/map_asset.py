@@ -1,6 +1,7 @@
 import itertools
 import json
 import logging
+import os
 from os.path import join
 from typing import Dict, Any
 
@@ -10,6 +11,8 @@ from chosm.asset import Asset
 from chosm.game_constants import AssetTypes
 from chosm.sprite_asset import SpriteAsset
 from game_engine.map import Map, load_map_from_dict, AssetLut
+from game_engine.map_bin import save_map_bin
+from helpers.atlas_packer import pack_images
 from helpers.misc import my_json_dumps
 
 
@@ -89,6 +92,47 @@ class MapAsset(Asset):
             f.write(my_json_dumps(d))
             # json.dump(d, f, indent=2)
 
+        # the same map, in a form that loads quickly (see: AssetRecord.read_map)
+        try:
+            save_map_bin(self.game_map, join(file_path, "map.bin"))
+        except ValueError as e:
+            logging.warning(f"map.bin not written, map.json will be used: map={self.name}, error='{e}'")
+            if os.path.exists(join(file_path, "map.bin")):
+                os.remove(join(file_path, "map.bin"))
+
+        self._bake_atlas(file_path)
+
+    def _bake_atlas(self, file_path):
+        """
+        Packs the frames of every sprite used by the map's luts into a few atlas textures (_atlas_XX.png), and
+        writes _atlas.css (the sprites animation classes, pointing into the atlas) and _atlas.json (the index).
+        So the browser can load a whole scene in a handful of requests, see: CssBundleService
+        """
+        sprites = {q.slug: q for lut in self.luts_by_name.values() for q in lut.values() if q is not None}
+        sprites = [sprites[k] for k in sorted(sprites.keys())]
+        frame_lists = [sorted(set(itertools.chain(*[a.frame_idx_list for a in sprite.animations.values()])))
+                       for sprite in sprites]
+
+        atlases, positions = pack_images([[sprite.frames[i] for i in frame_idx_list]
+                                          for sprite, frame_idx_list in zip(sprites, frame_lists)])
+        atlas_urls = [f"_atlas_{i:02d}.png" for i in range(len(atlases))]
+        for atlas, url in zip(atlases, atlas_urls):
+            atlas.save(join(file_path, url))
+
+        css = ""
+        index = {"atlases": [{"file": url, "size": list(atlas.size)} for url, atlas in zip(atlas_urls, atlases)],
+                 "sprites": {}}
+        for sprite, frame_idx_list, sprite_positions in zip(sprites, frame_lists, positions):
+            frame_rects = dict(zip(frame_idx_list, sprite_positions))
+            css += sprite._gen_atlas_css(frame_rects, [a.size for a in atlases], atlas_urls)
+            index["sprites"][sprite.slug] = {"size": list(sprite.size),
+                                             "frames": {i: list(rect) for i, rect in frame_rects.items()}}
+
+        with open(join(file_path, "_atlas.css"), "wt") as f:
+            f.write(css)
+        with open(join(file_path, "_atlas.json"), "wt") as f:
+            json.dump(index, f)
+
 
 # def load_map_from_baked_folder(folder: str):
 #     logging.info("loading MapAsset: path = " + folder)
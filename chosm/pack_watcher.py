@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, List
+
+from chosm.resource_pack import ResourcePack, PackChange
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+
+class PackWatcher:
+    """
+    Watches resource pack folders, and keeps the packs up-to-date as assets are added, changed or removed.
+
+    Notes:
+      - With watchfiles (inotify on linux) only the changed assets are re-read, so a change costs O(changes)
+        rather than the O(assets) stats of ResourcePack.refresh(...)
+      - Without watchfiles (or with force_polling), packs are polled with ResourcePack.refresh(...)
+      - Subscribers get a PackChange per changed asset, to invalidate caches (eg: css bundles) that depend on it.
+        They are called from the watcher thread.
+    """
+    def __init__(self, packs: Dict[str, ResourcePack], force_polling: bool = False,
+                 poll_interval: float = 2.0, debounce_ms: int = 200):
+        """
+        :param packs: {pack_name: ResourcePack}, as per web/chosm.py
+        :param poll_interval: Seconds between polls, if polling.
+        :param debounce_ms: File events within this time are handled as one batch.
+        """
+        self.packs = packs
+        self.force_polling = force_polling or watchfiles is None
+        self.poll_interval = poll_interval
+        self.debounce_ms = debounce_ms
+
+        self._subscribers: List[Callable[[PackChange], None]] = []
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread = None
+
+    def subscribe(self, callback: Callable[[PackChange], None]):
+        self._subscribers.append(callback)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="PackWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        if self.force_polling:
+            while not self._stop_event.wait(self.poll_interval):
+                self.poll()
+            return
+
+        folders = [os.path.abspath(pack._base_uri) for pack in self.packs.values()]
+        for file_changes in watchfiles.watch(*folders, debounce=self.debounce_ms, stop_event=self._stop_event,
+                                             raise_interrupt=False):
+            try:
+                self.handle_paths([path for _, path in file_changes])
+            except Exception as e:
+                # keep watching, an asset may be part way through being written
+                logging.exception(f"Error handling file changes: error='{e}'")
+
+    def poll(self) -> List[PackChange]:
+        """
+        Checks every pack for changes (the polling fallback).
+        """
+        changes = []
+        for pack in list(self.packs.values()):
+            try:
+                changes += pack.refresh(False, self.packs)
+            except OSError as e:
+                logging.error(f"Could not refresh pack: pack={pack.name}, error='{e}'")
+        self._publish(changes)
+        return changes
+
+    def handle_paths(self, paths: Iterable[str]) -> List[PackChange]:
+        """
+        Updates the packs, given the paths of files (or folders) that changed.
+        """
+        folders_by_pack: Dict[str, set] = {}
+        info_changed = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            for pack_name, pack in self.packs.items():
+                rel_path = os.path.relpath(path, os.path.abspath(pack._base_uri))
+                if rel_path == os.curdir or rel_path.startswith(os.pardir):
+                    continue
+                parts = rel_path.split(os.sep)
+                if len(parts) == 1 and parts[0] == "info.json":
+                    info_changed.add(pack_name)
+                elif not parts[0].startswith("."):
+                    # a file in an asset, or the asset folder itself
+                    folders_by_pack.setdefault(pack_name, set()).add(parts[0])
+                break
+
+        changes = []
+        for pack_name in info_changed:
+            self.packs[pack_name].reload_info()
+        for pack_name, folder_names in folders_by_pack.items():
+            changes += self.packs[pack_name].apply_asset_changes(folder_names)
+        self._publish(changes)
+        return changes
+
+    def _publish(self, changes: List[PackChange]):
+        for change in changes:
+            logging.info(f"Asset changed: {change}")
+            for callback in self._subscribers:
+                callback(change)
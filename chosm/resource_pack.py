@@ -6,18 +6,48 @@ from dataclasses import dataclass
 from itertools import chain
 from os.path import join
 import json
-import fnmatch
+import pickle
+from enum import Enum
 from functools import lru_cache
-from typing import Dict, Any, List, Type, Union, Literal
+from threading import Lock
+from typing import Dict, Any, List, Type, Union, Literal, Optional, Iterable, Tuple
 
 from slugify import slugify
 
+from chosm.asset_cache import AssetCache
+from chosm.asset_index import AssetIndex
 from chosm.asset_record import AssetRecord
 from chosm.game_constants import AssetTypes, parse_asset_type
 from game_engine.map import Map, load_map_from_dict
 from game_engine.world import World
 from helpers.misc import popo_to_dict, popo_from_dict
 
+# The pack index caches the asset records of a pack, so a pack can be loaded with a single read.
+# It is in a hidden folder, so (re)writing it does not change the pack folder's mtime.
+PACK_INDEX_FOLDER = ".index"
+PACK_INDEX_VERSION = 1
+
+# The number of (unpinned) maps a pack keeps loaded, see: ResourcePack.load_map
+MAP_CACHE_SIZE = 16
+
+
+class AssetChange(Enum):
+    ADDED = 0
+    MODIFIED = 1
+    REMOVED = 2
+
+
+@dataclass(frozen=True)
+class PackChange:
+    """
+    An asset that was added / modified / removed from a resource pack, see: ResourcePack.apply_asset_changes(...)
+    """
+    pack_name: str
+    change: AssetChange
+    slug: str
+    asset_type: AssetTypes
+    name: str
+
 
 class ResourcePackError(Exception):
     def __init__(self, pack_name, error_msg, **kwargs):
@@ -91,6 +121,9 @@ class ResourcePack(ResourcePackInfo):
       resource_pack["sprite-ice-dragon-027"]
       resource_pack[AssetTypes.SPRITE, "ice-dragon-027"]
 
+    The asset records are cached in a pack index (see: PACK_INDEX_FOLDER), which is used if the mtimes of the pack
+    folder and info.json have not changed. Changes inside an asset folder are picked up by AssetRecord.refresh().
+
     TODO: override and include are just stubs for now.
     Resource Packs can interact with each other in two ways:
       - override: A slug not present in this pack will map to the slug in the pack being overriden.
@@ -105,6 +138,11 @@ class ResourcePack(ResourcePackInfo):
         # resource management
         self._asset_record_lut: Dict[str: AssetRecord] = {}  # look up table by slug
         self._asset_records_by_type: Dict[AssetTypes, Dict[str, AssetRecord]] = {}
+        self._asset_index: Tuple[Dict[str, AssetRecord], AssetIndex] = (None, None)  # (the lut indexed, index)
+
+        # loaded maps / worlds
+        self._map_cache = AssetCache(max_size=MAP_CACHE_SIZE)  # {slug: Map}
+        self._world_info_cache = AssetCache(max_size=8)  # {slug: world_info.json}
 
         # inclusions
         self.overrides: List[str]  # archetypes, which act as part of this pack, with this packs names taking priority.
@@ -116,6 +154,8 @@ class ResourcePack(ResourcePackInfo):
         # know when to refresh
         self._mtime_info = 0
         self._mtime_folder = 0
+        self._update_lock = Lock()
+        self._invalid_folders: Dict[str, float] = {}  # {folder name: mtime}, see find_changed_assets()
 
         # load
         self._reload_info_and_assets()
@@ -124,56 +164,190 @@ class ResourcePack(ResourcePackInfo):
         self._overrides: List[ResourcePack] = [other_resource_packs[p] for p in self.overrides]
         self._includes:  List[ResourcePack] = [other_resource_packs[p] for p in self.includes]
 
-    def _reload_info_and_assets(self):
+    def _get_index_path(self) -> str:
+        return join(self._base_uri, PACK_INDEX_FOLDER, "pack_index.bin")
+
+    def _reload_info_and_assets(self, use_index: bool = True):
+        """
+        :param use_index: Load the asset records from the pack index, if it is up-to-date.
+        """
         if not os.path.exists(self._base_uri):
             logging.info("Asset Pack reload: error='could not find path'")
             raise ResourcePackError(None, "base_uri not found")
+
+        # create the index folder before reading the folder mtime, or creating it would invalidate the index.
+        try:
+            os.makedirs(join(self._base_uri, PACK_INDEX_FOLDER), exist_ok=True)
+        except OSError:
+            pass  # eg: a read only file system, the pack will be scanned every time.
         self._mtime_folder = os.path.getmtime(self._base_uri)
 
         self.load_info_file(self._base_uri)
         self._mtime_info = os.path.getmtime(join(self._base_uri, "info.json"))
 
-        dirs = [f.path for f in os.scandir(self._base_uri) if f.is_dir()]
-        self._asset_record_lut = {}
-
-        for folder in dirs:
-            info_file = join(folder, "info.json")
-            if not os.path.isfile(info_file):
-                logging.error("Asset missing info file at: "+ info_file)
-                continue
-
-            r = AssetRecord(folder)
-            valid = r.is_valid()
-            if not valid:
-                logging.error("Asset not valid: " + valid.why)
-                continue
-
-            self._asset_record_lut[r.slug] = r
+        records = self._load_index() if use_index else None
+        if records is None:
+            records = self._scan_assets()
+            self._save_index(records)
 
+        self._asset_record_lut = {r.slug: r for r in records}
         self._asset_records_by_type = {t: {q.name: q for q in self._asset_record_lut.values() if q.asset_type == t}
                                        for t in AssetTypes}
 
-    def refresh(self, forced: bool, other_resource_packs: Dict[str, Any]):
-        mtime_info = os.path.getmtime(join(self._base_uri, "info.json"))
-        mtime_folder = os.path.getmtime(self._base_uri)
+    def _scan_assets(self) -> List[AssetRecord]:
+        dirs = [f.path for f in os.scandir(self._base_uri) if f.is_dir() and not f.name.startswith(".")]
+        records = [self._load_asset_record(folder) for folder in dirs]
+        return [r for r in records if r is not None]
 
-        if forced or mtime_info != self._mtime_info or mtime_folder != self._mtime_folder:
-            self._reload_info_and_assets()
-            self.link_dependencies(other_resource_packs)
+    @staticmethod
+    def _load_asset_record(folder: str) -> Optional[AssetRecord]:
+        """
+        :return: None if the folder is not a valid asset (the reason is logged).
+        """
+        info_file = join(folder, "info.json")
+        if not os.path.isfile(info_file):
+            logging.error("Asset missing info file at: "+ info_file)
+            return None
+
+        try:
+            r = AssetRecord(folder)
+        except (OSError, ValueError, KeyError) as e:
+            # eg: the asset is being written
+            logging.error(f"Could not read asset: path={folder}, error='{e}'")
+            return None
+
+        valid = r.is_valid()
+        if not valid:
+            logging.error("Asset not valid: " + valid.why)
+            return None
+        return r
+
+    def find_changed_assets(self) -> List[str]:
+        """
+        Polls the pack folder for assets that were added, removed or changed.
+        This stats every asset, see PackWatcher for a way to avoid that.
+        :return: The folder names of the changed assets.
+        """
+        folder_names = {f.name for f in os.scandir(self._base_uri) if f.is_dir() and not f.name.startswith(".")}
+        changed = folder_names.symmetric_difference(self._asset_record_lut.keys())
+        for slug in folder_names.intersection(self._asset_record_lut.keys()):
+            try:
+                if self._asset_record_lut[slug].has_changed():
+                    changed.add(slug)
+            except OSError:
+                changed.add(slug)
+        # don't keep re-reading folders that are not valid assets, until they change.
+        for folder_name in changed.intersection(self._invalid_folders.keys()):
+            if os.path.getmtime(join(self._base_uri, folder_name)) == self._invalid_folders[folder_name]:
+                changed.remove(folder_name)
+        return sorted(changed)
+
+    def apply_asset_changes(self, folder_names: Iterable[str]) -> List[PackChange]:
+        """
+        Re-reads just the given asset folders, and updates the pack's records.
+        The lookup tables are replaced (not mutated), so readers never see them part way through an update.
+        :param folder_names: Asset folders (in this pack) that were added, removed or changed.
+        :return: What changed.
+        """
+        changes = []
+        with self._update_lock:
+            lut = dict(self._asset_record_lut)
+            by_type = dict(self._asset_records_by_type)
+            for folder_name in sorted(set(folder_names)):
+                if folder_name.startswith("."):
+                    continue
+                folder = join(self._base_uri, folder_name)
+                old = lut.pop(folder_name, None)
+                new = self._load_asset_record(folder) if os.path.isdir(folder) else None
+                self._invalid_folders.pop(folder_name, None)
+                if new is None and os.path.isdir(folder):
+                    self._invalid_folders[folder_name] = os.path.getmtime(folder)
+
+                if old is not None:
+                    by_type[old.asset_type] = {k: v for k, v in by_type[old.asset_type].items() if v is not old}
+                if new is not None:
+                    lut[new.slug] = new
+                    by_type[new.asset_type] = dict(by_type[new.asset_type])
+                    by_type[new.asset_type][new.name] = new
+
+                if old is None and new is None:
+                    continue
+                change_type = AssetChange.ADDED if old is None else \
+                    AssetChange.REMOVED if new is None else AssetChange.MODIFIED
+                rec = new if new is not None else old
+                changes.append(PackChange(self.name, change_type, rec.slug, rec.asset_type, rec.name))
+
+            if len(changes) > 0:
+                self._asset_record_lut, self._asset_records_by_type = lut, by_type
+                self._mtime_folder = os.path.getmtime(self._base_uri)
+                self._save_index(list(lut.values()))
+        return changes
+
+    def reload_info(self) -> bool:
+        """
+        Re-reads the pack's info.json, if it changed.
+        :return: True if it changed.
+        """
+        mtime_info = os.path.getmtime(join(self._base_uri, "info.json"))
+        if mtime_info == self._mtime_info:
+            return False
+        with self._update_lock:
+            self.load_info_file(self._base_uri)
             self._mtime_info = mtime_info
-            self._mtime_folder = mtime_folder
-        else:
-            # This will cause all assets to natural refresh if a file changed.
-            for name, asset in self._asset_record_lut.items():
-                asset.refresh()
+            self._save_index(list(self._asset_record_lut.values()))
+        return True
 
-            # TODO: what is the criterion for a natural refresh.
-            # TODO: new / missing folders
-            # TODO, asset may have changed names (and now be in the wrong folder)
-            # if not valid:
-            #     logging.error("Asset not valid: " + valid.why)
-            #     continue
+    def _load_index(self) -> Optional[List[AssetRecord]]:
+        """
+        Loads the asset records from the pack index.
+        :return: None if there is no index, or it is out of date.
+        """
+        try:
+            with open(self._get_index_path(), "rb") as f:
+                version, mtime_folder, mtime_info, entries = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Could not read pack index: pack={self._base_uri}, error='{e}'")
+            return None
+
+        if version != PACK_INDEX_VERSION or mtime_folder != self._mtime_folder or mtime_info != self._mtime_info:
+            return None
+
+        try:
+            return [AssetRecord(join(self._base_uri, folder_name), cached=cached) for folder_name, *cached in entries]
+        except (OSError, KeyError, ValueError) as e:
+            # eg: an asset folder was deleted, in a way that did not change the folder's mtime.
+            logging.error(f"Pack index was invalid: pack={self._base_uri}, error='{e}'")
+            return None
+
+    def _save_index(self, records: List[AssetRecord]):
+        """
+        Writes the pack index, atomically (so a concurrent reader sees the old or the new index, never part of one).
+        """
+        entries = [(os.path.basename(r.folder),) + r.get_index_entry() for r in records]
+        path = self._get_index_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((PACK_INDEX_VERSION, self._mtime_folder, self._mtime_info, entries),
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Could not write pack index: pack={self._base_uri}, error='{e}'")
+
+    def refresh(self, forced: bool, other_resource_packs: Dict[str, Any]) -> List[PackChange]:
+        """
+        Polls for changes (see PackWatcher, which avoids polling).
+        :param forced: Reload everything, ignoring the pack index.
+        :return: The asset changes, empty if the pack was reloaded.
+        """
+        if forced or os.path.getmtime(join(self._base_uri, "info.json")) != self._mtime_info:
+            self._reload_info_and_assets(use_index=not forced)
+            self.link_dependencies(other_resource_packs)
+            return []
 
+        return self.apply_asset_changes(self.find_changed_assets())
 
     def get_asset_by_slug(self, slug: str) -> AssetRecord:
         return self._asset_record_lut[slug]
@@ -190,27 +364,50 @@ class ResourcePack(ResourcePackInfo):
             rm.get_assets_by_type(Sprite, "*dragon*")
         """
         if glob_exp is not None:
-            rec_by_type = self._asset_records_by_type[asset_type]
-            return {k: v for k, v in rec_by_type.items() if fnmatch.fnmatch(k, glob_exp)}
+            return {r.name: r for r in self.get_index().find(type=str(asset_type), name=glob_exp)}
         else:
             return self._asset_records_by_type[asset_type]
 
     def get_assets(self, glob_exp: str = None) -> Dict[str, AssetRecord]:
         """
         Gets assets in the resource pack.
-        :param glob_exp:
+        :param glob_exp: A glob of the slug, eg: "sprite-*dragon*"
         :return: { slug: AssetRecord, ... }
         """
         if glob_exp is None:
             return self._asset_record_lut
         else:
-            return {k: v for k, v in self._asset_record_lut.items() if fnmatch.fnmatch(k, glob_exp)}
+            return {r.slug: r for r in self.get_index().find(slug=glob_exp)}
+
+    def query(self, text: str) -> Dict[str, AssetRecord]:
+        """
+        Finds assets by type, name, slug, tag, role and env tag.
+        eg: pack.query("type=sprite tag=outdoor name=*tree*")
+        :return: { slug: AssetRecord, ... }
+        """
+        return {r.slug: r for r in self.get_index().query(text)}
+
+    def get_index(self) -> AssetIndex:
+        """
+        An index of the asset records, (re)built when the records change.
+        """
+        lut, index = self._asset_index
+        if lut is not self._asset_record_lut:
+            lut = self._asset_record_lut
+            index = AssetIndex(lut.values(),
+                               key_fields=dict(name=lambda r: r.name, slug=lambda r: r.slug),
+                               tag_fields=dict(type=lambda r: [str(r.asset_type)],
+                                               tag=lambda r: r.info.get("tags", []),
+                                               role=lambda r: r.info.get("roles", []),
+                                               env=lambda r: r.info.get("env_tags", [])))
+            self._asset_index = (lut, index)
+        return index
 
     def get_sprites(self) -> Dict[str, AssetRecord]:
         return self.get_assets_by_type(AssetTypes.SPRITE)
 
     def get_sprites_for_map(self, map_name) -> List[AssetRecord]:
-        the_map: Map = self[AssetTypes.MAP, map_name].load_map()
+        the_map: Map = self.load_map(map_name)
         sprite_slugs = set(chain(*[lut.values() for lut in the_map.luts]))
         return [s for s in self.get_sprites().values() if s.slug in sprite_slugs]
 
@@ -311,29 +508,62 @@ class ResourcePack(ResourcePackInfo):
     def get_worlds(self):
         return self.get_assets_by_type(AssetTypes.WORLD)
 
-    def load_world(self, world_name):
+    @staticmethod
+    def _get_file_version(asset_rec: AssetRecord, file_name: str) -> Tuple[str, int, int]:
+        st = os.stat(join(asset_rec.folder, file_name))
+        return file_name, st.st_mtime_ns, st.st_size
+
+    def load_map(self, map_name: str, pin: bool = False) -> Map:
+        """
+        Loads a map, or returns the cached copy (shared by every session, see: MapInstance).
+        The map is reloaded if its map file changes.
+        :param pin: Also pin the map, see: pin_maps(...)
+        """
+        map_ar = self[AssetTypes.MAP, map_name]
+        return self._map_cache.get(map_ar.slug, self._get_file_version(map_ar, map_ar.get_map_file_name()),
+                                   lambda: map_ar.read_map(new_name=map_ar.name), pin=pin)
+
+    def pin_maps(self, map_names: Iterable[str]) -> List[str]:
+        """
+        Keeps maps in the cache, eg: while a session is using them. Each pin needs an unpin_maps.
+        Prefer load_world(..., pin=True), a map evicted since it was loaded can't be pinned.
+        :return: The maps pinned.
+        """
+        return [map_name for map_name in map_names if self._map_cache.pin(self[AssetTypes.MAP, map_name].slug)]
+
+    def unpin_maps(self, map_names: Iterable[str]):
+        for map_name in map_names:
+            try:
+                self._map_cache.unpin(self[AssetTypes.MAP, map_name].slug)
+            except KeyError:
+                pass  # the asset was removed
+
+    def load_world(self, world_name, pin: bool = False) -> World:
         """
         Loading a world is done here, because it draws together multiple assets.
+        Only the maps of the world are loaded, and they are shared with other loads of the world (see: load_map).
         :param world_name:
+        :param pin: Also pin the world's maps, eg: for a GameState(..., maps_pinned=True)
         :return:
         """
-        logging.info("loading map: name = " + world_name)
         world_ar = self[AssetTypes.WORLD, world_name]
-
-        world_info = world_ar.load_json_file("world_info.json")
+        world_info = self._world_info_cache.get(world_ar.slug, self._get_file_version(world_ar, "world_info.json"),
+                                                lambda: world_ar.load_json_file("world_info.json"))
         name = world_info["world_name"]
         map_ids = world_info["map_names"]
         spell_names = world_info["spell_names"]  # ignore for now
         default_map = world_info["default_map"]
-        print(f"found {len(map_ids)} world maps: world=" + name + ", maps=" + ", ".join(map_ids))
-
-        all_maps_by_id = [ma.load_map(new_name=ma.name) for ma in self.get_assets_by_type(AssetTypes.MAP).values()]
-        all_maps_by_id = {m.name: m for m in all_maps_by_id}
-        maps = [all_maps_by_id[q] for q in map_ids]
-
-        world = World(name, maps, [], default_map=default_map)
 
-        return world
+        maps = []
+        try:
+            for map_id in map_ids:
+                maps.append(self.load_map(map_id, pin=pin))
+        except BaseException:
+            if pin:
+                # no game will own these pins
+                self.unpin_maps(map_ids[:len(maps)])
+            raise
+        return World(name, maps, [], default_map=default_map)
 
 
 def create_new_pack(base_folder: str, pack_name):
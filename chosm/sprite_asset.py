@@ -281,6 +281,56 @@ class SpriteAsset(Asset):
 
         return css
 
+    def _gen_atlas_css(self, frame_rects: Dict[int, Tuple[int, int, int]], atlas_sizes: List[Tuple[int, int]],
+                       atlas_urls: List[str]) -> str:
+        """
+        Like _gen_css, but the frames are in atlas textures (shared with other sprites), see: MapAsset.bake
+        Positions are in percent, so (as with the sprite sheets) a frame fills the element it is drawn on.
+        :param frame_rects: {frame_idx: (atlas_idx, x, y)}, for (at least) the frames used by the animations.
+        """
+        def percent(pos, frame_size, atlas_size):
+            return 0 if atlas_size == frame_size else 100 * pos / (atlas_size - frame_size)
+
+        def background_position(frame_idx):
+            atlas_idx, x, y = frame_rects[frame_idx]
+            atlas_w, atlas_h = atlas_sizes[atlas_idx]
+            return f"{percent(x, self.width, atlas_w):.4f}% {percent(y, self.height, atlas_h):.4f}%"
+
+        css = ""
+        for a in self.animations.values():
+            atlas_idx = frame_rects[a.frame_idx_list[0]][0]
+            atlas_w, atlas_h = atlas_sizes[atlas_idx]
+            # "div." so these rules take precedence over a page's "background-size: 100% 100%"
+            cls_txt = f"""
+                div.anim_{self.slug}_{a.slug} {{
+                    background-image: url('{atlas_urls[atlas_idx]}');
+                    background-repeat: no-repeat;
+                    background-size: {100 * atlas_w / self.width:.4f}% {100 * atlas_h / self.height:.4f}%;
+                    background-position: {background_position(a.frame_idx_list[0])};
+                """
+            if len(a.frame_idx_list) > 1:
+                loop_token = "infinite" if a.loop else "1"
+                n = len(a.frame_idx_list)
+                keyframes = [f"{100 * i / n:.4f}% {{ background-position: {background_position(f)}; }}"
+                             for i, f in enumerate(a.frame_idx_list)]
+                keyframes.append(f"100% {{ background-position: {background_position(a.frame_idx_list[-1])}; }}")
+                keyframes = "\n".join(" " * 20 + k for k in keyframes)
+                cls_txt += f"""    animation-name: play_{self.slug}_{a.slug};
+                    animation-duration: {a.get_seconds_per_loop()}s;
+                    animation-timing-function: step-end;
+                    animation-iteration-count: {loop_token};
+                }}
+
+                @keyframes play_{self.slug}_{a.slug} {{
+{keyframes}
+                }}
+                """
+            else:
+                cls_txt += """}
+                """
+            css += textwrap.dedent(cls_txt)
+        return css
+
     def bake(self, file_path):
         super().bake(file_path)
 
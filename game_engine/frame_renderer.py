@@ -0,0 +1,184 @@
+import io
+from typing import Callable, Tuple, Dict, Optional
+
+import numpy as np
+from boltons.cacheutils import LRU
+from PIL import Image
+
+from game_engine.map import MapABC, MapInstance
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.view_kernel import build_render_lists, lut_to_array
+from mam_game.mam_constants import Direction
+
+# (x, y, premultiplied rgb, 1 - alpha), the arrays are float32 in the range 0..1, and cropped to the
+# visible part of the sprite, which is at (x, y) relative to the sprite's top left.
+SpriteBuffer = Tuple[int, int, np.ndarray, np.ndarray]
+
+
+def load_idle_frame(asset_rec) -> Image.Image:
+    """
+    The first frame of a (baked) sprite's idle animation.
+    :param asset_rec: An AssetRecord of a sprite.
+    """
+    frame_idx = asset_rec.idle_animation["frame_idx_list"][0]
+    return Image.open(asset_rec.get_file_path(f"frame_{frame_idx:02d}.png"))
+
+
+def _to_buffer(img: Image.Image, mask: np.ndarray = None) -> SpriteBuffer:
+    rgba = np.asarray(img.convert("RGBA"), dtype=np.float32) / 255
+    alpha = rgba[:, :, 3:]
+    if mask is not None:
+        alpha = alpha * mask
+
+    # transparent borders are cropped, as there is nothing to blend.
+    rows, cols = np.flatnonzero(alpha.any(axis=(1, 2))), np.flatnonzero(alpha.any(axis=(0, 2)))
+    if len(rows) == 0:
+        return 0, 0, rgba[:0, :0, :3], alpha[:0, :0]
+    region = np.s_[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    alpha = alpha[region]
+    return int(cols[0]), int(rows[0]), rgba[region][:, :, :3] * alpha, 1 - alpha
+
+
+class FrameRenderer:
+    """
+    Renders the first person view on the server, as a single image (see: /game/frame.webp).
+    This composites the same layers world_view.html does with css; the sky, the masked ground tiles then
+    the env sprites.
+
+    Notes:
+      - Sprites are cached as pre-scaled (premultiplied alpha) buffers, and ground tiles are cached pre-masked
+        and cropped to the mask's bounding box, so a frame is a few numpy blends.
+      - Encoded frames are cached by (map, x, y, facing, map version), see get_frame(...)
+    """
+    def __init__(self, svp: SingleVanishingPointPainting,
+                 load_sprite: Callable[[str], Image.Image],
+                 size: Tuple[int, int] = None,
+                 sky_slug: str = "sprite-sky-sky-flat",
+                 sprite_cache_size: int = 256,
+                 frame_cache_size: int = 1024):
+        """
+        :param load_sprite: Gets the image of a sprite (by slug), eg: lambda slug: load_idle_frame(pack[slug])
+        :param size: The size of the rendered image, (the svp's size if None).
+        """
+        self.svp = svp
+        self.size = tuple(size) if size is not None else tuple(svp.size)
+        self.width, self.height = self.size
+        self.horizon_y = int(svp.horizon_screen_ratio * self.height)
+        self.sky_slug = sky_slug
+        self.background = np.array([0x33, 0x33, 0x33], dtype=np.float32) / 255
+
+        self._load_sprite = load_sprite
+        self._sprites = LRU(max_size=sprite_cache_size)  # {(slug, w, h) or (slug, steps_f, steps_r): SpriteBuffer}
+        self._frames = LRU(max_size=frame_cache_size)  # {(map, x, y, facing, version, fmt): bytes}
+        self._masks: Dict[Tuple[int, int], Tuple[int, int, int, int, np.ndarray]] = {}  # see _get_mask(...)
+        self._slug_luts: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def _get_sprite(self, slug: str, w: int, h: int) -> SpriteBuffer:
+        key = (slug, w, h)
+        buffer = self._sprites.get(key)
+        if buffer is None:
+            buffer = _to_buffer(self._load_sprite(slug).convert("RGBA").resize((w, h), Image.Resampling.BILINEAR))
+            self._sprites[key] = buffer
+        return buffer
+
+    def _get_mask(self, steps_f: int, steps_r: int) -> Optional[Tuple[int, int, int, int, np.ndarray]]:
+        """
+        A ground mask scaled to the ground, then cropped to its bounding box.
+        :return: (x0, y0, x1, y1, alpha), with the bounding box in ground coordinates. None if nothing is visible.
+        """
+        key = (steps_f, steps_r)
+        if key not in self._masks:
+            mask = self.svp.draw_mask(steps_f, steps_r)
+            bbox = None
+            if mask is not None:
+                mask = mask.resize((self.width, self.height - self.horizon_y), Image.Resampling.BILINEAR)
+                bbox = mask.getbbox()
+            if bbox is None:
+                self._masks[key] = None
+            else:
+                alpha = np.asarray(mask.crop(bbox), dtype=np.float32)[:, :, np.newaxis] / 255
+                self._masks[key] = tuple(bbox) + (alpha,)
+        return self._masks[key]
+
+    def _get_ground_tile(self, slug: str, steps_f: int, steps_r: int) -> Optional[Tuple[int, int, SpriteBuffer]]:
+        """
+        A ground sprite (stretched over the ground), masked to a tile.
+        :return: (x, y, buffer) with the position in screen coordinates. None if the tile is not visible.
+        """
+        mask = self._get_mask(steps_f, steps_r)
+        if mask is None:
+            return None
+        x0, y0, x1, y1, alpha = mask
+        key = (slug, steps_f, steps_r)
+        buffer = self._sprites.get(key)
+        if buffer is None:
+            img = self._load_sprite(slug).convert("RGBA").resize((self.width, self.height - self.horizon_y),
+                                                                 Image.Resampling.BILINEAR)
+            buffer = _to_buffer(img.crop((x0, y0, x1, y1)), alpha)
+            self._sprites[key] = buffer
+        return x0, self.horizon_y + y0, buffer
+
+    def _get_slug_luts(self, the_map: MapABC) -> Dict[str, np.ndarray]:
+        if the_map.name not in self._slug_luts:
+            self._slug_luts[the_map.name] = {lut.name: lut_to_array(lut, lambda slug: slug) for lut in the_map.luts}
+        return self._slug_luts[the_map.name]
+
+    @staticmethod
+    def _blend(frame: np.ndarray, x: int, y: int, buffer: SpriteBuffer):
+        """
+        Alpha blends a buffer onto the frame at (x, y), clipped to the frame.
+        """
+        offset_x, offset_y, rgb, inv_alpha = buffer
+        x, y = x + offset_x, y + offset_y
+        h, w = rgb.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        src = np.s_[y0 - y:y1 - y, x0 - x:x1 - x]
+        dest = frame[y0:y1, x0:x1]
+        dest *= inv_alpha[src]
+        dest += rgb[src]
+
+    def render(self, the_map: MapABC, x: int, y: int, facing: Direction) -> np.ndarray:
+        """
+        Renders the view from a map position.
+        :return: The frame as an RGB uint8 array.
+        """
+        ground_render_list, env_render_list = build_render_lists(the_map, x, y, facing, self.svp,
+                                                                 self._get_slug_luts(the_map))
+        w, h = self.size
+        frame = np.empty((h, w, 3), dtype=np.float32)
+        frame[:] = self.background
+
+        self._blend(frame, 0, 0, self._get_sprite(self.sky_slug, w, self.horizon_y))
+
+        for steps_f, steps_r, slug in ground_render_list:
+            tile = self._get_ground_tile(slug, steps_f, steps_r)
+            if tile is not None:
+                self._blend(frame, *tile)
+
+        # as per world_view.html, an env sprite is 75% * scale of the view, with its bottom left corner anchored
+        for bottom_per, left_per, scale, slug in env_render_list:
+            sprite_w, sprite_h = max(1, round(0.75 * scale * w)), max(1, round(0.75 * scale * h))
+            self._blend(frame, round(left_per * w), round(bottom_per * h) - sprite_h,
+                        self._get_sprite(slug, sprite_w, sprite_h))
+
+        frame *= 255
+        frame += 0.5
+        return np.clip(frame, 0, 255, out=frame).astype(np.uint8)
+
+    def get_frame(self, the_map: MapABC, x: int, y: int, facing: Direction, fmt: str = "webp", quality: int = 80) -> bytes:
+        """
+        A rendered view, encoded as an image file. Recently rendered views are cached.
+        :param fmt: "webp" or "jpeg"
+        """
+        version = the_map.version if isinstance(the_map, MapInstance) else 0
+        key = (the_map.name, x, y, facing, version, fmt)
+        data = self._frames.get(key)
+        if data is None:
+            buffer = io.BytesIO()
+            Image.fromarray(self.render(the_map, x, y, facing)).save(buffer, format=fmt.upper(), quality=quality)
+            data = buffer.getvalue()
+            self._frames[key] = data
+        return data
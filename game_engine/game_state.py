@@ -31,18 +31,62 @@ class GameAction(Enum):
 
 
 class GameState:
-    def __init__(self, world: World, pack: ResourcePack):
+    def __init__(self, world: World, pack: ResourcePack, maps_pinned: bool = False):
+        """
+        :param maps_pinned: True if the world's maps were pinned when loaded (see: ResourcePack.load_world),
+                            the game then owns those pins.
+        """
         self.party: PlayerParty = PlayerParty(14, 52, Direction.NORTH, "player", True, False, True)
         self.current_world: WorldInstance = WorldInstance(world)
         self.pack: ResourcePack = pack
 
+        # keep the world's maps loaded while this game is being played, see release()
+        map_names = list(world.as_dict()["map_names"])
+        self._pinned_maps: List[str] = map_names if maps_pinned else self.pack.pin_maps(map_names)
+
         x, y, direction, spawn_map = world.get_spawn_info()  # this sets the actual initial player pos
         self.current_map_asset: AssetRecord = spawn_map
-        self.current_map: MapInstance = MapInstance(spawn_map)
+        # the world instance has the session's copy of every map
+        self.current_map: MapInstance = self.current_world.get_map(spawn_map.name)
         self.party.pos_x = x
         self.party.pos_y = y
         self.party.facing = direction
 
+    def release(self):
+        """
+        Called when the game is no longer being played (eg: the session closed).
+        """
+        self.pack.unpin_maps(self._pinned_maps)
+        self._pinned_maps = []
+
+    def get_save_data(self) -> dict:
+        """
+        What is needed to restore this game, see: apply_save_data(...)
+        Only the tiles that were changed are saved, the rest come from the world's maps.
+        """
+        maps = {}
+        for map_name in self.current_world.as_dict()["map_names"]:
+            differences = self.current_world.get_map(map_name).get_differences()
+            if len(differences) > 0:
+                maps[map_name] = differences
+        return {"world": self.current_world.world_name,
+                "map": self.current_map.name,
+                "party": [self.party.pos_x, self.party.pos_y, self.party.facing.name],
+                "maps": maps}
+
+    def apply_save_data(self, d: dict):
+        """
+        Restores a game saved with get_save_data(), onto a new game of the same world.
+        """
+        if d["world"] != self.current_world.world_name:
+            raise ValueError(f"Saved game is of a different world: world={d['world']}, "
+                             f"expected={self.current_world.world_name}")
+        for map_name, differences in d["maps"].items():
+            self.current_world.get_map(map_name).apply_differences(differences)
+        self.current_map = self.current_world.get_map(d["map"])
+        x, y, facing = d["party"]
+        self.party.set_pos(x, y, Direction[facing])
+
     def attempt_to_take_action(self, action: GameAction) -> Why:
         new_location = False
         x, y, facing = self.party.get_pos()
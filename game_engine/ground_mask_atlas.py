@@ -0,0 +1,174 @@
+import json
+import math
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Tuple, List, Dict, Iterable
+
+import xxhash
+from PIL import Image
+
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+
+
+@dataclass(frozen=True)
+class ViewConfig:
+    """
+    The parameters of a SingleVanishingPointPainting, that define the shape of the ground masks.
+    """
+    size: Tuple[int, int] = (1280, 720)
+    view_dist: int = 5
+    horizon_screen_ratio: float = 0.5
+    local_tile_ratio: float = 0.9
+    bird_eye_vs_worm_eye: float = 0
+
+    def make_composer(self) -> SingleVanishingPointPainting:
+        return _make_composer(self)
+
+    @property
+    def slug(self) -> str:
+        """
+        A file name safe id of this config.
+        """
+        xh64 = xxhash.xxh64()
+        for q in (self.horizon_screen_ratio, self.local_tile_ratio, self.bird_eye_vs_worm_eye):
+            xh64.update(struct.pack("!f", q))
+        return f"{self.size[0]}_{self.size[1]}_{self.view_dist}_{xh64.hexdigest()}"
+
+
+@lru_cache(maxsize=16)
+def _make_composer(config: ViewConfig) -> SingleVanishingPointPainting:
+    return SingleVanishingPointPainting([], [], size=tuple(config.size), view_dist=config.view_dist,
+                                        horizon_screen_ratio=config.horizon_screen_ratio,
+                                        local_tile_ratio=config.local_tile_ratio,
+                                        bird_eye_vs_worm_eye=config.bird_eye_vs_worm_eye)
+
+
+def mask_class_name(steps_fwd: int, steps_right: int) -> str:
+    """
+    The css class (see GroundMaskAtlas.get_css) that masks a ground tile, eg: (2, -1) -> "ground-mask-f2-l1"
+    """
+    return f"ground-mask-f{steps_fwd}-{'lr'[steps_right > 0]}{abs(steps_right)}"
+
+
+def _render_mask(config: ViewConfig, steps_fwd: int, steps_right: int, scale: float) -> Image.Image:
+    mask = config.make_composer().draw_mask(steps_fwd, steps_right)
+    if mask is not None and scale != 1:
+        mask = mask.resize((max(1, round(mask.width * scale)), max(1, round(mask.height * scale))),
+                           Image.Resampling.BILINEAR)
+    return mask
+
+
+class GroundMaskAtlas:
+    """
+    Every ground mask of a view config, packed into a grid in a single image.
+
+    Notes:
+      - The masks are all the size of the ground (the bottom of the screen), so the atlas is a simple grid.
+      - The css positions the atlas with mask-size/mask-position, so an element the size of the ground
+        is masked by just its cell, see get_css(...)
+    """
+    def __init__(self, config: ViewConfig, masks: Dict[Tuple[int, int], Image.Image]):
+        """
+        :param masks: {(steps_fwd, steps_right): "L" mode mask}, all of the same size.
+        """
+        self.config = config
+        self.tile_size = next(iter(masks.values())).size if len(masks) > 0 else (1, 1)
+        self.cols = max(1, math.ceil(math.sqrt(len(masks))))
+        self.rows = max(1, math.ceil(len(masks) / self.cols))
+
+        tile_w, tile_h = self.tile_size
+        self.image = Image.new("L", (self.cols * tile_w, self.rows * tile_h), 0)
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {}  # {(steps_fwd, steps_right): (col, row)}
+        for i, (steps, mask) in enumerate(sorted(masks.items())):
+            col, row = i % self.cols, i // self.cols
+            self.image.paste(mask, (col * tile_w, row * tile_h))
+            self.cells[steps] = (col, row)
+
+    def get_index(self, image_file_name: str) -> Dict:
+        """
+        A (json-able) description of where each mask is in the atlas.
+        """
+        return dict(config=asdict(self.config),
+                    image=image_file_name,
+                    tile_size=list(self.tile_size),
+                    grid=[self.cols, self.rows],
+                    masks={mask_class_name(*steps): [col, row] for steps, (col, row) in self.cells.items()})
+
+    def get_css(self, image_url: str) -> str:
+        """
+        A css class per mask, eg: ".ground-mask-f2-l1 {...}"
+        :param image_url: The atlas image url (relative to the css file).
+        """
+        def pos(i, n):
+            return 0 if n == 1 else 100 * i / (n - 1)
+
+        lines = []
+        for steps, (col, row) in self.cells.items():
+            size = f"{self.cols * 100}% {self.rows * 100}%"
+            position = f"{pos(col, self.cols):.4f}% {pos(row, self.rows):.4f}%"
+            lines.append(f".{mask_class_name(*steps)} {{"
+                         f" -webkit-mask-image: url({image_url}); mask-image: url({image_url}); mask-mode: alpha;"
+                         f" -webkit-mask-size: {size}; mask-size: {size};"
+                         f" -webkit-mask-position: {position}; mask-position: {position};"
+                         f" -webkit-mask-repeat: no-repeat; mask-repeat: no-repeat; }}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, folder: str) -> List[str]:
+        """
+        Saves the atlas as <slug>.webp, <slug>.json and <slug>.css
+        :return: The paths of the files written.
+        """
+        slug = self.config.slug
+        image_file, index_file, css_file = [os.path.join(folder, slug + ext) for ext in (".webp", ".json", ".css")]
+
+        # convert the greyscale image to an alpha channel, because a greyscale
+        # image mask does not seem to work on all browsers
+        img = Image.new("LA", self.image.size, (255, 255))
+        img.putalpha(self.image)
+        img.save(image_file)
+        with open(index_file, "wt") as f:
+            json.dump(self.get_index(slug + ".webp"), f, indent=2)
+        with open(css_file, "wt") as f:
+            f.write(self.get_css(slug + ".webp"))
+        return [image_file, index_file, css_file]
+
+
+def get_mask_steps(config: ViewConfig) -> List[Tuple[int, int]]:
+    """
+    Every (steps_fwd, steps_right) that is visible in a view config.
+    """
+    fov_table = config.make_composer().fov_table
+    return [(step_f, step_r) for step_f in range(config.view_dist)
+            for step_r in range(-fov_table[step_f], fov_table[step_f] + 1)]
+
+
+def build_ground_mask_atlases(configs: Iterable[ViewConfig],
+                              scale: float = 0.5,
+                              workers: int = 0) -> Dict[ViewConfig, GroundMaskAtlas]:
+    """
+    Renders every ground mask of the configs in one pass, and packs them into an atlas per config.
+    :param scale: Masks are resized by this, to keep the atlas a reasonable size.
+    :param workers: If > 1, masks are rendered by a process pool with this many processes.
+                    If 0, use one process per cpu. If None (or 1), everything runs in this process.
+    """
+    jobs = [(config, steps_f, steps_r) for config in configs for steps_f, steps_r in get_mask_steps(config)]
+
+    if workers == 0:
+        workers = os.cpu_count()
+    if workers is not None and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render_mask, config, steps_f, steps_r, scale) for config, steps_f, steps_r in jobs]
+            masks = [fut.result() for fut in futures]
+    else:
+        masks = [_render_mask(config, steps_f, steps_r, scale) for config, steps_f, steps_r in jobs]
+
+    by_config: Dict[ViewConfig, Dict[Tuple[int, int], Image.Image]] = {}
+    for (config, steps_f, steps_r), mask in zip(jobs, masks):
+        by_config.setdefault(config, {})
+        if mask is not None:
+            by_config[config][(steps_f, steps_r)] = mask
+
+    return {config: GroundMaskAtlas(config, config_masks) for config, config_masks in by_config.items()}
@@ -1,16 +1,26 @@
 import copy
+import functools
 import itertools
-from typing import Iterator, Any, Dict, List
+from typing import Iterator, Any, Dict, List, Type, Tuple
+
+import numpy as np
 
 from slugify import slugify
 
 from helpers.misc import popo_to_dict
 from helpers.why import Why
 from helpers.archetyped_table import ArchetypedTable, InstanceTable, DifferenceTable
+from helpers.columnar_table import ColumnarTable
 from mam_game.mam_constants import Direction
 from collections.abc import Mapping
 
 
+@functools.lru_cache(maxsize=1024)
+def _layer_slug(layer_name: str) -> str:
+    # slugify is slow, and layer names are looked up on every tile read.
+    return slugify(layer_name)
+
+
 class AssetLut(Mapping):
     """
     An asset Look Up Table. Maps a value (often an integer) to an asset slug [see: ResourcePack].
@@ -88,7 +98,7 @@ class MapABC:
             return self._map[y * self.width + x]
         if len(pos) == 3:
             x, y, layer_name = pos
-            layer_name = slugify(layer_name)
+            layer_name = _layer_slug(layer_name)
             return self._map[y * self.width + x, layer_name]
         raise KeyError()
 
@@ -100,7 +110,7 @@ class MapABC:
         :return:
         """
         x, y = pos
-        self._map[y * self.width + x] = {slugify(n): q for n, q in value.items()}
+        self._map[y * self.width + x] = {_layer_slug(n): q for n, q in value.items()}
 
     def __iter__(self):
         for x, y in itertools.product(range(self.width), range(self.height)):
@@ -109,6 +119,43 @@ class MapABC:
     def __len__(self):
         return self.width * self.height
 
+    def layer_array(self, layer_name: str) -> np.ndarray:
+        """
+        A layer as a flat (treat as read only) array, in the order y * width + x.
+        """
+        layer_name = _layer_slug(layer_name)
+        return np.array([self._map[i, layer_name] for i in range(len(self))])
+
+    def gather(self, xs, ys, layer_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reads a layer at many positions at once.
+        :param xs: x positions (any that are off the map are skipped)
+        :param ys: y positions
+        :return: (on_map, values), a bool mask of the positions on the map, and the values at those positions.
+        """
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        on_map = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        rows = ys[on_map] * self.width + xs[on_map]
+        return on_map, self.layer_array(layer_name)[rows]
+
+    def map_as_array_of_arrays(self):
+        rows = []
+        for row_idx in range(len(self._map)):
+            row = self._map[row_idx]
+            row = [row[k] for k in self._map.col_headings]
+            rows.append(row)
+        return rows
+
+    def asdict(self):
+        d = {"name": self.name,
+             "width": self.width,
+             "height": self.height,
+             "layer_names": self._map.col_headings,  # to ensure layer_names is in the same order as the dumped table.
+             "luts": [popo_to_dict(q) for q in self.luts],
+             "map": self.map_as_array_of_arrays()
+             }
+        return d
+
 
 class Map(MapABC):
     """
@@ -130,37 +177,184 @@ class Map(MapABC):
                  luts: List[AssetLut]):
         super().__init__(name, w, h, layer_names, luts)
         self._map: DifferenceTable = ArchetypedTable({n: 0 for n in self.layer_names}, self.width * self.height)
+        self._layer_arrays: Dict[str, np.ndarray] = {}  # see layer_array(...)
+
+    def __setitem__(self, pos, value: Dict[str, Any]):
+        self._layer_arrays = {}
+        super().__setitem__(pos, value)
 
     def recompress_map(self):
         self._map = ArchetypedTable(self._map, lru_cache_size=self._map.lru_cache_size)
+        self._layer_arrays = {}
+
+    def layer_array(self, layer_name: str) -> np.ndarray:
+        # cached, as the map is not expected to change once built.
+        layer_name = _layer_slug(layer_name)
+        if layer_name not in self._layer_arrays:
+            layer = np.array(self._map.get_columns()[layer_name])
+            layer.flags.writeable = False
+            self._layer_arrays[layer_name] = layer
+        return self._layer_arrays[layer_name]
+
+    def set_layers(self, layers: Dict[str, Any]):
+        """
+        Sets whole layers at once, a much faster alternative to setting every tile via the_map[x, y] = {...}.
+        The map is recompressed as part of this.
+        :param layers: {layer_name: values}, values are a (height, width) numpy array (ie: indexed [y, x])
+                       or a flat sequence in the order y * width + x. Layers not given remain unaltered.
+        """
+        columns = self.get_layers()
+        for layer_name, values in layers.items():
+            layer_name = slugify(layer_name)
+            if layer_name not in columns:
+                raise KeyError(f"Unknown layer: {layer_name}")
+            if hasattr(values, "reshape"):
+                values = values.reshape(-1)
+            if len(values) != len(self):
+                raise ValueError(f"Layer '{layer_name}' has {len(values)} values, expected {len(self)}.")
+            columns[layer_name] = values
+        self._map = ArchetypedTable.from_columns(columns, lru_cache_size=self._map.lru_cache_size)
+        self._layer_arrays = {}
+
+    def get_layers(self) -> Dict[str, List[Any]]:
+        """
+        Gets every layer as a flat list, in the order y * width + x.
+        """
+        return self._map.get_columns()
+
+
+class ColumnarMap(MapABC):
+    """
+    An alternative to Map, that stores each layer as a typed numpy array (see ColumnarTable).
+
+    Notes:
+      - Reading a tile layer (eg: the_map[x, y, "ground"]) is O(1), and regions of a layer can be read as arrays.
+      - Uses more ram than Map for sparse maps of large values, but much less for most maps.
+      - Can be used wherever a Map is used, including as the base map of a MapInstance.
+    """
+
+    def __init__(self, name,
+                 w, h,
+                 layer_names: List[str],
+                 luts: List[AssetLut]):
+        super().__init__(name, w, h, layer_names, luts)
+        self._map: ColumnarTable = ColumnarTable({n: np.zeros(self.width * self.height, dtype=np.uint8)
+                                                  for n in self.layer_names})
+
+    def set_layers(self, layers: Dict[str, Any]):
+        """
+        Sets whole layers at once.
+        :param layers: {layer_name: values}, values are a (height, width) numpy array (ie: indexed [y, x])
+                       or a flat sequence in the order y * width + x. Layers not given remain unaltered.
+        """
+        columns = {n: self._map.column(n) for n in self._map.col_headings}
+        for layer_name, values in layers.items():
+            layer_name = slugify(layer_name)
+            if layer_name not in columns:
+                raise KeyError(f"Unknown layer: {layer_name}")
+            values = np.asarray(values).reshape(-1)
+            if len(values) != len(self):
+                raise ValueError(f"Layer '{layer_name}' has {len(values)} values, expected {len(self)}.")
+            columns[layer_name] = values
+        self._map = ColumnarTable(columns)
+
+    def get_layers(self) -> Dict[str, List[Any]]:
+        """
+        Gets every layer as a flat list, in the order y * width + x.
+        """
+        return self._map.get_columns()
+
+    def layer_array(self, layer_name: str) -> np.ndarray:
+        return self._map.column(_layer_slug(layer_name))
+
+    def region(self, x0: int, y0: int, x1: int, y1: int, layer_name: str) -> np.ndarray:
+        """
+        Gets a rectangle of a layer, as a read only array indexed [y, x]. x1 and y1 are exclusive (like a slice).
+        """
+        layer = self.layer_array(layer_name).reshape(self.height, self.width)
+        return layer[max(y0, 0):y1, max(x0, 0):x1]
 
     def map_as_array_of_arrays(self):
-        rows = []
-        for row_idx in range(len(self._map)):
-            row = self._map[row_idx]
-            row = [row[k] for k in self._map.col_headings]
-            rows.append(row)
-        return rows
+        columns = self._map.get_columns()
+        return [list(row) for row in zip(*[columns[k] for k in self._map.col_headings])]
 
-    def asdict(self):
-        d = {"name": self.name,
-             "width": self.width,
-             "height": self.height,
-             "layer_names": self._map.col_headings,  # to ensure layer_names is in the same order as the dumped table.
-             "luts": [popo_to_dict(q) for q in self.luts],
-             "map": self.map_as_array_of_arrays()
-             }
-        return d
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Bytes used by each layer, and the "total".
+        """
+        return self._map.memory_report()
+
+
+_instance_versions = itertools.count(1)
+
+
+def _patched_dtype(layer: np.ndarray, values: List[Any]) -> np.dtype:
+    """
+    A dtype that holds a layer's values, and the values patched into it. A base layer can be the smallest dtype
+    that held its values (eg: uint8, see: ColumnarMap), but an instance can change a tile to any value.
+    """
+    try:
+        return np.result_type(layer.dtype, np.asarray(values).dtype)
+    except TypeError:
+        return np.dtype(object)
 
 
 class MapInstance(MapABC):
     def __init__(self, base_map: Map):
         super().__init__(base_map.name, base_map.width, base_map.height, base_map.layer_names,
                          base_map.luts)
+        self.base_map: MapABC = base_map
 
         # To save ram, this table only stores the differences of this instance vs. the reference map.
         # If a door is opened, or chest looted, the changes won't affect the master copy.
         self._map = InstanceTable(base_map._map)
+        # 0 until the instance is changed, then unique (across all instances) for each change.
+        # So views of a map (see FrameRenderer) can be cached, and shared by instances that are unchanged.
+        self.version = 0
+
+    def __setitem__(self, pos, value: Dict[str, Any]):
+        super().__setitem__(pos, value)
+        self.version = next(_instance_versions)
+
+    def layer_array(self, layer_name: str) -> np.ndarray:
+        layer_name = _layer_slug(layer_name)
+        layer = self.base_map.layer_array(layer_name)
+        altered = list(self._map.altered_rows())
+        if len(altered) > 0:
+            altered_values = [self._map[row, layer_name] for row in altered]
+            layer = layer.astype(_patched_dtype(layer, altered_values))  # a copy
+            for row, value in zip(altered, altered_values):
+                layer[row] = value
+        return layer
+
+    def gather(self, xs, ys, layer_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        # read the (shared) base map, then patch any values this instance altered.
+        on_map, values = self.base_map.gather(xs, ys, layer_name)
+        if self._map.num_altered_rows() > 0:
+            layer_name = _layer_slug(layer_name)
+            rows = (np.asarray(ys)[on_map] * self.width + np.asarray(xs)[on_map]).tolist()
+            altered = [i for i, row in enumerate(rows) if self._map.is_altered(row)]
+            if len(altered) > 0:
+                altered_values = [self._map[rows[i], layer_name] for i in altered]
+                values = values.astype(_patched_dtype(values, altered_values))  # a copy
+                for i, value in zip(altered, altered_values):
+                    values[i] = value
+        return on_map, values
+
+    def get_differences(self) -> Dict[int, Dict[str, Any]]:
+        """
+        The tiles this instance changed, as {row (y * width + x): {layer: value}}, see: apply_differences(...)
+        """
+        return self._map.get_altered_rows()
+
+    def apply_differences(self, differences: Dict[int, Dict[str, Any]]):
+        """
+        Re-applies the changes from get_differences(...), eg: when a saved game is loaded.
+        """
+        for row, values in differences.items():
+            self._map[int(row)] = values
+        if len(differences) > 0:
+            self.version = next(_instance_versions)
 
     def can_move_to(self, x: int, y: int, direction: Direction) -> Why:
         # TODO
@@ -172,7 +366,11 @@ class MapInstance(MapABC):
 
 
 
-def load_map_from_dict(d) -> Map:
+def load_map_from_dict(d, map_type: Type[MapABC] = Map) -> MapABC:
+    """
+    Loads a map from Map.asdict()
+    :param map_type: The class used to store the map, Map or ColumnarMap.
+    """
     # note "map.json" is Map.asdict() with an extra "layer_sprites" key entered for sprite location.
     map_id = d["name"]
     w = d["width"]
@@ -181,12 +379,11 @@ def load_map_from_dict(d) -> Map:
     map_tiles = d["map"]
     luts = [AssetLut(**q, auto_parse_integers=True) for q in d["luts"]]
 
-    # rectify to the format required
-    map_tiles = [{h: c for h, c in zip(layer_names, row)} for row in map_tiles]
+    # the tiles are in the order y * w + x, so the columns are the layers.
+    layers = {name: list(col) for name, col in zip(layer_names, zip(*map_tiles))}
 
-    the_map = Map(map_id, w, h, layer_names, luts)
-    for x, y in itertools.product(range(w), range(h)):
-        the_map[x, y] = map_tiles[(y * w) + x]
+    the_map = map_type(map_id, w, h, layer_names, luts)
+    the_map.set_layers(layers)
     return the_map
 
 
@@ -0,0 +1,104 @@
+import json
+import mmap
+import struct
+from typing import Type, Union
+
+import numpy as np
+
+from game_engine.map import MapABC, ColumnarMap, AssetLut
+from helpers.columnar_table import ColumnarTable, as_column
+from helpers.misc import popo_to_dict
+
+# map.bin, a binary alternative to map.json that loads without parsing every tile:
+#   - "<8sII": magic, version, length of the header
+#   - the header, json: {name, width, height, layers: [{name, dtype, offset}, ...], luts: {offset, length}}
+#   - each layer, as a little endian typed array (in the order y * width + x), 8 byte aligned
+#   - the luts, json (as per Map.asdict())
+# The offsets are relative to the first layer, which is at the first 8 byte boundary after the header.
+MAP_BIN_MAGIC = b"CHOSMMAP"
+MAP_BIN_VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def map_to_bin(the_map: MapABC) -> bytes:
+    """
+    :raises ValueError: If a layer is not numeric (or bool), those maps need map.json
+    """
+    layers = []
+    for layer_name in the_map.layer_names:
+        column = as_column(the_map.layer_array(layer_name))
+        if column.dtype.kind not in "biuf":
+            raise ValueError(f"Layer can't be stored in map.bin (not numeric): layer={layer_name}")
+        layers.append((layer_name, column.astype(column.dtype.newbyteorder("<"), copy=False)))
+    luts = json.dumps([popo_to_dict(q) for q in the_map.luts]).encode("utf-8")
+
+    # offsets are relative to the start of the data (the first layer)
+    offsets, pos = [], 0
+    for _, column in layers:
+        offsets.append(pos)
+        pos = _align(pos + column.nbytes)
+    header = json.dumps({"name": the_map.name, "width": the_map.width, "height": the_map.height,
+                         "layers": [{"name": name, "dtype": column.dtype.str, "offset": offset}
+                                    for (name, column), offset in zip(layers, offsets)],
+                         "luts": {"offset": pos, "length": len(luts)}}).encode("utf-8")
+
+    data_start = _align(_PREFIX.size + len(header))
+    data = bytearray(data_start + pos + len(luts))
+    _PREFIX.pack_into(data, 0, MAP_BIN_MAGIC, MAP_BIN_VERSION, len(header))
+    data[_PREFIX.size:_PREFIX.size + len(header)] = header
+    for (_, column), offset in zip(layers, offsets):
+        data[data_start + offset:data_start + offset + column.nbytes] = column.tobytes()
+    data[data_start + pos:] = luts
+    return bytes(data)
+
+
+def save_map_bin(the_map: MapABC, path: str):
+    data = map_to_bin(the_map)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def map_from_bin(data: Union[bytes, mmap.mmap], map_type: Type[MapABC] = ColumnarMap) -> MapABC:
+    """
+    Loads a map from map.bin data. For a ColumnarMap, the layers are read only views of the data (no copy).
+    :param map_type: The class used to store the map, ColumnarMap or Map.
+    """
+    magic, version, header_len = _PREFIX.unpack_from(data, 0)
+    if magic != MAP_BIN_MAGIC:
+        raise ValueError("Not a map.bin file.")
+    if version != MAP_BIN_VERSION:
+        raise ValueError(f"Unsupported map.bin version: {version}")
+    header = json.loads(bytes(data[_PREFIX.size:_PREFIX.size + header_len]))
+    data_start = _align(_PREFIX.size + header_len)
+
+    w, h = header["width"], header["height"]
+    layers = {q["name"]: np.frombuffer(data, dtype=np.dtype(q["dtype"]), count=w * h,
+                                       offset=data_start + q["offset"])
+              for q in header["layers"]}
+    luts_offset, luts_len = data_start + header["luts"]["offset"], header["luts"]["length"]
+    luts = [AssetLut(**q, auto_parse_integers=True)
+            for q in json.loads(bytes(data[luts_offset:luts_offset + luts_len]))]
+
+    the_map = map_type(header["name"], w, h, list(layers.keys()), luts)
+    if isinstance(the_map, ColumnarMap):
+        the_map._map = ColumnarTable.from_arrays({name: layers[name] for name in the_map.layer_names})
+    else:
+        the_map.set_layers(layers)
+    return the_map
+
+
+def load_map_bin(path: str, map_type: Type[MapABC] = ColumnarMap, use_mmap: bool = False) -> MapABC:
+    """
+    :param use_mmap: Memory map the file, rather than reading it. The layers are then paged in as used.
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    return map_from_bin(data, map_type)
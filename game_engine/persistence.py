@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import numpy as np
+from slugify import slugify
+
+from game_engine.game_state import GameState
+
+SAVE_VERSION = 1
+
+
+def _to_json_value(value):
+    # tile values can be numpy scalars, eg: from a ColumnarMap
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Can't save value of type: {type(value)}")
+
+
+def game_state_to_bytes(game_state: GameState) -> bytes:
+    """
+    A saved game, as zlib compressed json of GameState.get_save_data()
+    """
+    d = {"version": SAVE_VERSION, **game_state.get_save_data()}
+    return zlib.compress(json.dumps(d, separators=(",", ":"), default=_to_json_value).encode("utf-8"))
+
+
+def game_state_from_bytes(data: bytes) -> dict:
+    """
+    :return: The save data, see: GameState.apply_save_data(...)
+    """
+    d = json.loads(zlib.decompress(data))
+    if d.get("version") != SAVE_VERSION:
+        raise ValueError(f"Unsupported saved game version: {d.get('version')}")
+    return d
+
+
+class PersistenceBackend(ABC):
+    """
+    Where saved games are kept, by user name.
+    """
+    @abstractmethod
+    def save_many(self, saves: Dict[str, bytes]):
+        """
+        Saves a batch of games, {user_name: data}
+        """
+        pass
+
+    @abstractmethod
+    def load(self, user_name: str) -> Optional[bytes]:
+        """
+        :return: The user's saved game, or None.
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class SqlitePersistenceBackend(PersistenceBackend):
+    """
+    Saved games in a sqlite database (WAL mode), a batch is one transaction.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()  # a connection per thread
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS saved_games "
+                        "(user_name TEXT PRIMARY KEY, data BLOB NOT NULL, saved REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def save_many(self, saves: Dict[str, bytes]):
+        now = time.time()
+        with self._connect() as con:
+            con.executemany("INSERT INTO saved_games (user_name, data, saved) VALUES (?, ?, ?) "
+                            "ON CONFLICT(user_name) DO UPDATE SET data=excluded.data, saved=excluded.saved",
+                            [(user_name, data, now) for user_name, data in saves.items()])
+
+    def load(self, user_name: str) -> Optional[bytes]:
+        row = self._connect().execute("SELECT data FROM saved_games WHERE user_name = ?", (user_name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+
+class FilePersistenceBackend(PersistenceBackend):
+    """
+    A saved game per file, in a folder. Each file is written atomically (written to a temp file, then renamed).
+    """
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _get_path(self, user_name: str) -> str:
+        # the slug alone could collide (eg: "Bob" and "bob"), so the name's hash is part of the file name
+        return os.path.join(self.folder, f"{slugify(user_name)}-{zlib.crc32(user_name.encode('utf-8')):08x}.save")
+
+    def save_many(self, saves: Dict[str, bytes]):
+        for user_name, data in saves.items():
+            path = self._get_path(user_name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def load(self, user_name: str) -> Optional[bytes]:
+        try:
+            with open(self._get_path(user_name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class WriteBehindSaver:
+    """
+    Saves games in the background, so saving never blocks the request that made the change.
+
+    Notes:
+      - save(...) snapshots the game (just the party and changed tiles, so it's cheap), the write happens later.
+      - Saves are batched, every flush_interval seconds, and only a user's latest save is written.
+      - flush() writes everything pending now, eg: when sessions time out, or at shutdown.
+      - load(...) sees pending saves, so a quick logout / login doesn't load an old game.
+    """
+    def __init__(self, backend: PersistenceBackend, flush_interval: float = 5.0):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, bytes] = {}
+        self._writing: Dict[str, bytes] = {}  # the batch being written, still visible to load(...)
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one flush at a time, so batches are written in order
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread = None
+        self.num_saves = 0
+        self.num_writes = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="WriteBehindSaver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread, and writes anything pending.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def save(self, user_name: str, game_state: GameState):
+        self.save_bytes(user_name, game_state_to_bytes(game_state))
+
+    def save_bytes(self, user_name: str, data: bytes):
+        """
+        :param data: A game, already saved with game_state_to_bytes(...)
+        """
+        with self._pending_lock:
+            self._pending[user_name] = data
+            self.num_saves += 1
+
+    def flush(self):
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+            if len(batch) == 0:
+                return
+            try:
+                self.backend.save_many(batch)
+                self.num_writes += len(batch)
+            except Exception as e:
+                logging.error(f"Error saving games, will retry: num_games={len(batch)}, error='{e}'")
+                with self._pending_lock:
+                    # newer saves (made during the write) win
+                    self._pending = batch | self._pending
+            finally:
+                with self._pending_lock:
+                    self._writing = {}
+
+    def load(self, user_name: str) -> Optional[dict]:
+        """
+        :return: The user's save data (see: GameState.apply_save_data), or None.
+        """
+        with self._pending_lock:
+            data = self._pending.get(user_name, self._writing.get(user_name))
+        if data is None:
+            data = self.backend.load(user_name)
+        return game_state_from_bytes(data) if data is not None else None
@@ -1,9 +1,10 @@
 # this is all stubs for now.
+import heapq
 import logging
 import os
-from datetime import datetime
+import time
 from threading import Lock
-from typing import Dict, Callable
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from game_engine.game_state import GameState
 
@@ -13,24 +14,35 @@ class Session:
         self.user_name = user_name
         self.session_id = session_id
         self.game_state = game_state
-        self._last_ping = datetime.now()
+        self._last_ping = time.monotonic()
         self.closed: bool = False
+        self.on_close: Callable[["Session"], None] = None  # set by the SessionManager
+        self.on_save: Callable[["Session"], None] = None  # set by the SessionManager
 
     def is_open(self):
         return not self.closed
 
     def close(self):
-        self.closed = True
+        if not self.closed:
+            self.save_game()
+            self.closed = True
+            self.game_state.release()
+            if self.on_close is not None:
+                self.on_close(self)
 
     def last_ping_in_minutes(self):
-        return (datetime.now() - self._last_ping).total_seconds() / 60
+        return (time.monotonic() - self._last_ping) / 60
 
     def ping(self):
         if not self.closed:
-            self._last_ping = datetime.now()
+            self._last_ping = time.monotonic()
 
     def save_game(self):
-        pass
+        """
+        Queues the game to be saved, see: SessionStore.saver
+        """
+        if self.on_save is not None and not self.closed:
+            self.on_save(self)
 
     def translate(self, message):
         """
@@ -56,63 +68,218 @@ class SessionException(Exception):
         super().__init__(msg)
 
 
-class _SessionManagerMeta(type):
-    _sessions: Dict[str, Session] = {}
-    time_out_in_minutes = 60
-    purge_time_in_minutes = 60 * 24
-    max_sessions = 100
-    _lock = Lock()
+class SessionStore:
+    """
+    The sessions of the server, for many (100k+) sessions.
+
+    Notes:
+      - Sessions are split over shards, each with its own lock, so lookups by different sessions don't contend.
+      - A user to session index, and a count of open sessions, make create_session(...) O(1).
+      - Logins are serialised per user (a striped lock, by user name), so concurrent logins of one user
+        share one session. The game is loaded holding only that stripe.
+      - Games are saved through the saver (eg: a WriteBehindSaver) when sessions close, and it's flushed
+        when sessions time out.
+      - Expiry uses a heap of (deadline, session id). ping() doesn't touch the heap, instead an entry that comes
+        due for a session that was pinged since is pushed back with its new deadline. So tick() is
+        O(sessions due * log n), rather than a scan of every session.
+    """
+    def __init__(self, num_shards: int = 16, num_user_stripes: int = 64,
+                 time_out_in_minutes: float = 60, purge_time_in_minutes: float = 60 * 24, max_sessions: int = 100):
+        """
+        :param time_out_in_minutes: An open session not pinged for this long is closed (and its game saved).
+        :param purge_time_in_minutes: A session not pinged for this long is forgotten.
+        :param max_sessions: The max number of open sessions.
+        """
+        self.time_out_in_minutes = time_out_in_minutes
+        self.purge_time_in_minutes = purge_time_in_minutes
+        self.max_sessions = max_sessions
+
+        self._shards: List[Dict[str, Session]] = [{} for _ in range(num_shards)]
+        self._shard_locks = [Lock() for _ in range(num_shards)]
+        self._user_index: Dict[str, str] = {}  # {user_name: session_id}, the user's latest session
+        self._user_locks = [Lock() for _ in range(num_user_stripes)]
+        self._num_open = 0
+        self._count_lock = Lock()
+        self._expiry_heap: List[Tuple[float, str]] = []  # [(monotonic deadline, session_id), ...]
+        self._expiry_lock = Lock()
+        # has save(user_name, game_state), save_bytes(user_name, data) and flush(),
+        # see: game_engine.persistence.WriteBehindSaver
+        self.saver = None
+
+    def _shard(self, session_id: str) -> int:
+        return hash(session_id) % len(self._shards)
+
+    def _user_lock(self, user_name: str) -> Lock:
+        return self._user_locks[hash(user_name) % len(self._user_locks)]
+
+    @property
+    def num_open(self) -> int:
+        return self._num_open
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def sessions(self) -> Iterator[Session]:
+        for shard, lock in zip(self._shards, self._shard_locks):
+            with lock:
+                shard_sessions = list(shard.values())
+            yield from shard_sessions
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        :return: The session (open or closed), or None. Doesn't ping it.
+        """
+        if session_id is None:
+            return None
+        return self._shards[self._shard(session_id)].get(session_id)
 
-    def tick(self):
-        # with self._lock:
-        time_out_sessions = [s for s in self._sessions.values() if s.last_ping_in_minutes() > self.time_out_in_minutes]
-        for s in time_out_sessions:
-            if s.is_open():
-                logging.info("Session timeout: " + s.session_id)
-                print("Session timeout: " + s.session_id)
-                s.save_game()
-                s.close()
-            elif s.last_ping_in_minutes() > self.purge_time_in_minutes:
-                del self._sessions[s.session_id]
+    def add(self, session: Session, check_full: bool = True):
+        """
+        Adds a session, as the user's latest session.
+        :param check_full: False if the caller has already checked max_sessions (eg: across workers).
+        :raises SessionException: If the server is full.
+        """
+        with self._count_lock:
+            if check_full and self._num_open >= self.max_sessions:
+                raise SessionException(None, "Server full, try again later.")
+            self._num_open += 1
+        session.on_close = self._on_close
+        session.on_save = self._on_save
+
+        idx = self._shard(session.session_id)
+        with self._shard_locks[idx]:
+            self._shards[idx][session.session_id] = session
+        self._user_index[session.user_name] = session.session_id
+        with self._expiry_lock:
+            heapq.heappush(self._expiry_heap, (session._last_ping + self.time_out_in_minutes * 60, session.session_id))
+
+    def _on_close(self, session: Session):
+        with self._count_lock:
+            self._num_open -= 1
+
+    def _on_save(self, session: Session):
+        if self.saver is not None:
+            try:
+                self.saver.save(session.user_name, session.game_state)
+            except Exception as e:
+                logging.error(f"Error saving game: user='{session.user_name}', error='{e}'")
+
+    def remove(self, session_id: str):
+        idx = self._shard(session_id)
+        with self._shard_locks[idx]:
+            session = self._shards[idx].pop(session_id, None)
+        if session is not None:
+            session.close()
+            with self._user_lock(session.user_name):
+                if self._user_index.get(session.user_name) == session_id:
+                    del self._user_index[session.user_name]
+
+    def create_session(self, user_name: str, load_game: Callable) -> str:
+        """
+        The user's open session, or a new one.
+        :param load_game: user_name -> GameState, only called for a new session.
+        :return: The session id.
+        """
+        with self._user_lock(user_name):
+            existing_session = self.get(self._user_index.get(user_name))
+            if existing_session is not None and existing_session.is_open():
+                # the user is already logged in
+                existing_session.ping()
+                return existing_session.session_id
+
+            if self._num_open >= self.max_sessions:
+                raise SessionException(None, "Server full, try again later.")
 
-    def create_session(self, user_name, load_game: Callable) -> str:
-        # with self._lock:
-        active_sessions = sum(1 for s in self._sessions.values() if s.is_open())
-        if active_sessions > self.max_sessions:
-            raise SessionException("Server full, try again later.")
-
-        user_sessions = [s for k, s in self._sessions.items() if s.user_name == user_name]
-        user_open_sessions = [s for s in user_sessions if s.is_open()]
-        user_closed_sessions = [s for s in user_sessions if not s.is_open()]
-
-        if len(user_open_sessions) > 0:
-            # the user is already logged in
-            user_open_sessions = sorted(user_open_sessions, key= lambda s: s.last_ping_in_minutes)
-            existing_session = user_open_sessions.pop(0)
-            for s in user_open_sessions:
-                logging.error(f"User had multiple sessions, purging: user='{user_name}', session_id={s.session_id}")
-                s.close()
-            existing_session.ping()
-            return existing_session.session_id
-        else:
             # this is the normal case
             session_id = os.urandom(32).hex()
-            while session_id in self._sessions:
+            while self.get(session_id) is not None:
                 logging.error(f"Randomly generated session ID already in use: user='{user_name}', session_id={session_id}")
                 session_id = os.urandom(32).hex()
 
-            # TODO: await
-            game_state = load_game(user_name) # will create a new game if first login
+            game_state = load_game(user_name)  # will create a new game if first login
             s = Session(user_name, session_id, game_state)
-            self._sessions[s.session_id] = s
+            try:
+                self.add(s)
+            except SessionException:
+                game_state.release()
+                raise
             return s.session_id
 
+    def get_active_session(self, session_id: str) -> Optional[Session]:
+        session = self.get(session_id)
+        if session is not None:
+            session.ping()
+            if session.is_open():
+                return session
+        return None
+
+    def tick(self, now: float = None) -> List[Session]:
+        """
+        Closes (and saves) the sessions that timed out, and forgets the ones past the purge time.
+        :param now: time.monotonic(), for testing.
+        :return: The sessions closed.
+        """
+        now = time.monotonic() if now is None else now
+        time_out, purge_time = self.time_out_in_minutes * 60, self.purge_time_in_minutes * 60
+        closed = []
+        while True:
+            with self._expiry_lock:
+                if len(self._expiry_heap) == 0 or self._expiry_heap[0][0] > now:
+                    break
+                _, session_id = heapq.heappop(self._expiry_heap)
+            session = self.get(session_id)
+            if session is None:
+                continue
+
+            idle = now - session._last_ping
+            if session.is_open() and idle > time_out:
+                logging.info("Session timeout: " + session.session_id)
+                print("Session timeout: " + session.session_id)
+                session.close()  # saves the game
+                closed.append(session)
+            elif not session.is_open() and idle > purge_time:
+                self.remove(session_id)
+                continue
+
+            # pinged since, or waiting to be purged
+            deadline = session._last_ping + (time_out if session.is_open() else purge_time)
+            with self._expiry_lock:
+                heapq.heappush(self._expiry_heap, (max(deadline, now + 1e-3), session_id))
+
+        if len(closed) > 0 and self.saver is not None:
+            self.saver.flush()
+        return closed
+
+
+class _SessionManagerMeta(type):
+    _store = SessionStore()
+
+    def tick(self):
+        self._store.tick()
+
+    def use_store(self, store: SessionStore):
+        """
+        Replaces the (empty) session store, eg: with a SharedSessionStore when running many worker processes.
+        """
+        self._store = store
+
+    def set_saver(self, saver):
+        """
+        :param saver: Saves the games of sessions, see: game_engine.persistence.WriteBehindSaver
+        """
+        self._store.saver = saver
+
+    def create_session(self, user_name, load_game: Callable) -> str:
+        return self._store.create_session(user_name, load_game)
+
+    def sessions(self) -> Iterator[Session]:
+        return self._store.sessions()
+
     def __getitem__(self, item):
-        # with self._lock:
-        if item not in self._sessions:
+        session = self._store.get(item)
+        if session is None:
             raise SessionException(item, "Session not found.")
 
-        session = self._sessions[item]
         session.ping()
         if not session.is_open():
             raise SessionException(session.session_id, "Session Closed.")
@@ -120,13 +287,7 @@ class _SessionManagerMeta(type):
         return session
 
     def get_active_session(self, session_id):
-        if session_id is not None and session_id in self._sessions:
-            session = self._sessions[session_id]
-            session.ping()
-            if session.is_open():
-                return session
-
-        return None
+        return self._store.get_active_session(session_id)
 
 
 class SessionManager(object, metaclass=_SessionManagerMeta):
@@ -0,0 +1,379 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from game_engine.game_state import GameState
+from game_engine.persistence import game_state_to_bytes, game_state_from_bytes
+from game_engine.session import Session, SessionStore, SessionException
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    session_id: str
+    user_name: str
+    owner: str  # the worker that last changed the session
+    version: int  # incremented each time the game state is published
+    state: bytes  # see: game_state_to_bytes(...)
+    last_ping: float  # time.time()
+    closed: bool
+
+
+class SharedStateDB:
+    """
+    State shared by the worker processes of one host (eg: uvicorn --workers N), in a sqlite database (WAL mode).
+    No external services needed, and readers don't block writers.
+
+    Holds:
+      - sessions, see: SharedSessionStore
+      - the modification times of generated files, see: DynamicFileManager
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()  # a connection per thread
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS sessions "
+                        "(session_id TEXT PRIMARY KEY, user_name TEXT NOT NULL, owner TEXT NOT NULL, "
+                        "version INTEGER NOT NULL, state BLOB NOT NULL, last_ping REAL NOT NULL, "
+                        "closed INTEGER NOT NULL DEFAULT 0)")
+            # one open session per user, across every worker
+            con.execute("CREATE UNIQUE INDEX IF NOT EXISTS sessions_open_user ON sessions (user_name) WHERE closed = 0")
+            con.execute("CREATE INDEX IF NOT EXISTS sessions_last_ping ON sessions (closed, last_ping)")
+            con.execute("CREATE TABLE IF NOT EXISTS generated_files (key TEXT PRIMARY KEY, m_time REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def close(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # sessions
+    # ------------------------------------------------------------------------------------------------------------------
+    _SESSION_COLUMNS = "session_id, user_name, owner, version, state, last_ping, closed"
+
+    def insert_session(self, session_id: str, user_name: str, owner: str, state: bytes) -> bool:
+        """
+        :return: False if the user already has an open session.
+        """
+        try:
+            with self._connect() as con:
+                con.execute(f"INSERT INTO sessions ({self._SESSION_COLUMNS}) VALUES (?, ?, ?, 1, ?, ?, 0)",
+                            (session_id, user_name, owner, state, time.time()))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def get_session(self, session_id: str) -> Optional[SessionRecord]:
+        row = self._connect().execute(f"SELECT {self._SESSION_COLUMNS} FROM sessions WHERE session_id = ?",
+                                      (session_id,)).fetchone()
+        return SessionRecord(*row[:6], bool(row[6])) if row is not None else None
+
+    def get_user_session(self, user_name: str) -> Optional[SessionRecord]:
+        """
+        :return: The user's open session, or None.
+        """
+        row = self._connect().execute(f"SELECT {self._SESSION_COLUMNS} FROM sessions "
+                                      f"WHERE user_name = ? AND closed = 0", (user_name,)).fetchone()
+        return SessionRecord(*row[:6], bool(row[6])) if row is not None else None
+
+    def count_open_sessions(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions WHERE closed = 0").fetchone()[0]
+
+    def claim_session(self, session_id: str, owner: str, version: int) -> Optional[int]:
+        """
+        Makes the worker the owner of an open session, if it is still at the given version.
+        :return: The session's new version, or None if it changed (or is closed, or gone).
+        """
+        with self._connect() as con:
+            row = con.execute("UPDATE sessions SET owner = ?, version = version + 1 "
+                              "WHERE session_id = ? AND version = ? AND closed = 0 RETURNING version",
+                              (owner, session_id, version)).fetchone()
+        return row[0] if row is not None else None
+
+    def delete_session(self, session_id: str):
+        with self._connect() as con:
+            con.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def find_lost_sessions(self, owner: str, session_ids: List[str]) -> List[str]:
+        """
+        :return: The sessions (of session_ids) the worker no longer owns, ie: owned by another worker, or closed.
+        """
+        owned = set()
+        con = self._connect()
+        for i in range(0, len(session_ids), 500):
+            batch = session_ids[i:i + 500]
+            owned.update(row[0] for row in con.execute(
+                f"SELECT session_id FROM sessions WHERE owner = ? AND closed = 0 "
+                f"AND session_id IN ({','.join('?' * len(batch))})", (owner, *batch)))
+        return [session_id for session_id in session_ids if session_id not in owned]
+
+    def update_session_state(self, session_id: str, owner: str, state: bytes) -> Optional[int]:
+        """
+        Publishes a session's game state, if the worker still owns the session.
+        :return: The session's new version, or None if another worker owns it (or it's closed).
+        """
+        with self._connect() as con:
+            row = con.execute("UPDATE sessions SET state = ?, version = version + 1, last_ping = ? "
+                              "WHERE session_id = ? AND owner = ? AND closed = 0 RETURNING version",
+                              (state, time.time(), session_id, owner)).fetchone()
+        return row[0] if row is not None else None
+
+    def close_session(self, session_id: str, owner: str) -> bool:
+        """
+        :return: False if another worker owns the session.
+        """
+        with self._connect() as con:
+            return con.execute("UPDATE sessions SET closed = 1 WHERE session_id = ? AND owner = ?",
+                               (session_id, owner)).rowcount > 0
+
+    def ping_sessions(self, pings: Dict[str, float]):
+        """
+        :param pings: {session_id: time.time() of the last ping}
+        """
+        with self._connect() as con:
+            con.executemany("UPDATE sessions SET last_ping = max(last_ping, ?) WHERE session_id = ?",
+                            [(t, session_id) for session_id, t in pings.items()])
+
+    def expire_sessions(self, timed_out_before: float, purge_before: float) -> List[Tuple[str, bytes]]:
+        """
+        Closes open sessions not pinged since timed_out_before (eg: their worker died), and deletes closed
+        sessions not pinged since purge_before.
+        :return: [(user_name, state), ...] of the sessions closed.
+        """
+        with self._connect() as con:
+            closed = con.execute("UPDATE sessions SET closed = 1 WHERE closed = 0 AND last_ping < ? "
+                                 "RETURNING user_name, state", (timed_out_before,)).fetchall()
+            con.execute("DELETE FROM sessions WHERE closed = 1 AND last_ping < ?", (purge_before,))
+        return closed
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # generated files
+    # ------------------------------------------------------------------------------------------------------------------
+    def get_file_m_time(self, key: str) -> Optional[float]:
+        row = self._connect().execute("SELECT m_time FROM generated_files WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_file_m_time(self, key: str, m_time: float):
+        with self._connect() as con:
+            con.execute("INSERT INTO generated_files (key, m_time) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET m_time = excluded.m_time", (key, m_time))
+
+
+class SharedSessionStore(SessionStore):
+    """
+    A SessionStore for many worker processes, that share sessions through a SharedStateDB.
+
+    Each worker keeps the sessions it serves in memory (as a SessionStore does), the shared db has every session:
+    its user, owner (the worker that last changed it), version and game state.
+
+    Notes:
+      - A session can be used from any worker. A worker that doesn't have the session, or whose copy is out of
+        date (another worker changed it since), adopts it: it makes a new game, applies the shared game state,
+        and becomes the owner.
+      - Each save publishes the game state to the shared db (one small row update), so the next worker to
+        adopt the session has it. Durable saves still go through the saver.
+      - With affinity (the proxy routes a session's requests to one worker) a worker trusts its own copy, so a
+        request for a session it has doesn't read the shared db. Without affinity, sessions work on any worker,
+        but a worker hop costs an adoption.
+      - Closing a session flushes the saver, so a login on another worker loads the latest game.
+      - Pings are written to the shared db in batches, by tick(). tick() also closes the sessions of workers
+        that went away, saving their last published state.
+      - max_sessions is for all workers, so it's checked against the shared db, not the worker's own count.
+      - A worker's copy of a session that another worker adopted (or closed) is dropped, when it's next used,
+        or by tick().
+    """
+    def __init__(self, shared: SharedStateDB, new_game: Callable[[str], GameState],
+                 affinity: bool = False, worker_id: str = None, **kwargs):
+        """
+        :param new_game: user_name -> a new GameState, that a session's shared game state is applied to.
+        :param affinity: True if a session's requests always go to the same worker.
+        :param worker_id: Unique to the worker, defaults to host and pid.
+        """
+        super().__init__(**kwargs)
+        self.shared = shared
+        self.new_game = new_game
+        self.affinity = affinity
+        self.worker_id = worker_id if worker_id is not None else f"{socket.gethostname()}-{os.getpid()}"
+        self._versions: Dict[str, int] = {}  # {session_id: the version of this worker's copy}
+        self._pinged: Set[str] = set()  # sessions pinged since the last tick
+        self._pinged_lock = threading.Lock()
+
+    def create_session(self, user_name: str, load_game: Callable) -> str:
+        with self._user_lock(user_name):
+            record = self.shared.get_user_session(user_name)
+            if record is not None:
+                # the user is already logged in, maybe on another worker
+                session = self._get_current(record)
+                if session is not None:
+                    self._ping(session)
+                    return session.session_id
+
+            if self.shared.count_open_sessions() >= self.max_sessions:
+                raise SessionException(None, "Server full, try again later.")
+
+            session_id = os.urandom(32).hex()
+            while self.shared.get_session(session_id) is not None:
+                logging.error(f"Randomly generated session ID already in use: user='{user_name}', session_id={session_id}")
+                session_id = os.urandom(32).hex()
+
+            game_state = load_game(user_name)  # will create a new game if first login
+            if not self.shared.insert_session(session_id, user_name, self.worker_id, game_state_to_bytes(game_state)):
+                # another worker logged the user in first
+                game_state.release()
+                session = self._get_current(self.shared.get_user_session(user_name))
+                if session is None:
+                    raise SessionException(None, "Login failed, try again.")
+                return session.session_id
+
+            session = Session(user_name, session_id, game_state)
+            try:
+                self._versions[session_id] = 1
+                self.add(session, check_full=False)
+            except BaseException:
+                self._versions.pop(session_id, None)
+                self.shared.delete_session(session_id)
+                game_state.release()
+                raise
+            return session_id
+
+    def get_active_session(self, session_id: str) -> Optional[Session]:
+        if session_id is None:
+            return None
+        session = self.get(session_id)
+        if self.affinity and session is not None:
+            session = super().get_active_session(session_id)
+        else:
+            record = self.shared.get_session(session_id)
+            if record is None or record.closed:
+                if session is not None:
+                    # closed by another worker, eg: the user logged out there
+                    self._detach(session)
+                return None
+            session = self._get_current(record)
+
+        if session is not None:
+            self._ping(session)
+        return session
+
+    def _ping(self, session: Session):
+        session.ping()
+        with self._pinged_lock:
+            self._pinged.add(session.session_id)
+
+    def _get_current(self, record: SessionRecord) -> Optional[Session]:
+        """
+        This worker's copy of a session, adopting it if this worker doesn't have the latest version.
+        Adopting loads a game, so async code should call this off the event loop.
+        :return: None if the session was closed.
+        """
+        for _ in range(3):
+            session = self.get(record.session_id)
+            if session is not None and session.is_open() and record.owner == self.worker_id and \
+                    self._versions.get(record.session_id) == record.version:
+                return session
+
+            # the game is loaded before the session is claimed, so a failed load leaves the owner's copy current
+            game_state = self.new_game(record.user_name)
+            version = None
+            try:
+                game_state.apply_save_data(game_state_from_bytes(record.state))
+                version = self.shared.claim_session(record.session_id, self.worker_id, record.version)
+                if version is not None:
+                    if session is not None:
+                        self._detach(session)
+                    adopted = Session(record.user_name, record.session_id, game_state)
+                    self._versions[record.session_id] = version
+                    self.add(adopted, check_full=False)
+                    return adopted
+            except BaseException:
+                if version is not None:
+                    self._versions.pop(record.session_id, None)
+                game_state.release()
+                raise
+
+            # changed since it was read (eg: saved by its owner), so try again with the latest
+            game_state.release()
+            record = self.shared.get_session(record.session_id)
+            if record is None or record.closed:
+                return None
+        raise SessionException(record.session_id, "Session busy, try again.")
+
+    def _detach(self, session: Session):
+        """
+        Drops this worker's copy of a session, without closing it (or saving it) in the shared db.
+        """
+        idx = self._shard(session.session_id)
+        with self._shard_locks[idx]:
+            if self._shards[idx].get(session.session_id) is session:
+                del self._shards[idx][session.session_id]
+                self._versions.pop(session.session_id, None)
+        if session.is_open():
+            session.on_save = None
+            session.close()
+
+    def _on_save(self, session: Session):
+        try:
+            data = game_state_to_bytes(session.game_state)
+            version = self.shared.update_session_state(session.session_id, self.worker_id, data)
+            if version is None:
+                # another worker adopted the session, so this copy is out of date (and dropped by tick)
+                logging.warning(f"Not saving a session owned by another worker: session_id={session.session_id}")
+                return
+            self._versions[session.session_id] = version
+            if self.saver is not None:
+                self.saver.save_bytes(session.user_name, data)
+        except Exception as e:
+            logging.error(f"Error saving game: user='{session.user_name}', error='{e}'")
+
+    def _on_close(self, session: Session):
+        super()._on_close(session)
+        if self._versions.pop(session.session_id, None) is not None:
+            # the next login may be on another worker, which loads the game from the saver's backend, so the
+            # save is written before the session is closed (rather than up to a flush_interval later).
+            if self.saver is not None:
+                self.saver.flush()
+            self.shared.close_session(session.session_id, self.worker_id)
+
+    def tick(self, now: float = None) -> List[Session]:
+        closed = super().tick(now)
+
+        # the pings since the last tick, as wall clock times (the session's pings are monotonic)
+        with self._pinged_lock:
+            pinged, self._pinged = self._pinged, set()
+        mono_now, wall_now = time.monotonic(), time.time()
+        pings = {}
+        for session_id in pinged:
+            session = self.get(session_id)
+            if session is not None and session.is_open():
+                pings[session_id] = wall_now - (mono_now - session._last_ping)
+        if len(pings) > 0:
+            self.shared.ping_sessions(pings)
+
+        # copies of sessions another worker has adopted (or closed) since, so they don't count as open here
+        held = {session_id: self.get(session_id) for session_id in list(self._versions)}
+        for session_id in self.shared.find_lost_sessions(self.worker_id, list(held)):
+            if held[session_id] is not None:
+                self._detach(held[session_id])
+
+        # sessions no worker has pinged (eg: their worker died)
+        abandoned = self.shared.expire_sessions(wall_now - self.time_out_in_minutes * 60,
+                                                wall_now - self.purge_time_in_minutes * 60)
+        if len(abandoned) > 0 and self.saver is not None:
+            for user_name, state in abandoned:
+                self.saver.save_bytes(user_name, state)
+            self.saver.flush()
+        return closed
@@ -2,15 +2,56 @@ from functools import lru_cache
 
 from PIL import Image, ImageDraw
 import numpy as np
-from typing import List
-from sympy import Point, Line
-
-def intersection(tp_line_a, tp_line_b):
-    a = Line(*tp_line_a)
-    b = Line(*tp_line_b)
-    q = a.intersection(b)[0]
-    # without the float(...), this returns sympy.core.numbers.something
-    return float(q.x), float(q.y)
+from typing import List, Tuple
+
+Point = Tuple[float, float]
+
+
+def intersection(tp_line_a, tp_line_b) -> Point:
+    """
+    The intersection of two (infinite) lines.
+    :param tp_line_a: A line as two points ((x1, y1), (x2, y2))
+    :param tp_line_b: A line as two points ((x1, y1), (x2, y2))
+    :return: The point (x, y)
+    """
+    (x1, y1), (x2, y2) = tp_line_a
+    (x3, y3), (x4, y4) = tp_line_b
+    denominator = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    if denominator == 0:
+        raise ValueError("The lines are parallel, so do not intersect at a single point.")
+    det_a = x1 * y2 - y1 * x2
+    det_b = x3 * y4 - y3 * x4
+    return (float((det_a * (x3 - x4) - (x1 - x2) * det_b) / denominator),
+            float((det_a * (y3 - y4) - (y1 - y2) * det_b) / denominator))
+
+
+def clip_polygon(poly: List[Point], x0: float, y0: float, x1: float, y1: float) -> List[Point]:
+    """
+    Clips a convex polygon to a rectangle (Sutherland-Hodgman).
+    :return: The clipped polygon, which may be empty.
+    """
+    # each edge as (axis, bound, keep if the value is >= the bound)
+    for axis, bound, keep_greater in ((0, x0, True), (0, x1, False), (1, y0, True), (1, y1, False)):
+        def inside(p):
+            return p[axis] >= bound if keep_greater else p[axis] <= bound
+
+        clipped = []
+        for i, p in enumerate(poly):
+            prev = poly[i - 1]
+            if inside(p) != inside(prev):
+                t = (bound - prev[axis]) / (p[axis] - prev[axis])
+                clipped.append((prev[0] + t * (p[0] - prev[0]), prev[1] + t * (p[1] - prev[1])))
+            if inside(p):
+                clipped.append(p)
+        poly = clipped
+    return poly
+
+
+def polygon_area(poly: List[Point]) -> float:
+    """
+    Area of a simple polygon (shoelace formula).
+    """
+    return abs(sum(a[0] * b[1] - b[0] * a[1] for a, b in zip(poly, poly[1:] + poly[:1]))) / 2
 
 
 class SingleVanishingPointPainting:
@@ -35,8 +76,7 @@ class SingleVanishingPointPainting:
         for step_f in range(self.view_dist):
             step_r = 0
             while True:
-                mask = self.draw_mask(step_f, step_r, threshold=0)
-                if mask is None:
+                if not self.is_tile_on_screen(step_f, step_r):
                     break
                 self.fov_table[step_f] = step_r
                 step_r += 1
@@ -81,8 +121,6 @@ class SingleVanishingPointPainting:
 
     @lru_cache()
     def get_tile_polygon(self, steps_fwd, steps_right):
-        # TODO: This takes a unexpectedly long time to compute, I may need to change intersection library.
-        #       For now, as there are only a few possible calls, the output is memoized.
         if steps_right == 0:
             # straddle the centre line
             p_line_1 = self.get_p_line(1, True)
@@ -101,6 +139,13 @@ class SingleVanishingPointPainting:
         d = intersection(p_line_1, h_line_2)
         return [a, b, c, d]
 
+    def is_tile_on_screen(self, steps_fwd, steps_right) -> bool:
+        """
+        True if any of a tile's polygon is on screen (ie: draw_mask(...) would not return None).
+        """
+        visible = clip_polygon(self.get_tile_polygon(steps_fwd, steps_right), 0, 0, self.width, self.height)
+        return len(visible) > 2 and polygon_area(visible) > 0
+
     def get_sprite_scale(self, steps_fwd: float) -> float:
         """
         Gets the sprite scale for a sprite according to its distance.
@@ -0,0 +1,153 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple, Callable, Optional
+
+import numpy as np
+
+from game_engine.map import MapABC, AssetLut
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from mam_game.mam_constants import Direction
+
+# (steps_f, steps_r, css_class)
+GroundRenderItem = Tuple[int, int, str]
+# (bottom_per, left_per, scale, css_class)
+EnvRenderItem = Tuple[float, float, float, str]
+
+
+class ViewKernel:
+    """
+    Everything needed to render a first person view that does not depend on the map, for one facing.
+    Every array has one entry per visible tile, in draw order (furthest row first, then left to right).
+
+    Notes:
+      - A frame is then just a gather of the map at (x + dx, y + dy), see build_render_lists(...)
+      - Build these via get_view_kernel(...), which caches them.
+    """
+    def __init__(self, svp: SingleVanishingPointPainting, facing: Direction):
+        self.facing = facing
+        steps = [(step_f, step_r) for step_f in reversed(range(svp.view_dist))
+                 for step_r in range(-svp.fov_table[step_f], svp.fov_table[step_f] + 1)]
+        self.steps_f = np.array([f for f, _ in steps], dtype=int)
+        self.steps_r = np.array([r for _, r in steps], dtype=int)
+
+        # map offsets, see: GameState.get_tile(...)
+        fwd, right = facing.as_vec(), facing.right().as_vec()
+        self.dx = self.steps_f * fwd[0] + self.steps_r * right[0]
+        self.dy = self.steps_f * fwd[1] + self.steps_r * right[1]
+
+        # screen space, as (num_tiles, 4 points, xy)
+        self.polygons = np.array([svp.get_tile_polygon(f, r) for f, r in steps], dtype=float).reshape(-1, 4, 2)
+
+        # where an env sprite sits on screen.
+        # TODO: the scale is only a simplified scale taken at the base of the polygon.
+        self.env_bottom_per = self.polygons[:, :, 1].max(axis=1) / svp.height
+        self.env_left_per = self.polygons[:, :2, 0].min(axis=1) / svp.width
+        self.env_scale = np.array([svp.get_sprite_scale(f) * 1.3 for f in self.steps_f.tolist()])
+
+        # the render list entries, less the css class
+        self.ground_items: List[Tuple[int, int]] = steps
+        self.env_items: List[Tuple[float, float, float]] = list(zip(self.env_bottom_per.tolist(),
+                                                                    self.env_left_per.tolist(),
+                                                                    self.env_scale.tolist()))
+
+    def __len__(self):
+        return len(self.ground_items)
+
+
+@lru_cache(maxsize=64)
+def get_view_kernel(svp: SingleVanishingPointPainting, facing: Direction) -> ViewKernel:
+    return ViewKernel(svp, facing)
+
+
+def lut_to_array(lut: AssetLut, to_value: Callable[[str], Optional[str]]) -> np.ndarray:
+    """
+    Converts an AssetLut (of integer keys) to an object array, so it can be indexed by a numpy array.
+    :param lut: The lut, keys that are not integers are ignored.
+    :param to_value: Converts a (not None) slug to the value stored, eg: a css class.
+    :return: An object array, None where the lut has no entry (or the entry is None).
+    """
+    keys = [k for k in lut.keys() if isinstance(k, (int, np.integer)) and k >= 0]
+    table = np.full(max(keys, default=-1) + 1, None, dtype=object)
+    for k in keys:
+        table[k] = to_value(lut[k]) if lut[k] is not None else None
+    return table
+
+
+def lookup(table: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Vectorised table[values], None where a value is not in the table.
+    """
+    values = np.asarray(values, dtype=np.intp)
+    in_table = (values >= 0) & (values < len(table))
+    out = np.full(len(values), None, dtype=object)
+    out[in_table] = table[values[in_table]]
+    return out
+
+
+_css_class_luts: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+
+
+def get_css_class_luts(pack, the_map: MapABC) -> Dict[str, np.ndarray]:
+    """
+    The map's luts, converted to css classes (of the sprites idle animation) for fast lookup.
+    These are cached per map, see clear_css_class_luts(...) if the pack changes.
+    :param pack: The ResourcePack the luts slugs refer to.
+    :return: {layer_name: css class array}
+    """
+    key = (pack.name, the_map.name)
+    if key not in _css_class_luts:
+        _css_class_luts[key] = {lut.name: lut_to_array(lut, lambda slug: pack[slug].idle_animation['class'])
+                                for lut in the_map.luts}
+    return _css_class_luts[key]
+
+
+def clear_css_class_luts(pack_name: str = None):
+    """
+    :param pack_name: Only clear the luts for this pack (None for all).
+    """
+    for key in [k for k in _css_class_luts if pack_name is None or k[0] == pack_name]:
+        del _css_class_luts[key]
+
+
+def build_view_slots(the_map: MapABC, x: int, y: int, facing: Direction,
+                     svp: SingleVanishingPointPainting,
+                     css_class_luts: Dict[str, np.ndarray]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """
+    The css class of the ground and env sprite at each of the view's tiles (its slots).
+    A slot is a fixed place on screen, the same for every position and facing, see: ViewKernel.ground_items
+    :param css_class_luts: see get_css_class_luts(...)
+    :return: ground_slots, env_slots (both in draw order, None where there is nothing to draw)
+    """
+    kernel = get_view_kernel(svp, facing)
+    xs, ys = kernel.dx + x, kernel.dy + y
+
+    on_map, ground = the_map.gather(xs, ys, "ground")
+    _, env = the_map.gather(xs, ys, "env")
+    # tiles off the map are empty slots
+    ground_classes = np.full(len(kernel), None, dtype=object)
+    env_classes = np.full(len(kernel), None, dtype=object)
+    ground_classes[on_map] = lookup(css_class_luts["ground"], ground)
+    env_classes[on_map] = lookup(css_class_luts["env"], env)
+    return ground_classes.tolist(), env_classes.tolist()
+
+
+def diff_view_slots(old_slots: List[Optional[str]], new_slots: List[Optional[str]]) -> List[Tuple[int, Optional[str]]]:
+    """
+    :return: [(slot, new css class), ...] for the slots that changed.
+    """
+    return [(i, new) for i, (old, new) in enumerate(zip(old_slots, new_slots)) if old != new]
+
+
+def build_render_lists(the_map: MapABC, x: int, y: int, facing: Direction,
+                       svp: SingleVanishingPointPainting,
+                       css_class_luts: Dict[str, np.ndarray]) -> Tuple[List[GroundRenderItem], List[EnvRenderItem]]:
+    """
+    Works out the sprites needed to render the view from a map position.
+    :param css_class_luts: see get_css_class_luts(...)
+    :return: ground_render_list, env_render_list (both in draw order)
+    """
+    kernel = get_view_kernel(svp, facing)
+    ground_slots, env_slots = build_view_slots(the_map, x, y, facing, svp, css_class_luts)
+
+    ground_render_list = [item + (c,) for item, c in zip(kernel.ground_items, ground_slots) if c is not None]
+    env_render_list = [item + (c,) for item, c in zip(kernel.env_items, env_slots) if c is not None]
+    return ground_render_list, env_render_list
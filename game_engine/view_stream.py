@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+
+from game_engine.map import MapABC
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.view_kernel import build_view_slots, diff_view_slots, get_css_class_luts
+from mam_game.mam_constants import Direction
+
+
+class ViewStream:
+    """
+    The view of one client (eg: a websocket, see: /game/ws), sent as messages that only carry what changed.
+
+    The client has a div per view slot (see: build_view_slots), so a move is a change of class on a few divs,
+    rather than a re-rendered page.
+
+    Messages are dicts (sent as json):
+        {"type": "full" | "diff",
+         "map": map name,
+         "pos": [x, y, facing],
+         "ground": [[slot, class id or None], ...],
+         "env": [[slot, class id or None], ...],
+         "classes": {class id: css class}}   # only the classes this client has not been sent yet
+
+    A "full" message (the first, or after a change of map) has every slot.
+    """
+    def __init__(self, svp: SingleVanishingPointPainting):
+        self.svp = svp
+        self._map_name: str = None
+        self._ground_slots: List[Optional[str]] = None
+        self._env_slots: List[Optional[str]] = None
+        self._class_ids: Dict[str, int] = {}
+
+    def update(self, pack, the_map: MapABC, x: int, y: int, facing: Direction) -> dict:
+        """
+        The message that brings the client's view up to date with the position.
+        :param pack: The ResourcePack the map's luts refer to.
+        """
+        ground_slots, env_slots = build_view_slots(the_map, x, y, facing, self.svp, get_css_class_luts(pack, the_map))
+
+        if self._map_name != the_map.name:
+            msg_type = "full"
+            ground_changes, env_changes = list(enumerate(ground_slots)), list(enumerate(env_slots))
+        else:
+            msg_type = "diff"
+            ground_changes = diff_view_slots(self._ground_slots, ground_slots)
+            env_changes = diff_view_slots(self._env_slots, env_slots)
+        self._map_name, self._ground_slots, self._env_slots = the_map.name, ground_slots, env_slots
+
+        new_classes = {}
+        msg = {"type": msg_type,
+               "map": the_map.name,
+               "pos": [x, y, str(facing)],
+               "ground": [[slot, self._get_class_id(c, new_classes)] for slot, c in ground_changes],
+               "env": [[slot, self._get_class_id(c, new_classes)] for slot, c in env_changes]}
+        if len(new_classes) > 0:
+            msg["classes"] = new_classes
+        return msg
+
+    def _get_class_id(self, css_class: Optional[str], new_classes: Dict[int, str]) -> Optional[int]:
+        # css classes are long, and repeat, so each is sent once and then referred to by id.
+        if css_class is None:
+            return None
+        class_id = self._class_ids.get(css_class)
+        if class_id is None:
+            class_id = self._class_ids[css_class] = len(self._class_ids)
+            new_classes[class_id] = css_class
+        return class_id
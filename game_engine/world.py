@@ -37,6 +37,9 @@ class World:
     def get_default_map(self):
         return self._maps[self.default_map]
 
+    def get_map(self, map_name: str):
+        return self._maps[map_name]
+
     def get_spawn_info(self):
         return 14, 52, Direction.NORTH, self.get_default_map()
 
@@ -69,6 +69,25 @@ class DifferenceTable(ABC, collections.abc.Sequence):
     def get_reference_row_by_idx(self, row_index):
         pass
 
+    # The storage of the differences, override these to store them in something other than a list of dicts.
+    def _get_diff(self, row_index: int) -> Dict[int, Any]:
+        """
+        The differences for a row, as {col_idx: value}. Treat as read only.
+        """
+        return self._table[row_index]
+
+    def _set_diff(self, row_index: int, diff: Dict[int, Any]):
+        self._table[row_index] = diff
+
+    def _set_diff_cell(self, row_index: int, col_idx: int, value, is_reference_value: bool):
+        if is_reference_value:
+            self._table[row_index].pop(col_idx, None)
+        else:
+            self._table[row_index][col_idx] = value
+
+    def _num_rows(self) -> int:
+        return len(self._table)
+
     @abstractmethod
     def get_reference_row(self, row_index):
         pass
@@ -87,7 +106,7 @@ class DifferenceTable(ABC, collections.abc.Sequence):
             if row is not None:
                 return row
 
-        this_row = self._table[row_index]
+        this_row = self._get_diff(row_index)
         reference_row_by_idx = self.get_reference_row_by_idx(row_index)
         id_2_col = self._id_to_column_lut
         row = {id_2_col[q]: this_row[q] if q in this_row.keys() else reference_row_by_idx[q]
@@ -99,7 +118,7 @@ class DifferenceTable(ABC, collections.abc.Sequence):
 
     def _get_cell(self, row_index, col_name):
         col_idx = self._column_to_id_lut[col_name]
-        this_row = self._table[row_index]
+        this_row = self._get_diff(row_index)
         if col_idx in this_row:
             return this_row[col_idx]
 
@@ -118,7 +137,7 @@ class DifferenceTable(ABC, collections.abc.Sequence):
         with self._lock:
             if isinstance(key, slice):
                 # get multiple rows
-                return [self._get_row(idx) for idx in range(len(self._table))[key]]
+                return [self._get_row(idx) for idx in range(self._num_rows())[key]]
             if isinstance(key, int):
                 # get the whole row
                 row_index = int(key)
@@ -140,14 +159,14 @@ class DifferenceTable(ABC, collections.abc.Sequence):
                 assert isinstance(row, dict)
                 # cols not in row will remain unaltered
                 # self._table[row_index] = self._table[row_index] | self._calc_row_difference_indexed(row_index)
-                self._table[row_index] = self._calc_row_difference_indexed(row, row_index)
+                self._set_diff(row_index, self._calc_row_difference_indexed(row, row_index))
             else:
                 # set a single cell eg: table[21, "name"] = "john"
                 value = row_or_value
                 row_index, col_name = key
                 col_idx = self._column_to_id_lut[col_name]
-                if self.get_reference_row_by_idx(row_index)[col_idx] != value:
-                    self._table[int(row_index)][col_idx] = value
+                is_reference_value = self.get_reference_row_by_idx(row_index)[col_idx] == value
+                self._set_diff_cell(int(row_index), col_idx, value, is_reference_value)
 
             # remove the cached version
             if self._lru_cache is not None:
@@ -156,7 +175,7 @@ class DifferenceTable(ABC, collections.abc.Sequence):
 
     def __len__(self) -> int:
         with self._lock:
-            return len(self._table)
+            return self._num_rows()
 
     def print(self, max_rows=10):
         print(", ".join(self.col_headings)) # col headings is in index order.
@@ -171,20 +190,90 @@ class DifferenceTable(ABC, collections.abc.Sequence):
             print(", ".join([str(row[h]).rjust(len(h)) for h in self.col_headings]))
 
     def get_difference_table(self):
-        return [{self._id_to_column_lut[k_idx]: val for k_idx, val in row.items()} for row in self._table]
+        return [{self._id_to_column_lut[k_idx]: val for k_idx, val in self._get_diff(i).items()}
+                for i in range(self._num_rows())]
 
 
 class InstanceTable(DifferenceTable):
-    def __init__(self, reference_table: Union[List[Dict[str, Any]], DifferenceTable], lru_cache_size: int = 1_000):
-        # TODO: internalise with a list of lists, not a list of dicts.
-        #       but do so in a way that does not destroy: InstanceTable(ArchetypedTable(map.tiles))
-        #       see stub for ICantBelieveItsNotAListOfDicts
+    def __init__(self, reference_table: Union[List[Dict[str, Any]], DifferenceTable], lru_cache_size: int = 0):
+        """
+        A copy-on-write overlay of a reference table (eg: one per session, over a shared map).
+        Only rows that differ from the reference table are stored (sparse), so memory is proportional
+        to the changes made, not the size of the table.
+        :param lru_cache_size: size of lru cache, 0 to disable (the default, as unaltered rows come straight
+                               from the reference table, which usually has its own cache).
+        """
         self._reference_table = reference_table
         col_names = []
         if len(reference_table) > 0:
             col_names = list(reference_table[0].keys())
-        super().__init__(col_names)
-        self._table = [{} for _ in range(len(reference_table))]
+        super().__init__(col_names, lru_cache_size)
+        self._length = len(reference_table)
+        self._diffs: Dict[int, Dict[int, Any]] = {}  # row_index -> {col_idx: value}, only for altered rows.
+        self._reference_is_a_table = hasattr(reference_table, "col_headings")  # ie: supports table[row, col]
+
+    def _row_index(self, row_index: int) -> int:
+        # list like indexing, eg: table[-1]
+        if row_index < 0:
+            row_index += self._length
+        if not (0 <= row_index < self._length):
+            raise IndexError("InstanceTable index out of range")
+        return row_index
+
+    def _get_diff(self, row_index: int) -> Dict[int, Any]:
+        return self._diffs.get(self._row_index(row_index), _EMPTY_DIFF)
+
+    def _set_diff(self, row_index: int, diff: Dict[int, Any]):
+        row_index = self._row_index(row_index)
+        if len(diff) > 0:
+            self._diffs[row_index] = diff
+        else:
+            self._diffs.pop(row_index, None)
+
+    def _set_diff_cell(self, row_index: int, col_idx: int, value, is_reference_value: bool):
+        row_index = self._row_index(row_index)
+        diff = self._diffs.get(row_index)
+        if is_reference_value:
+            if diff is not None:
+                diff.pop(col_idx, None)
+                if len(diff) == 0:
+                    del self._diffs[row_index]
+        elif diff is None:
+            self._diffs[row_index] = {col_idx: value}
+        else:
+            diff[col_idx] = value
+
+    def _num_rows(self) -> int:
+        return self._length
+
+    def _get_row(self, row_index: int):
+        if self._get_diff(row_index) is _EMPTY_DIFF:
+            # unaltered, so no merge needed.
+            return self._reference_table[row_index]
+        return super()._get_row(row_index)
+
+    def _get_cell(self, row_index, col_name):
+        if self._get_diff(row_index) is _EMPTY_DIFF and self._reference_is_a_table:
+            return self._reference_table[row_index, col_name]
+        return super()._get_cell(row_index, col_name)
+
+    def num_altered_rows(self) -> int:
+        return len(self._diffs)
+
+    def altered_rows(self) -> Iterable[int]:
+        return self._diffs.keys()
+
+    def is_altered(self, row_index: int) -> bool:
+        return row_index in self._diffs
+
+    def get_altered_rows(self) -> Dict[int, Dict[str, Any]]:
+        """
+        The differences from the reference table, for just the altered rows (cf: get_difference_table).
+        :return: {row_index: {col_name: value}}
+        """
+        with self._lock:
+            return {row_index: {self._id_to_column_lut[col_idx]: val for col_idx, val in diff.items()}
+                    for row_index, diff in self._diffs.items()}
 
     def get_reference_row_by_idx(self, row_index):
         row = self._reference_table[row_index]
@@ -194,6 +283,10 @@ class InstanceTable(DifferenceTable):
         return self._reference_table[row_index]
 
 
+# shared by all InstanceTables, for rows with no differences
+_EMPTY_DIFF: Dict[int, Any] = {}
+
+
 class ArchetypedTable(DifferenceTable):
     def __init__(self, default_row_or_existing_table: Union[Dict[str, Any], List[Dict[str, Any]]],
                  initial_table_length=0, lru_cache_size: int = 1_000):
@@ -234,6 +327,42 @@ class ArchetypedTable(DifferenceTable):
         if len(self.col_headings) != len(self._default_row):
             raise KeyError("Not all column headings in the table were unique.")
 
+    @staticmethod
+    def from_columns(columns: Dict[str, Iterable], lru_cache_size: int = 1_000):
+        """
+        Creates a table from columns of values (eg: numpy arrays), rather than a list of rows.
+        This is much faster than ArchetypedTable(list_of_dicts), as rows are never built as dicts.
+        :param columns: {column_name: values}, all of the same length. The column order is kept.
+        """
+        # plain python values (not numpy scalars), so the table works as usual. eg: json.dumps(...)
+        columns = {k: (v.tolist() if hasattr(v, "tolist") else list(v)) for k, v in columns.items()}
+        lengths = set(len(v) for v in columns.values())
+        if len(lengths) != 1:
+            raise ValueError("All columns must be the same length.")
+        num_rows = lengths.pop()
+        if num_rows == 0:
+            raise ValueError("Can not determine a default row for a table with no rows.")
+
+        default_row = {key: statistics.mode(values) for key, values in columns.items()}
+        table = ArchetypedTable(default_row, num_rows, lru_cache_size)
+        for col_idx, (key, values) in enumerate(columns.items()):
+            default_value = default_row[key]
+            for row_idx, v in enumerate(values):
+                if v != default_value:
+                    table._table[row_idx][col_idx] = v
+        return table
+
+    def get_columns(self) -> Dict[str, List]:
+        """
+        The table as columns, ie: {column_name: [values]}
+        """
+        with self._lock:
+            columns = {}
+            for col_idx, key in self._id_to_column_lut.items():
+                default_value = self._default_row_by_idx[col_idx]
+                columns[key] = [row.get(col_idx, default_value) for row in self._table]
+            return columns
+
     def get_reference_row_by_idx(self, row_index):
         return self._default_row_by_idx
 
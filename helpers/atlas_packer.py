@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple, Optional, Sequence
+
+from PIL import Image
+
+
+@dataclass
+class _Shelf:
+    y: int
+    height: int
+    x: int = 0  # the used width
+
+
+@dataclass
+class _Bin:
+    width: int
+    max_height: int
+    shelves: List[_Shelf] = field(default_factory=list)
+
+    def height(self) -> int:
+        return self.shelves[-1].y + self.shelves[-1].height if len(self.shelves) > 0 else 0
+
+    def add(self, w: int, h: int) -> Optional[Tuple[int, int]]:
+        """
+        Adds a rectangle, to the first shelf it fits on (or a new shelf).
+        :return: The (x, y) position, or None if it does not fit.
+        """
+        for shelf in self.shelves:
+            if h <= shelf.height and shelf.x + w <= self.width:
+                pos = (shelf.x, shelf.y)
+                shelf.x += w
+                return pos
+        if w <= self.width and self.height() + h <= self.max_height:
+            shelf = _Shelf(self.height(), h, w)
+            self.shelves.append(shelf)
+            return 0, shelf.y
+        return None
+
+    def copy(self) -> '_Bin':
+        return _Bin(self.width, self.max_height, [_Shelf(s.y, s.height, s.x) for s in self.shelves])
+
+
+class ShelfPacker:
+    """
+    Packs rectangles into one or more bins (eg: textures of an atlas), using the shelf algorithm.
+
+    Notes:
+      - Rectangles are packed in groups, and a group is always packed into a single bin. This keeps (for example)
+        the frames of an animation on the same texture.
+      - Packing is best if groups are added tallest first.
+    """
+    def __init__(self, max_size: Tuple[int, int] = (2048, 2048)):
+        self.max_width, self.max_height = max_size
+        self.bins: List[_Bin] = []
+
+    def add_group(self, sizes: Sequence[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        """
+        Packs a group of rectangles into the same bin.
+        :param sizes: [(w, h), ...]
+        :return: [(bin_index, x, y), ...] for each rectangle.
+        """
+        # try the existing bins, then a new one (that may need to be larger than max_size).
+        for bin_idx in range(len(self.bins) + 1):
+            if bin_idx == len(self.bins):
+                self.bins.append(_Bin(max(self.max_width, max(w for w, _ in sizes)),
+                                      max(self.max_height, sum(h for _, h in sizes))))
+            trial = self.bins[bin_idx].copy()
+            positions = [trial.add(w, h) for w, h in sizes]
+            if all(p is not None for p in positions):
+                self.bins[bin_idx] = trial
+                return [(bin_idx, x, y) for x, y in positions]
+        raise AssertionError("unreachable, a new bin always fits the group")
+
+    def get_bin_sizes(self) -> List[Tuple[int, int]]:
+        """
+        The size of each bin, trimmed to the used area.
+        """
+        return [(max([s.x for s in b.shelves], default=1), max(b.height(), 1)) for b in self.bins]
+
+
+def pack_images(groups: Sequence[Sequence[Image.Image]],
+                max_size: Tuple[int, int] = (2048, 2048)) -> Tuple[List[Image.Image], List[List[Tuple[int, int, int]]]]:
+    """
+    Packs groups of images into as few atlas images as the max_size allows.
+    :param groups: Groups of images, each group is packed into the same atlas.
+    :return: (atlases, positions), where positions[group][image] = (atlas_index, x, y)
+    """
+    packer = ShelfPacker(max_size)
+
+    # tallest groups first, but keep the positions in the order given.
+    order = sorted(range(len(groups)), key=lambda i: -max((img.height for img in groups[i]), default=0))
+    positions: List[List[Tuple[int, int, int]]] = [[] for _ in groups]
+    for i in order:
+        if len(groups[i]) > 0:
+            positions[i] = packer.add_group([img.size for img in groups[i]])
+
+    atlases = [Image.new("RGBA", size, (0, 0, 0, 0)) for size in packer.get_bin_sizes()]
+    for group, group_positions in zip(groups, positions):
+        for img, (atlas_idx, x, y) in zip(group, group_positions):
+            atlases[atlas_idx].paste(img.convert("RGBA"), (x, y))
+    return atlases, positions
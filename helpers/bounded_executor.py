@@ -0,0 +1,96 @@
+import asyncio
+import concurrent.futures
+from typing import Any, Callable, Dict, Hashable
+
+
+class ExecutorBusyError(Exception):
+    """
+    Raised when an executor's queue is full, so the caller can shed load (eg: with a 503) rather than queue forever.
+    """
+    def __init__(self, name: str, max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        super().__init__(f"Executor busy: executor={name}, max_pending={max_pending}")
+
+
+class BoundedExecutor:
+    """
+    Runs blocking work (rendering, parsing, file io) off the event loop, in a pool of a bounded size.
+
+    Notes:
+      - At most max_workers jobs run at once, and at most max_pending wait for a worker. After that, run(...)
+        raises ExecutorBusyError (backpressure), so a burst of slow work can't build an unbounded queue.
+      - Jobs with the same key are single-flight, eg: two requests for the same missing file share one regeneration.
+      - With use_processes the job (and its arguments) must be picklable.
+    """
+    def __init__(self, name: str, max_workers: int = 4, max_pending: int = 64, use_processes: bool = False):
+        """
+        :param max_workers: The size of the pool.
+        :param max_pending: The max number of jobs waiting for a worker (not counting the running ones).
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self._pool: concurrent.futures.Executor = None
+        self._num_jobs = 0  # running or waiting
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    def _get_pool(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.use_processes:
+                self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                   thread_name_prefix=self.name)
+        return self._pool
+
+    @property
+    def num_jobs(self) -> int:
+        return self._num_jobs
+
+    async def run(self, fn: Callable, *args, key: Hashable = None) -> Any:
+        """
+        Runs fn(*args) in the pool, and waits for the result without blocking the event loop.
+        :param key: Jobs with an equal key (that overlap in time) are run once, and share the result.
+        :raises ExecutorBusyError: If max_workers + max_pending jobs are already running or waiting.
+        """
+        if key is not None and key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        if self._num_jobs >= self.max_workers + self.max_pending:
+            raise ExecutorBusyError(self.name, self.max_pending)
+
+        future = asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+        self._num_jobs += 1
+        if key is not None:
+            self._in_flight[key] = future
+
+        def _done(_):
+            # when the job finishes, even if the request that started it was cancelled
+            self._num_jobs -= 1
+            if key is not None and self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        future.add_done_callback(_done)
+
+        # shielded, so a cancelled request (eg: the client went away) doesn't cancel a job others wait on
+        return await asyncio.shield(future)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+async def read_bytes(executor: BoundedExecutor, path: str) -> bytes:
+    def _read():
+        with open(path, "rb") as f:
+            return f.read()
+    return await executor.run(_read)
+
+
+async def read_text(executor: BoundedExecutor, path: str, encoding: str = "utf-8") -> str:
+    def _read():
+        with open(path, "rt", encoding=encoding) as f:
+            return f.read()
+    return await executor.run(_read)
@@ -0,0 +1,162 @@
+import collections.abc
+from typing import Dict, Any, List, Union, Tuple, Iterable
+
+import numpy as np
+
+
+def _smallest_int_dtype(values: np.ndarray) -> np.dtype:
+    """
+    The smallest integer dtype that can hold all the values.
+    """
+    if len(values) == 0:
+        return np.dtype(np.int64)
+    return np.promote_types(np.min_scalar_type(values.min()), np.min_scalar_type(values.max()))
+
+
+def _value_dtype(value) -> np.dtype:
+    """
+    The dtype that holds a value exactly, eg: a python float is a float64 (np.min_scalar_type(1.1) is float16).
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return np.dtype(bool)
+    if isinstance(value, float):
+        return np.dtype(np.float64)
+    if isinstance(value, np.inexact):
+        return value.dtype
+    return np.min_scalar_type(value)
+
+
+def as_column(values: Iterable) -> np.ndarray:
+    """
+    Converts values to a typed 1D array, eg: [0, 1, 2] -> uint8, [True, False] -> bool.
+    Anything not numeric (eg: None or str) is stored as an object array.
+    """
+    column = np.asarray(values)
+    column = column.reshape(-1)
+    if column.dtype.kind in "iu":
+        return column.astype(_smallest_int_dtype(column))
+    if column.dtype.kind in "bf":
+        return column.copy()
+
+    # mixed, or non numeric values
+    obj_column = np.empty(len(column), dtype=object)
+    obj_column[:] = column.tolist()
+    return obj_column
+
+
+class ColumnarTable(collections.abc.Sequence):
+    """
+    A table that stores one typed numpy array per column.
+    Has the same interface as DifferenceTable (table[row], table[row, col], etc), so is a drop-in for
+    ArchetypedTable, and can be the reference table for an InstanceTable.
+
+    Notes:
+      - Reading a cell is O(1), and no dict is built (unlike reading a row).
+      - Columns can be read (and sliced, reshaped, etc) as numpy arrays, via column(...)
+    """
+    def __init__(self, columns: Dict[str, Iterable]):
+        """
+        :param columns: {column_name: values}, all of the same length. The column order is kept.
+        """
+        self._columns: Dict[str, np.ndarray] = {k: as_column(v) for k, v in columns.items()}
+        lengths = set(len(v) for v in self._columns.values())
+        if len(lengths) > 1:
+            raise ValueError("All columns must be the same length.")
+
+        self.col_headings = list(self._columns.keys())
+        self._num_rows = lengths.pop() if len(lengths) > 0 else 0
+
+        # not used, but keeps the interface of a DifferenceTable
+        self.lru_cache_size = 0
+
+    @staticmethod
+    def from_arrays(columns: Dict[str, np.ndarray]) -> 'ColumnarTable':
+        """
+        Creates a table that uses the (1D, typed) arrays as is, without converting or copying them.
+        eg: arrays from np.frombuffer(...), read only arrays are copied on the first write.
+        """
+        table = ColumnarTable({})
+        table._columns = dict(columns)
+        lengths = set(len(v) for v in table._columns.values())
+        if len(lengths) > 1:
+            raise ValueError("All columns must be the same length.")
+        table.col_headings = list(table._columns.keys())
+        table._num_rows = lengths.pop() if len(lengths) > 0 else 0
+        return table
+
+    def column(self, col_name: str) -> np.ndarray:
+        """
+        A column, as a (read only) numpy array.
+        """
+        view = self._columns[col_name].view()
+        view.flags.writeable = False
+        return view
+
+    def get_columns(self) -> Dict[str, List]:
+        """
+        The table as columns, ie: {column_name: [values]}
+        """
+        return {k: v.tolist() for k, v in self._columns.items()}
+
+    def _get_row(self, row_index: int) -> Dict[str, Any]:
+        return {k: v.item(row_index) for k, v in self._columns.items()}
+
+    def __getitem__(self, key: Union[int, slice, Tuple]):
+        """
+        Gets a row, or value from a row.
+        :param key:
+            table[21] returns {...row 21's data...}
+            table[21, "height"] returns the height col for row 21.
+        """
+        if isinstance(key, slice):
+            return [self._get_row(idx) for idx in range(self._num_rows)[key]]
+        if isinstance(key, (int, np.integer)):
+            return self._get_row(int(key))
+        try:
+            row_index, col_name = key
+        except (ValueError, TypeError):
+            raise KeyError(key)
+        return self._columns[col_name].item(row_index)
+
+    def _set_cell(self, row_index: int, col_name: str, value):
+        column = self._columns[col_name]
+        if not column.flags.writeable:
+            # eg: a column from ColumnarTable.from_arrays(...)
+            column = column.copy()
+            self._columns[col_name] = column
+        if column.dtype != object:
+            value_dtype = _value_dtype(value)
+            if (value_dtype == bool) != (column.dtype == bool):
+                # True isn't 1, so a bool in a number column (or a number in a bool column) is a change of type
+                column = column.astype(object)
+                self._columns[col_name] = column
+            elif not np.can_cast(value_dtype, column.dtype):
+                # widen the column to fit the new value (eg: uint8 -> int16)
+                if value_dtype.kind in "iufc":
+                    column = column.astype(np.promote_types(column.dtype, value_dtype))
+                else:
+                    column = column.astype(object)
+                self._columns[col_name] = column
+        column[row_index] = value
+
+    def __setitem__(self, key: Union[int, Tuple], row_or_value):
+        if isinstance(key, (int, np.integer)):
+            # set multiple (or all) columns in a row eg: table[21] = {name: "john", age: 21, height: 186}
+            assert isinstance(row_or_value, dict)
+            for col_name, value in row_or_value.items():
+                self._set_cell(int(key), col_name, value)
+        else:
+            # set a single cell eg: table[21, "name"] = "john"
+            row_index, col_name = key
+            self._set_cell(int(row_index), col_name, row_or_value)
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Bytes used by each column (object columns only count the pointers), and the "total".
+        """
+        report = {k: int(v.nbytes) for k, v in self._columns.items()}
+        report["total"] = sum(report.values())
+        return report
@@ -1,5 +1,8 @@
+import re
 from enum import Enum
-from typing import Literal, List, Tuple, NamedTuple
+from typing import Literal, List, Tuple, NamedTuple, Dict, Union
+
+import numpy as np
 
 
 def read_int(f,
@@ -167,3 +170,145 @@ _data_readers = {
         "uint32": lambda f: read_int(f, bytes_per_int=4, signed=False),
         # "str":          lambda f: read_string(f)
     }
+
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Compiled record readers
+#   - The functions above read one value at a time, these read n records with one f.read() and a numpy dtype.
+#   - A record format is the same as read_dict, eg: [("file_id", "uint16"), ("offset", "uint24"), ("_", "byte")]
+#     or (like read_list) a list of types, eg: "uint32,uint16,byte"
+#   - Types: byte, uint16, uint24, uint32, str<size> (a fixed length string), with an optional count,
+#     eg: "byte[16]" for an array of values.
+# ----------------------------------------------------------------------------------------------------------------------
+
+_record_types = {
+    "byte": np.dtype("u1"),
+    "uint16": np.dtype("<u2"),
+    "uint32": np.dtype("<u4"),
+}
+
+_record_type_regex = re.compile(r"^(?P<type>[a-z]+[0-9]*)(\[(?P<count>[0-9]+)\])?$")
+
+
+class RecordFormat:
+    def __init__(self, record_format: Union[str, List[str], List[Tuple[str, str]]]):
+        """
+        A record format, precompiled to a numpy structured dtype.
+        Use compile_record_format(...), which caches the compiled formats.
+        """
+        if type(record_format) == str:
+            record_format = [s.strip() for s in record_format.split(",")]
+        record_format = [f if isinstance(f, tuple) else (f"f{i}", f) for i, f in enumerate(record_format)]
+
+        raw_fields = []
+        self.fields: List[Tuple[str, str, int]] = []  # name, type, count (None for a scalar)
+        for i, (name, data_type) in enumerate(record_format):
+            match = _record_type_regex.match(data_type.strip())
+            if match is None:
+                raise ValueError(f"unknown data format: {data_type}")
+            data_type, count = match["type"], match["count"]
+            count = int(count) if count is not None else None
+            shape = () if count is None else (count, )
+
+            if name in [f[0] for f in self.fields]:
+                raise ValueError(f"named data item listed more than once: {name}")
+
+            if data_type in _record_types:
+                raw_fields.append((name, _record_types[data_type], shape))
+            elif data_type == "uint24":
+                raw_fields.append((name, np.dtype("u1"), shape + (3, )))
+            elif data_type.startswith("str") and data_type[3:].isdigit():
+                raw_fields.append((name, np.dtype(f"S{data_type[3:]}"), shape))
+            else:
+                raise ValueError(f"unknown data format: {data_type}")
+
+            if name == "_":
+                # padding, which is read but not returned
+                raw_fields[-1] = (f"_{i}", ) + raw_fields[-1][1:]
+            else:
+                self.fields.append((name, data_type, count))
+
+        self.raw_dtype = np.dtype(raw_fields)
+        self.size = self.raw_dtype.itemsize
+
+        # the dtype of records returned, ie: uint24 widened to uint32 and padding removed.
+        self.dtype = np.dtype([(name, _record_types.get(data_type, np.dtype("<u4")), () if count is None else (count, ))
+                               if not data_type.startswith("str") else (name, self.raw_dtype[name])
+                               for name, data_type, count in self.fields])
+        self._is_raw_dtype = all(t != "uint24" for _, t, _ in self.fields) and len(self.fields) == len(raw_fields)
+
+    def from_buffer(self, buffer, n: int, offset: int = 0) -> np.ndarray:
+        """
+        Gets n records from a buffer (zero copy, if possible).
+        :return: a numpy structured array
+        """
+        if offset + n * self.size > len(buffer):
+            raise EOFError(f"Expected {n} records of {self.size} bytes, at {offset}, in {len(buffer)} bytes")
+        raw = np.frombuffer(buffer, dtype=self.raw_dtype, count=n, offset=offset)
+        if self._is_raw_dtype:
+            return raw
+
+        records = np.empty(n, dtype=self.dtype)
+        for name, data_type, _ in self.fields:
+            if data_type == "uint24":
+                b = raw[name].astype("<u4")
+                records[name] = b[..., 0] | (b[..., 1] << 8) | (b[..., 2] << 16)
+            else:
+                records[name] = raw[name]
+        return records
+
+    def read(self, f, n: int) -> np.ndarray:
+        """
+        Reads n records from a stream, with one f.read()
+        :return: a numpy structured array
+        """
+        return self.from_buffer(f.read(n * self.size), n)
+
+    def to_tuples(self, records: np.ndarray) -> List[Tuple]:
+        """
+        Converts records to a list of tuples of python values (arrays become lists, strings are decoded).
+        """
+        columns = []
+        for name, data_type, count in self.fields:
+            col = records[name].tolist()
+            if data_type.startswith("str"):
+                # as per read_string, nulls are skipped
+                def decode(s: bytes) -> str:
+                    return "".join(chr(c) for c in s if c != 0)
+                col = [decode(v) for v in col] if count is None else [[decode(s) for s in v] for v in col]
+            columns.append(col)
+        return list(zip(*columns))
+
+
+_compiled_formats: Dict[str, RecordFormat] = {}
+
+
+def compile_record_format(record_format: Union[str, List[str], List[Tuple[str, str]]]) -> RecordFormat:
+    """
+    Gets a compiled (and cached) record format
+    """
+    if isinstance(record_format, RecordFormat):
+        return record_format
+    key = repr(record_format)
+    if key not in _compiled_formats:
+        _compiled_formats[key] = RecordFormat(record_format)
+    return _compiled_formats[key]
+
+
+def read_records(f, record_format, n: int) -> np.ndarray:
+    """
+    Reads n records, in one call.
+    :return: a numpy structured array
+    """
+    return compile_record_format(record_format).read(f, n)
+
+
+def read_record_tuples(f, record_format, n=None) -> List[Tuple]:
+    """
+    Reads n records, in one call.
+    :return: A list of tuples if n is not None (even if n = 1), else a tuple
+    """
+    rec_format = compile_record_format(record_format)
+    res_list = rec_format.to_tuples(rec_format.read(f, 1 if n is None else n))
+    return res_list if n is not None else res_list[0]
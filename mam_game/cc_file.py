@@ -6,19 +6,23 @@ import itertools
 import json
 import shutil
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import NamedTuple, Dict, List, Tuple, Literal, Iterator, Type, Any
 import logging
+import mmap
 import os
 import time
 
 import numpy as np
+import xxhash
 from slugify import slugify
 from numba import njit
 
 import helpers.stream_helpers as sh
 from chosm.asset import Asset
+from chosm.asset_index import AssetIndex
 from chosm.game_constants import SpriteRoles
 from chosm.map_asset import MapAsset
 from chosm.resource_pack import ResourcePackInfo
@@ -37,6 +41,14 @@ from chosm.pal_asset import PalAsset
 from mam_game.sprite_file_decoder import load_sprite_file
 
 
+# Bump this when a change to the decoders (or the baked output) should invalidate previously baked assets.
+DECODER_VERSION = 4
+
+
+_toc_record_format = sh.compile_record_format(
+    [("file_id", "uint16"), ("offset", "uint24"), ("length", "uint16"), ("padding", "byte")])
+
+
 @dataclass
 class TOCRecord:
     """
@@ -52,6 +64,58 @@ class TOCRecord:
         return f"[{hex(self.file_id)}->'{self.name}' (toc index {self.toc_position}, {self.length} bytes at {self.offset})]"
 
 
+class CCRawFile(RawFile):
+    """
+    A RawFile that is read from a memory mapped cc file, on first access.
+      - data is a read only buffer: decrypted bytes (cached), or a zero-copy view of the mapped file.
+      - so resident memory only grows for the files that are used.
+    """
+    def __init__(self, file_id: int, file_name: str, cc_map: mmap.mmap, offset: int, length: int,
+                 decrypt_table: bytes = None):
+        self.file_id = file_id
+        self.file_name = file_name
+        self._cc_map = cc_map
+        self._offset = offset
+        self._length = length
+        self._decrypt_table = decrypt_table
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            view = memoryview(self._cc_map)[self._offset:self._offset + self._length].toreadonly()
+            if self._decrypt_table is not None:
+                self._data = view.tobytes().translate(self._decrypt_table)
+            else:
+                self._data = view
+        return self._data
+
+    def is_loaded(self) -> bool:
+        return self._data is not None
+
+    def __reduce__(self):
+        # An mmap can't be pickled (eg: to send to a process pool), so send the data instead.
+        return RawFile, (self.file_id, self.file_name, bytes(self.data))
+
+
+# The fields of CCFile's resource index (module level functions, so a CCFile can be pickled).
+def _get_resource_name(res: Asset) -> str:
+    return res.name
+
+
+def _get_resource_id(res: Asset) -> int:
+    return res.file_id
+
+
+def _get_resource_types(res: Asset) -> List[Type]:
+    # so a query on a base class finds its subclasses, like isinstance(...)
+    return type(res).__mro__
+
+
+def _get_resource_tags(res: Asset) -> List[str]:
+    return res.tags
+
+
 # TODO: This needs a superclass, so the functionality of "asset manager" can be shared with:
 #   - other legacy game loading logic
 #   - asset reprocessing logic (eg: upscaling)
@@ -88,11 +152,12 @@ class CCFile:
             self.toc = self._read_toc(f, id_to_name_lut)
             print(f"  - TOC has {len(self.toc)} files")
 
-            # read and decrypt all files
-            print(f"  - decrypting files")
+            # files are read (and decrypted) from the memory map when first used
+            self._cc_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
             self._raw_data_lut: Dict[Literal[int, str], RawFile] = {}
+            decrypt_table = self._get_decrypt_table() if self.is_encrypted() else None
             for r in self.toc:
-                raw = self._load_raw_file(r, f)
+                raw = self._load_raw_file(r, decrypt_table)
                 self._raw_data_lut[r.file_id] = raw
                 self._raw_data_lut[r.name] = raw
 
@@ -104,12 +169,25 @@ class CCFile:
         self.chained_files: Dict = {}
 
         self._resources: List[Asset] = []
+        self._resource_index: AssetIndex = None  # see _get_resource_index()
+        self._indexed_resources: List[Asset] = None
+
+        # sprites decoded ahead of time (eg: by a process pool), consumed by _load_sprite
+        self._decoded_sprites: Dict[str, SpriteAsset] = {}
 
     def merge(self, other, to_copy=True):
         other: CCFile = other
         print(f"Merging {self.file} and {other.file}")
         if to_copy:
-            merged = copy.deepcopy(self)
+            # The raw files are read only, so they (and the memory map) can be shared.
+            merged = copy.copy(self)
+            merged.toc = list(self.toc)
+            merged._raw_data_lut = dict(self._raw_data_lut)
+            merged._toc_file_names = list(self._toc_file_names)
+            merged._toc_file_ids = list(self._toc_file_ids)
+            merged.chained_files = dict(self.chained_files)
+            merged._resources = list(self._resources)
+            merged._decoded_sprites = dict(self._decoded_sprites)
         else:
             merged = self
 
@@ -130,23 +208,39 @@ class CCFile:
         return merged
 
 
+    def _get_resource_index(self) -> AssetIndex:
+        """
+        An index of self._resources by type, name, id and tag.
+        Resources are only ever appended, so the index is extended (rather than rebuilt) as resources are added.
+        """
+        index = self._resource_index
+        if index is None or self._indexed_resources is not self._resources or len(index) > len(self._resources):
+            index = AssetIndex([], key_fields=dict(name=_get_resource_name, id=_get_resource_id),
+                               tag_fields=dict(type=_get_resource_types, tag=_get_resource_tags))
+            self._resource_index, self._indexed_resources = index, self._resources
+        if len(index) < len(self._resources):
+            index.extend(self._resources[len(index):])
+        return index
+
+    def find_resources(self, res_type: Type, **terms) -> List[Asset]:
+        """
+        eg: cc_file.find_resources(SpriteAsset, tag=["tile", "outdoor"], name="*.til")
+        :param terms: See AssetIndex.find(...), the fields are name, id and tag.
+        """
+        return self._get_resource_index().find(type=res_type, **terms)
+
     def get_resources(self, res_type: Type, glob_epr: str = None) -> List[Asset]:
-        res = [r for r in self._resources if isinstance(r, res_type)]
-        if glob_epr is not None:
-            res = [r for r in res if fnmatch.fnmatch(r.name, glob_epr)]
-        return res
+        return self.find_resources(res_type, name=glob_epr)
 
     def get_resource(self, res_type: Type, id_or_name: Literal[int, str]):
         # turns out, making this getter complex makes a lot of other code simple.
-        # if it needs to work faster, add LUTs later.
         # assert type(res_type) == type
         assert id_or_name is not None
 
         if type(id_or_name) == int:
-            res = [r for r in self._resources if isinstance(r, res_type) and r.file_id == id_or_name]
+            res = self.find_resources(res_type, id=id_or_name)
         else:
-            name = normalise_file_name(str(id_or_name))
-            res = [r for r in self._resources if isinstance(r, res_type) and r.name == name]
+            res = self.find_resources(res_type, name=normalise_file_name(str(id_or_name)))
 
         assert len(res) <= 1  # check for duplicated key
         if len(res) == 0:
@@ -156,6 +250,12 @@ class CCFile:
     def chain_cc_file(self, other):
         self.chained_files[other.file] = other
 
+    def get_raw_files(self, glob_exp: str = "*") -> List[RawFile]:
+        """
+        Gets the raw (decrypted) files, that match a glob of the (normalised) file names.
+        """
+        return [self._raw_data_lut[n] for n in fnmatch.filter(self._toc_file_names, glob_exp)]
+
 
     def _read_toc(self, f, id_to_name_lut) -> List[TOCRecord]:
         """
@@ -166,19 +266,18 @@ class CCFile:
 
         # read and decrypt the TOC data
         toc_size = self.num_files * 8
-        toc_bytes = sh.read_byte_array(f, n=toc_size)
+        toc_bytes = f.read(toc_size)
+        if len(toc_bytes) != toc_size:
+            raise MAMFileParseError(None, f"TOC went past end of file: file={self.file}")
         toc_bytes = self._decrypt_toc(toc_bytes)
 
         # parse the TOC
-        ftoc = io.BytesIO(bytearray(toc_bytes))
-        toc_rows = sh.read_dict(ftoc,
-                        [("file_id", "uint16"), ("offset", "uint24"), ("length", "uint16"), ("padding", "byte")],
-                        n=self.num_files)
+        toc_rows = _toc_record_format.from_buffer(toc_bytes, self.num_files)
+        toc_rows = _toc_record_format.to_tuples(toc_rows)
 
         # Create output
         toc: List[TOCRecord] = []
-        for i, t in enumerate(toc_rows):
-            f_id, f_offset, f_len = t["file_id"], t["offset"], t["length"]
+        for i, (f_id, f_offset, f_len, padding) in enumerate(toc_rows):
             toc_rec = TOCRecord(f_id, f_offset, f_len, i, None)
 
             # get known name
@@ -194,7 +293,7 @@ class CCFile:
             toc.append(toc_rec)
 
             # validate
-            if t["padding"] != 0:
+            if padding != 0:
                 logging.warning(f"expected padding to be 0 in toc entry: file={self.file}, toc_number={i}")
             if toc_rec.offset + toc_rec.length > self.file_size:
                 # logging.error(f"toc record {i} went pat end of file: {toc_rec}")
@@ -224,20 +323,16 @@ class CCFile:
         # done.
         return toc
 
-    def _decrypt_toc(self, toc_bytes: List) -> List:
+    def _decrypt_toc(self, toc_bytes: bytes) -> bytes:
         """
         The TOC has a custom encryption algorithm.
         It needs to be decrypted as one blob.
         https://xeen.fandom.com/wiki/CC_File_Format#Table_of_Contents
         """
-        raw_toc = toc_bytes.copy()
-        ah = 0xac
-        for i, r in enumerate(raw_toc):
-            r = r & 0xff
-            lsl2 = (r << 2) & 0xff
-            raw_toc[i] = (((lsl2 | (r >> 6)) + ah) & 0xff)
-            ah += 0x67
-        return raw_toc
+        r = np.frombuffer(bytes(toc_bytes), dtype=np.uint8)
+        ah = (0xac + 0x67 * np.arange(len(r))) & 0xff  # the key, which increments for each byte
+        raw_toc = (((r << 2) | (r >> 6)) + ah) & 0xff
+        return raw_toc.astype(np.uint8).tobytes()
 
     @staticmethod
     def get_file_name_hash(name) -> int:
@@ -261,16 +356,18 @@ class CCFile:
             return False
         return True
 
-    def decrypt(self, data: List) -> List:
-        d2 = [(d ^ self.xor_encryption_value) & 0xff for d in data]
-        return d2
+    def _get_decrypt_table(self) -> bytes:
+        """
+        A translate table (see bytes.translate) that XOR's every byte with the encryption value.
+        """
+        return bytes((i ^ self.xor_encryption_value) & 0xff for i in range(256))
 
-    def _load_raw_file(self, toc_record: TOCRecord, f) -> RawFile:
-        f.seek(toc_record.offset)
-        data = f.read(toc_record.length)
-        if self.is_encrypted():
-            data = self.decrypt(data)
-        return RawFile(toc_record.file_id, toc_record.name, data)
+    def decrypt(self, data) -> bytes:
+        return bytes(data).translate(self._get_decrypt_table())
+
+    def _load_raw_file(self, toc_record: TOCRecord, decrypt_table: bytes = None) -> RawFile:
+        return CCRawFile(toc_record.file_id, toc_record.name, self._cc_map,
+                         toc_record.offset, toc_record.length, decrypt_table)
 
     def get_pal_for_file(self, name):
         pal = None
@@ -281,10 +378,72 @@ class CCFile:
                 pal = self.get_resource(PalAsset, "default.pal")
         return pal
 
-    def bootstrap(self):
+    def _load_sprite(self, f_name: str) -> SpriteAsset:
+        """
+        Decodes a sprite file, or gets the sprite if it was already decoded by _pre_decode_sprites.
+        """
+        if f_name in self._decoded_sprites:
+            return self._decoded_sprites.pop(f_name)
+        pal = self.get_pal_for_file(f_name)
+        raw: RawFile = self._raw_data_lut[f_name]
+        return load_sprite_file(raw, pal, self.mam_version, self.mam_platform)
+
+    def _get_sprite_file_names(self) -> List[str]:
+        """
+        All the sprite files the _bootstrap_* methods will decode.
+        """
+        names = []
+        for ext in ["sky", "gnd", "srf", "wal", "til", "fac"]:
+            names += fnmatch.filter(self._toc_file_names, f"*.{ext}")
+        mons = [n for n in fnmatch.filter(self._toc_file_names, "*.mon") if n[0].isdigit()]
+        names += mons
+        names += [n.replace(".mon", ".att") for n in mons]
+        return names
+
+    def _pre_decode_sprites(self, workers: int):
+        """
+        Decodes the sprite files with a process pool.
+        Each decode is independent (given the palette), so this scales with the number of cores.
+        The results are added to self._resources later, by the _bootstrap_* methods, so the order is unchanged.
+        """
+        f_names = self._get_sprite_file_names()
+        print(f"  - decoding {len(f_names)} sprites with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for f_name in f_names:
+                raw = self._raw_data_lut[f_name]
+                pal = self.get_pal_for_file(f_name)
+                futures[f_name] = pool.submit(load_sprite_file, raw, pal, self.mam_version, self.mam_platform)
+            self._decoded_sprites = {f_name: fut.result() for f_name, fut in futures.items()}
+
+    def _hash_sources(self, f_names: List[str], depends_on: List[Asset] = None) -> str:
+        """
+        Hashes the raw data of the source files (and the decoder version) that an asset is created from.
+        :param depends_on: other assets used to create the asset (eg: a palette), their source hashes are included.
+        """
+        h = xxhash.xxh64()
+        h.update(f"{DECODER_VERSION}|{self.mam_version}|{self.mam_platform}".encode())
+        for f_name in f_names:
+            h.update(f_name.encode())
+            h.update(self._raw_data_lut[f_name].as_memoryview())
+        for asset in (depends_on or []):
+            h.update(str(asset.source_hash).encode())
+        return h.hexdigest()
+
+    def _set_source_hash(self, first: int, f_names: List[str], depends_on: List[Asset] = None):
+        """
+        Sets the source hash of the resources added since self._resources[first].
+        """
+        source_hash = self._hash_sources(f_names, depends_on)
+        for res in self._resources[first:]:
+            res.source_hash = source_hash
+
+    def bootstrap(self, workers: int = None):
         """
         Loads a set of game assets into self.resources, by parsing the files in this cc file.
         It may be necessary to chain other .cc files prior to calling bootstrap.
+        :param workers: If > 1, sprites are decoded by a process pool with this many processes.
+                        If 0, use one process per cpu. If None (or 1), everything runs in this process.
         """
         print(f"Loading game assets from {self.file}")
         # first we need tha palettes, so sprites can be decoded
@@ -294,9 +453,16 @@ class CCFile:
             raw = self._raw_data_lut[f_name]
             pal = load_pal_file(self._raw_data_lut[f_name], self.mam_version, self.mam_platform)
             self._resources.append(pal)
+            self._set_source_hash(len(self._resources) - 1, [f_name])
 
         def_pal = get_default_pal(self.mam_version, self.mam_platform)
         self._resources.append(def_pal)
+        self._set_source_hash(len(self._resources) - 1, [])
+
+        if workers == 0:
+            workers = os.cpu_count()
+        if workers is not None and workers > 1:
+            self._pre_decode_sprites(workers)
 
         self._bootstrap_environment_sprites()
         self._bootstrap_tiles()
@@ -305,16 +471,23 @@ class CCFile:
 
         self._bootstrap_faces()
         self._bootstrap_worlds()
+        self._decoded_sprites = {}
+
+        # Maps and worlds are built from many files (and the sprite luts), so they depend on everything.
+        unknown_sources = [r for r in self._resources if r.source_hash is None]
+        if len(unknown_sources) > 0:
+            all_sources_hash = self._hash_sources(self._toc_file_names)
+            for res in unknown_sources:
+                res.source_hash = all_sources_hash
 
     def _bootstrap_faces(self):
         print(f"  - loading faces: ")
         sprites = fnmatch.filter(self._toc_file_names, f"*.fac")
         for f_name in sprites:
             print(".", end='')
-            pal = self.get_pal_for_file(f_name)
-            raw: RawFile = self._raw_data_lut[f_name]
-            sprite = load_sprite_file(raw, pal, self.mam_version, self.mam_platform)
+            sprite = self._load_sprite(f_name)
             self._resources.append(sprite)
+            self._set_source_hash(len(self._resources) - 1, [f_name], [self.get_pal_for_file(f_name)])
         print()
 
     def _bootstrap_environment_sprites(self):
@@ -329,9 +502,8 @@ class CCFile:
             for f_name in sprites:
                 print(".", end='')
 
-                pal = self.get_pal_for_file(f_name)
-                raw: RawFile = self._raw_data_lut[f_name]
-                sprite = load_sprite_file(raw, pal, self.mam_version, self.mam_platform)
+                first = len(self._resources)
+                sprite = self._load_sprite(f_name)
 
                 environment_name = os.path.splitext(f_name)[0].strip(".").lower()
 
@@ -354,6 +526,7 @@ class CCFile:
                     self._resources.append(sky_flat)
                 else:
                     self._resources.append(sprite)
+                self._set_source_hash(first, [f_name], [self.get_pal_for_file(f_name)])
             print()
         print()
 
@@ -378,9 +551,8 @@ class CCFile:
         image_names = fnmatch.filter(self._toc_file_names, "*.til")
 
         for f_name in image_names:
-            pal = self.get_pal_for_file(f_name)
-            raw = self._raw_data_lut[f_name]
-            sprite = load_sprite_file(raw, pal, self.mam_version, self.mam_platform)
+            first = len(self._resources)
+            sprite = self._load_sprite(f_name)
             if "outdoor" in f_name:
                 # outdoor.til handled a bit differently
                 sprite = sprite.crop(0, 0, 10, 8)
@@ -415,6 +587,8 @@ class CCFile:
                 # layer2, rest = rest.split(16, left_name=sprite.name + "_layer_01")
                 # layer3, layer4 = rest.split(16, left_name=sprite.name + "_layer_02")
 
+            self._set_source_hash(first, [f_name], [self.get_pal_for_file(f_name)])
+
     def load_all_maps(self) -> List[MAMMapAsset]:
         # organise the maps
         maps = fnmatch.filter(self._toc_file_names, "m*.dat")
@@ -451,14 +625,11 @@ class CCFile:
         # TODO: for now we will just return the outdoor tile set regardless of the map in use.
         # tile_sets = ["cave.til", "cstl.til", "dung.til", "outdoor.til", "town.til",  "scfi.til",  "towr.til"]
 
-        # find related sprites
-        tile_sprites = [q for q in self.get_resources(SpriteAsset)
-                        if "tile" in q.tags and "outdoor" in q.tags]
-
         # just load the outdoor for now
         luts_by_name: Dict[str, Dict[Any, SpriteAsset]] = {}
         for lut_name in ["ground-map", "env-map", "building-map"]:
-            lut = {int(s.file_id): s for s in tile_sprites if lut_name in s.tags}
+            tile_sprites = self.find_resources(SpriteAsset, tag=["tile", "outdoor", lut_name])
+            lut = {int(s.file_id): s for s in tile_sprites}
             luts_by_name[lut_name] = lut
 
         # patch out blank tiles (ie a number that means nothing is there)
@@ -548,6 +719,7 @@ class CCFile:
                 print(f"{f_name}, ", end="")
                 mon_file = load_monster_database_file(self._raw_data_lut[f_name], self.mam_version, self.mam_platform)
                 self._resources.append(mon_file)
+                self._set_source_hash(len(self._resources) - 1, [f_name])
         print("  - done.")
 
         # load the base monster animations
@@ -557,18 +729,22 @@ class CCFile:
         for f_name in mons:
             print(".", end='')
             pal = self.get_pal_for_file(f_name)
-            raw = self._raw_data_lut[f_name]
-            sprite = load_sprite_file(raw, pal, self.mam_version, self.mam_platform)
+            sprite = self._load_sprite(f_name)
             self._resources.append(sprite)
+            self._set_source_hash(len(self._resources) - 1, [f_name], [pal])
 
-            raw_att = self._raw_data_lut[f_name.replace(".mon", ".att")]
-            sprite2 = load_sprite_file(raw_att, pal, self.mam_version, self.mam_platform)
+            att_name = f_name.replace(".mon", ".att")
+            sprite2 = self._load_sprite(att_name)
             self._resources.append(sprite2)
+            self._set_source_hash(len(self._resources) - 1, [att_name], [pal])
         print()
 
-    def bake(self, bake_dir=None):
+    def bake(self, bake_dir=None, workers: int = None, incremental: bool = True):
         """
         Extract all files to a folder
+        :param workers: If > 1, assets are baked by a process pool with this many processes (0 for one per cpu).
+        :param incremental: Only bake assets whose source_hash differs from the one in the baked info.json.
+                            If False, the whole pack folder is deleted and every asset is baked.
         """
         print("Baking resources: ")
         if bake_dir is None:
@@ -578,7 +754,7 @@ class CCFile:
             bake_dir = os.path.join(bake_dir, "baked")
 
         bake_path = os.path.join(bake_dir, self.slug)
-        if os.path.exists(bake_path):
+        if os.path.exists(bake_path) and not incremental:
             # because I don't trust software to delete a path without some sanity checks
             assert Path(bake_dir) in Path(bake_path).parents
             assert len(self.slug.strip()) > 0
@@ -593,23 +769,74 @@ class CCFile:
         rp.author_info = "Developed by New World Computing, not in the public domain. Used here for research purposes only."
         rp.save_info_file(bake_path)
 
+        # group by slug (in order), as several resources baking to one folder is possible.
+        resources_by_slug: Dict[str, List[Asset]] = {}
+        for obj in self._resources:
+            if obj is not None:
+                resources_by_slug.setdefault(obj.slug, []).append(obj)
+
+        # remove assets that are no longer in the pack (dot folders, eg: the pack's .index, are not assets)
+        for entry in os.scandir(bake_path):
+            if entry.is_dir() and not entry.name.startswith(".") and entry.name not in resources_by_slug:
+                assert Path(bake_path) in Path(entry.path).parents
+                shutil.rmtree(entry.path)
+
+        jobs = []
+        for slug, objs in resources_by_slug.items():
+            obj_path = os.path.join(bake_path, slug)
+            assert Path(bake_dir) in Path(obj_path).parents
+            if not (len(objs) == 1 and _is_baked(objs[0], obj_path)):
+                jobs.append((objs, obj_path))
+
         # bake all the files
-        print(f"  - baking {len(self._resources)} resources: ", end="")
-        for i, obj in enumerate(self._resources):
-            try:
-                if obj is not None:
-                    print(obj.get_type_name()[0], end="\n    " if (i+23) % 70 == 0 else "")
-                    obj_path = os.path.join(bake_path, obj.slug)
-                    assert Path(bake_dir) in Path(obj_path).parents
-                    os.makedirs(obj_path, exist_ok=True)
-                    obj.bake(obj_path)
-            except MAMFileParseError:
-                pass
+        print(f"  - baking {len(jobs)} resources ({len(resources_by_slug) - len(jobs)} unchanged): ", end="")
+        if workers == 0:
+            workers = os.cpu_count()
+        if workers is not None and workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_bake_assets, objs, obj_path) for objs, obj_path in jobs]
+                for i, fut in enumerate(futures):
+                    print(fut.result(), end="\n    " if (i + 23) % 70 == 0 else "")
+        else:
+            for i, (objs, obj_path) in enumerate(jobs):
+                print(_bake_assets(objs, obj_path), end="\n    " if (i + 23) % 70 == 0 else "")
         print()
 
         return bake_path
 
 
+def _is_baked(obj: Asset, obj_path: str) -> bool:
+    """
+    True if the asset was previously baked to obj_path, from the same source data.
+    """
+    if obj.source_hash is None:
+        return False
+    try:
+        with open(os.path.join(obj_path, "info.json"), "rt") as f:
+            return json.load(f).get("source_hash") == obj.source_hash
+    except (OSError, ValueError):
+        return False
+
+
+def _bake_assets(objs: List[Asset], obj_path: str) -> str:
+    """
+    Bakes assets to a clean folder (a module level function, so it can run in a process pool).
+    :return: A progress character, ie: the first letter of the asset type.
+    """
+    if os.path.exists(obj_path):
+        shutil.rmtree(obj_path)
+    os.makedirs(obj_path, exist_ok=True)
+    try:
+        for obj in objs:
+            obj.bake(obj_path)
+    except MAMFileParseError:
+        pass
+    except BaseException:
+        # don't leave a partly baked asset, that could be mistaken as up to date.
+        shutil.rmtree(obj_path, ignore_errors=True)
+        raise
+    return objs[-1].get_type_name()[0]
+
 
 def parse_toc_csv(file_path) -> List[Tuple[str, int, str]]:
     """
@@ -661,8 +888,8 @@ def main():
     dark_cc = load_cc_file(f"../game_files/dos/DARK.CC",  MAMVersion.DARKSIDE, Platform.PC_DOS)
     dark_cur = load_cc_file(f"../game_files/dos/DARK.CUR", MAMVersion.DARKSIDE, Platform.PC_DOS)
     mm5_cc = dark_cc.merge(dark_cur, to_copy=False)
-    mm5_cc.bootstrap()
-    mm5_cc.bake()
+    mm5_cc.bootstrap(workers=os.cpu_count())
+    mm5_cc.bake(workers=os.cpu_count())
 
     # mm4_cc = load_cc_file(f"../game_files/dos/XEEN.CC",  MAMVersion.CLOUDS, Platform.PC_DOS)
     # mm4_cur = load_cc_file(f"../game_files/dos/XEEN.CUR", MAMVersion.CLOUDS, Platform.PC_DOS)
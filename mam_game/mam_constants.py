@@ -40,6 +40,14 @@ class RawFile:
     def __repr__(self):
         return str(self)
 
+    def as_memoryview(self) -> memoryview:
+        """
+        The file data as a read only buffer (no copy is made if the data is already bytes like).
+        """
+        if isinstance(self.data, (bytes, bytearray, memoryview)):
+            return memoryview(self.data).toreadonly()
+        return memoryview(bytes(self.data))
+
     def dump(self, file_path=None):
         """
         A function to dump out a files binary data (eg: for debug purposes).
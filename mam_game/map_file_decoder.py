@@ -3,6 +3,7 @@ import logging
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Any, Tuple
 
+import numpy as np
 from slugify import slugify
 
 from chosm.map_asset import MapAsset
@@ -12,15 +13,25 @@ from mam_game.mam_constants import MAMVersion, Platform, MAMFileParseError, spel
 import helpers.stream_helpers as sh
 
 
+_map_meta_data_format = sh.compile_record_format([
+    ("maze_id", "uint16"),              # 2 bytes: mazenumber, uint16 value indicating this map ID
+    ("joining_map_ids", "uint16[4]"),   # 8 bytes, uint16 mazes_id's to the N, E, S, W
+    ("flags", "uint16"),                # 2 bytes: mazeFlags
+    ("flags2", "uint16"),               # 2 bytes: mazeFlags2
+    ("wall_types", "byte[16]"),         # 16 bytes: wallTypes, 16 byte array of wall types, used for indirect lookup
+    ("surface_types", "byte[16]"),      # 16 bytes: surfaceTypes, array of surface types (ie, floors), ditto
+    ("default_floor_type", "byte"),     # 1 byte: the default floor type (lookup table, used by indoor maps)
+])
+
+
 def read_map_meta_data(f, maze_data: RawFile):
-    # 2 bytes: mazenumber, uint16 value indicating this map ID
-    maze_id = sh.read_uint16(f)
+    maze_id, joining_map_ids, flags, flags2, wall_type_lut, surface_type_lut, default_floor_type = \
+        sh.read_record_tuples(f, _map_meta_data_format)
+
     if maze_id > 200:
         maze_data.dump()
         raise MAMFileParseError(maze_data, "Invalid maze ID")
 
-    # 8 bytes, uint16 mazes_id's to the N, E, S, W
-    joining_map_ids = sh.read_uint16_array(f, 4)
     if any(q > 200 for q in joining_map_ids):
         maze_data.dump()
         raise MAMFileParseError(maze_data, f"Invalid joining max ID's: joining_ids='{joining_map_ids}'")
@@ -28,9 +39,7 @@ def read_map_meta_data(f, maze_data: RawFile):
     joining_map_ids = {d: x for d, x in zip(order, joining_map_ids)}
 
 
-    # 2 bytes: mazeFlags
-    # 2 bytes: mazeFlags2
-    flags = sh.read_uint16(f)
+    # flags
     restricted_spells = []
     known_flags = [(6, "Etheralize"), (8, "Town Portal"), (9, "Super Shelter"),
                    (10, "Time Distortion"), (11, "Lloyds Beacon"), (12, "Teleport")]
@@ -40,17 +49,9 @@ def read_map_meta_data(f, maze_data: RawFile):
     can_rest = (flags & (1 << 14))
     can_save = (flags & (1 << 15))
 
-    flags2 = sh.read_uint16(f)
     is_dark = (flags2 & (1 << 14))
     is_outside = (flags2 & (1 << 15))  # ie overworld
 
-    # 16 bytes: wallTypes, 16 byte array of wall types, used for indirect lookup
-    wall_type_lut = sh.read_byte_array(f, 16)
-    # 16 bytes: surfaceTypes, 16 byte array of surface types (ie, floors) used for indirect lookup
-    surface_type_lut = sh.read_byte_array(f, 16)
-    # 1 byte: floor type, the default floor type (lookup table, used by indoor maps)
-    default_floor_type = sh.read_byte(f)
-
     return maze_id, joining_map_ids, restricted_spells, can_rest, can_save, is_dark, is_outside, \
            wall_type_lut, surface_type_lut, default_floor_type
 
@@ -162,10 +163,11 @@ def load_map_file(maze_data: RawFile,
     f = io.BytesIO(bytearray(maze_data.data))
     # from: https://xeen.fandom.com/wiki/MAZExxxx.DAT_File_Format
     # 512 bytes: WallData, 16x16 uint16 values comprising the visual map data (floors, walls, etc...)
-    map_data = sh.read_uint16_array(f, total_tiles)
-
     # 256 bytes: CellFlag, 16x16 bytes, each byte holding the flags for one tile
-    map_flags = sh.read_byte_array(f, total_tiles)
+    tile_records = sh.read_records(f, [("wall_data", f"uint16[{total_tiles}]"),
+                                       ("cell_flags", f"byte[{total_tiles}]")], 1)
+    m_data = tile_records["wall_data"][0].reshape(map_height, map_width)
+    m_flag = tile_records["cell_flags"][0].reshape(map_height, map_width)
 
     # Read the rest of the file
     maze_slug, joining_map_ids, restricted_spells, \
@@ -177,47 +179,29 @@ def load_map_file(maze_data: RawFile,
 
     the_map = Map(str(map_id), map_width, map_height, layers, [])
 
-    # create the map
-    for y in range(map_height):
-        for x in range(map_width):
-            index = (y * map_width) + x
-            m_data = map_data[index]
-            m_flag = map_flags[index]
-
-            base = surface_type_lut[m_data & 0x0f]
-            middle = wall_type_lut[(m_data>>4) & 0x0f]
-            map_top =  (m_data>>8) & 0x0f
-            map_overlay = (m_data>>12) & 0x0f
-
-            # 5 flags and a 3 bit int.
-            has_grate = (m_flag & 0x80) != 0
-            no_rest = (m_flag & 0x40) != 0
-            has_drain = (m_flag & 0x20) != 0
-            has_event = (m_flag & 0x10) != 0
-            has_object = (m_flag & 0x08) != 0
-            _ = (m_flag & 0x07)  # number of monsters, unused
-
-            #     height: int
-            #     ground: int    # iBase
-            #     surface: int   # iMiddle
-            #     wall: int      # iTop
-            #     env: int       # iTop
-            #     building: int  # iOverlay
-
-            building = map_top
-            if map_top == 0 and map_overlay != 0:
-                building = map_overlay + 16
-
-            if map_top != 0 and map_overlay != 0:
-                logging.error("TODO: work out the map overlay stuff.")
-                # print("arrrg")
-                # exit(0)
-            #              h  gnd   surface, w, env,    building
-            tile = MaMTile(0, base, map_top, 0, middle, building,
-                           has_grate, no_rest, has_drain, has_event, has_object)
-            the_map[x, map_height - y - 1] = asdict(tile)
-
-    the_map.recompress_map()
+    # create the map (all tiles at once)
+    base = np.array(surface_type_lut)[m_data & 0x0f]
+    middle = np.array(wall_type_lut)[(m_data >> 4) & 0x0f]
+    map_top = (m_data >> 8) & 0x0f
+    map_overlay = (m_data >> 12) & 0x0f
+
+    building = np.where((map_top == 0) & (map_overlay != 0), map_overlay + 16, map_top)
+
+    num_overlaid = np.count_nonzero((map_top != 0) & (map_overlay != 0))
+    if num_overlaid > 0:
+        logging.error(f"TODO: work out the map overlay stuff. ({num_overlaid} tiles)")
+
+    # 5 flags and a 3 bit int (number of monsters, unused).
+    zeros = np.zeros_like(m_data)
+    tile_layers = MaMTile(height=zeros, ground=base, surface=map_top, wall=zeros, env=middle, building=building,
+                          has_grate=(m_flag & 0x80) != 0,
+                          no_rest=(m_flag & 0x40) != 0,
+                          has_drain=(m_flag & 0x20) != 0,
+                          has_event=(m_flag & 0x10) != 0,
+                          has_object=(m_flag & 0x08) != 0)
+
+    # the file stores rows top down, the map is bottom up
+    the_map.set_layers({k: v[::-1] for k, v in asdict(tile_layers).items()})
     # tileset_name = "outdoor.til"
 
 
@@ -1,4 +1,3 @@
-import io
 import logging
 
 from chosm.npc_database_asset import NPCDatabaseAsset
@@ -88,6 +87,24 @@ def _get_luts():
     return target_pri, mon_type_lut, att_type_lut, att_special_lut
 
 
+# A 60 byte monster record
+_monster_record_format = sh.compile_record_format([
+    ("name", "str16"),
+    # first 10 bytes (stats)
+    ("xp", "uint32"), ("hp", "uint16"), ("ac", "byte"), ("speed", "byte"), ("att_per_round", "byte"), ("hates", "byte"),
+    # next 8 bytes (attack)
+    ("num_dice", "uint16"), ("dice_sides", "byte"), ("attack_type", "byte"), ("attack_special", "byte"),
+    ("hit_chance", "byte"), ("ranged_attack", "byte"), ("type_id", "byte"),
+    # next 7 bytes (resistances)
+    ("resistances", "byte[7]"),
+    # last 10 bytes
+    ("unknown", "byte"), ("gold", "uint16"), ("gems", "byte"), ("item_chance", "byte"), ("flying", "byte"),
+    ("sprite_id", "byte"), ("ping_pong", "byte"), ("anim_fx_id", "byte"), ("idle_sfx_id", "byte"),
+    # attack sound, and a (unused?) last byte
+    ("attack_snd", "str8"), ("last_byte", "byte")
+])
+
+
 def load_monster_database_file(raw_file: RawFile,
                   ver: MAMVersion, platform: Platform) -> NPCDatabaseAsset:
     data = raw_file.data
@@ -98,13 +115,15 @@ def load_monster_database_file(raw_file: RawFile,
 
     target_pri, mon_type_lut, att_type_lut, att_special_lut = _get_luts()
 
-    f = io.BytesIO(bytearray(data))
-
     monsters = []
     num_monsters = len(data) // 60
     logging.info(f"Loading monsters: n={num_monsters}, file={raw_file}")
-    for i in range(num_monsters):
-        npc_name = sh.read_string(f, size=16)  # 16 bytes name
+    records = _monster_record_format.to_tuples(_monster_record_format.from_buffer(bytes(data), num_monsters))
+    for npc_name, xp, hp, ac, speed, att_per_round, hates, \
+            num_dice, dice_sides, attack_type, attack_special, hit_chance, ranged_attack, type_id, \
+            resistances, \
+            unknown, gold, gems, item_chance, flying, sprite_id, ping_pong, anim_fx_id, idle_sfx_id, \
+            attack_snd, last_byte in records:
         # Referencing a binary dump of the 35 byte stats record for the "whirlwind" monster
         # to infer the record from known stats
 
@@ -112,7 +131,6 @@ def load_monster_database_file(raw_file: RawFile,
         # 90 D0 03 00 E8 03 0A FA 01 0F
         # XP_________ HP___ AC s  ar F1
         # 250000      1000  10 250 1 all
-        xp, hp, ac, speed, att_per_round, hates = sh.read_list(f, "uint32,uint16,byte,byte,byte,byte")
 
         if hates in target_pri:
             hates = target_pri[hates]
@@ -124,8 +142,6 @@ def load_monster_database_file(raw_file: RawFile,
         # 05 00 64 00 10 FA 00 00
         # nd___ dn F1 F2 hc F3 F4
         # 5     100      250
-        num_dice, dice_sides, attack_type, attack_special, hit_chance, ranged_attack, type_id \
-            = sh.read_list(f, "uint16,byte,byte,byte,byte,byte,byte")
 
         if not (0 < num_dice <= 5000):
             logging.error(f"invalid number of dice: file={raw_file}, npc={npc_name}, num_dice={num_dice}")
@@ -164,15 +180,12 @@ def load_monster_database_file(raw_file: RawFile,
         # 64 64 64 64 00 00 64
         types = [DamageType.FIRE,   DamageType.ELECTRICAL, DamageType.COLD,     DamageType.POISON,
                  DamageType.ENERGY, DamageType.MAGIC,      DamageType.PHYSICAL]
-        resistances = {t: sh.read_byte(f) for t in types}
+        resistances = {t: r for t, r in zip(types, resistances)}
 
         # last 10 bytes
         # 00 00 00 00 00 00 01 00 00 B0
         # ?  $     💎 %d ✈  sn pp fx 🔊
 
-        unknown, gold, gems, item_chance, flying, sprite_id, \
-            ping_pong, anim_fx_id, idle_sfx_id = sh.read_list(f, "byte,uint16,byte,byte,byte,byte,byte,byte,byte")
-
         # todo: anim_fx_id = sprite_sfx_lut[anim_fx_id]
 
         if not (0 <= flying <= 1):
@@ -182,13 +195,10 @@ def load_monster_database_file(raw_file: RawFile,
         if unknown != 0:
             logging.warning(f"Unused(?) value[#1] no set: file={raw_file}, npc={npc_name}, value={unknown}")
 
-        sh.read_dict(f, [])
-        attack_snd = sh.read_string(f, size=8)
         if len(attack_snd) == 0:
             logging.warning(f"no attack sound: file={raw_file}, npc={npc_name}, value={unknown}")
         attack_snd += ".voc"
 
-        last_byte = sh.read_byte(f)
         if last_byte != 0:
             logging.warning(f"Unused(?) value[#2] no set: file={raw_file}, npc={npc_name}, value={unknown}")
             exit(1)
@@ -4,7 +4,10 @@ import io
 import json
 import logging
 import os.path
+import struct
 from typing import List, Dict, Tuple, Any
+
+import numpy as np
 from PIL import Image
 
 from chosm.sprite_asset import AnimLoop, SpriteAsset
@@ -14,11 +17,26 @@ import helpers.color as ch
 from chosm.pal_asset import PalAsset
 
 
+# The pattern steps used in the pattern command (see decode_line)
+_PATTERN_STEPS = [0, 1, 1, 1, 2, 2, 3, 3, 0, -1, -1, -1, -2, -2, -3, -3]
+
+
 def read_cell(f, raw_file: RawFile):
     fmt = [sh.DType.U_INT_16, sh.DType.U_INT_16, sh.DType.U_INT_16, sh.DType.U_INT_16]
     x, width, y, height = [q.read(f) for q in fmt]
+    _validate_cell(x, y, width, height, raw_file)
+    return x, y, width, height
+
+
+def read_cell_from_buffer(data: memoryview, offset: int, raw_file: RawFile):
+    if offset + 8 > len(data):
+        raise MAMFileParseError(raw_file, f"Invalid Frame Cell: cell header after end of file, offset={offset}")
+    x, width, y, height = struct.unpack_from("<4H", data, offset)
+    _validate_cell(x, y, width, height, raw_file)
+    return x, y, width, height
+
 
-    # validate
+def _validate_cell(x, y, width, height, raw_file: RawFile):
     if not(0 <= x < 1024):
         raise MAMFileParseError(raw_file, f"Invalid Frame Cell: condition='0 <= x < 1024', x={x}")
     if not(0 <= y < 1024):
@@ -28,8 +46,6 @@ def read_cell(f, raw_file: RawFile):
     if not(0 < height < 1024):
         raise MAMFileParseError(raw_file, f"Invalid Frame Cell: condition='0 < height < 1024', height={height}")
 
-    return x, y, width, height
-
 
 def decode_line(f, f_end, raw_file: RawFile):
     # Note: using naming conventions consistent with the source doco
@@ -37,7 +53,7 @@ def decode_line(f, f_end, raw_file: RawFile):
     line_offset = sh.read_byte(f)
 
     # The pattern steps used in the pattern command
-    pattern_steps = [0, 1, 1, 1, 2, 2, 3, 3, 0, -1, -1, -1, -2, -2, -3, -3]
+    pattern_steps = _PATTERN_STEPS
 
     while f.tell() < f_end:
         opcode = sh.read_byte(f)
@@ -124,6 +140,113 @@ def decode_cell_image(f, cell, pal: PalAsset,
     return img
 
 
+def decode_cell_indexed(data: memoryview, pos: int, cell, raw_file: RawFile) -> np.ndarray:
+    """
+    A faster version of decode_cell_image.
+    Decodes a cell straight from the file buffer to an array of palette indexes (0 is transparent).
+      - Each scan line is decoded as runs of bytes (not pixel by pixel), then written to a preallocated array.
+      - The palette is applied later (see pal_to_rgba_lut), with one numpy take per frame.
+    :param data: the sprite file
+    :param pos: the position of the first scan line in data (ie: just after the cell header)
+    :param cell: x_offset, y_offset, width, height (see read_cell)
+    :return: A (height, width) uint8 array.
+    """
+    x_offset, y_offset, width, height = cell
+    total_width = width + x_offset
+    total_height = height + y_offset
+    img = np.zeros((total_height, total_width), dtype=np.uint8)
+    data_len = len(data)
+
+    try:
+        y_pos = y_offset
+        while y_pos < total_height:
+            line_length = data[pos]  # bytes in this (encoded) scan line.
+            pos += 1
+
+            if line_length == 0:
+                # the skip line(s) command
+                y_pos += data[pos] + 1
+                pos += 1
+                continue
+
+            f_end = pos + line_length
+            x_pos = x_offset + data[pos]  # line offset
+            pos += 1
+
+            line = bytearray()
+            while pos < f_end:
+                opcode = data[pos]
+                pos += 1
+                cmd = (opcode & 0xE0) >> 5
+                param_len = opcode & 0x1F
+
+                if cmd <= 1:
+                    # raw byte mode
+                    n = opcode + 1
+                    if pos + n > data_len:
+                        raise MAMFileParseError(raw_file, f"Sprite line error: raw pixels after end of file.")
+                    line += data[pos:pos + n]
+                    pos += n
+                elif cmd == 2:
+                    # rle mode
+                    line += bytes((data[pos],)) * (param_len + 3)
+                    pos += 1
+                elif cmd == 3:
+                    # copy previous data (stream copy)
+                    opr1 = data[pos] | (data[pos + 1] << 8)
+                    pos += 2
+                    n = param_len + 4
+                    src = pos - opr1
+                    if src < 0 or src + n > data_len:
+                        raise MAMFileParseError(raw_file, f"Sprite line error: stream copy outside of file.")
+                    line += data[src:src + n]
+                elif cmd == 4:
+                    # RLE 2 byte pattern
+                    line += bytes((data[pos], data[pos + 1])) * (param_len + 2)
+                    pos += 2
+                elif cmd == 5:
+                    # RLE transparent run
+                    line += bytes(param_len + 1)
+                else:
+                    # pattern command, the steps alternate between two values
+                    cmd = (opcode >> 2) & 0x0E
+                    step_a, step_b = _PATTERN_STEPS[cmd], _PATTERN_STEPS[cmd + 1]
+                    opr1 = data[pos]
+                    pos += 1
+                    line += bytes([(opr1 + ((i + 1) // 2) * step_a + (i // 2) * step_b) & 0xFF
+                                   for i in range((opcode & 0x07) + 3)])
+
+            if pos != f_end:
+                raise MAMFileParseError(raw_file, f"Sprite line error: decoded line not of stated size.")
+
+            # transparent pixels past the end of the line are tolerated, as the reference decoder never draws them.
+            x_end = x_pos + len(line)
+            if x_end > total_width:
+                visible = max(total_width - x_pos, 0)
+                if any(line[visible:]):
+                    raise MAMFileParseError(raw_file, f"Sprite line error: pixels drawn past the cell width.")
+                del line[visible:]
+                x_end = x_pos + visible
+            img[y_pos, x_pos:x_end] = np.frombuffer(line, dtype=np.uint8)
+
+            y_pos += 1
+
+    except IndexError:
+        raise MAMFileParseError(raw_file, f"Sprite line error: scan line after end of file.")
+
+    return img
+
+
+def pal_to_rgba_lut(pal: PalAsset, transparent_index=0) -> np.ndarray:
+    """
+    A (256, 4) uint8 array, to convert indexed images to RGBA via fancy indexing; eg: rgba = lut[indexed]
+    """
+    lut = np.full((256, 4), 255, dtype=np.uint8)
+    lut[:, :3] = np.array(pal.colors_rgb, dtype=np.uint8)
+    lut[transparent_index] = 0
+    return lut
+
+
 def ping_pong(frames):
     if len(frames) < 2:
         return frames
@@ -156,6 +279,59 @@ def get_animations_in_ccfile_sprite(f_name, num_frames, ms_per_frame,
 
 def load_sprite_file(raw_file: RawFile, pal: PalAsset,
                      ver: MAMVersion, platform: Platform) -> SpriteAsset:
+    data = raw_file.as_memoryview()
+
+    # get the number of frames
+    if len(data) < 2:
+        raise MAMFileParseError(raw_file, f"Invalid sprite: file too short, length={len(data)}")
+    num_frames, = struct.unpack_from("<H", data, 0)
+    if not (0 < num_frames < 1024):
+        raise MAMFileParseError(raw_file, f"Invalid sprite: condition='0 < num_frames < 1024', num_frames={num_frames}")
+
+    # Pairs of 16bit offsets, each frame is a combination of up to two cells (see load_sprite_file_reference)
+    if len(data) < 2 + num_frames * 4:
+        raise MAMFileParseError(raw_file, f"Invalid sprite: cell offsets after end of file.")
+    cell_offsets = struct.unpack_from(f"<{num_frames * 2}H", data, 2)
+    unique_offsets = [x for x in sorted(list(set(cell_offsets))) if x != 0]
+    if any(x > len(data) for x in unique_offsets):
+        raise MAMFileParseError(raw_file, f"Invalid sprite: cell offset after end of file.")
+
+    # load the cells, as palette indexes
+    cell_lut: Dict[int, Tuple[Any, np.ndarray]] = {}
+    for offset in unique_offsets:
+        cell = read_cell_from_buffer(data, offset, raw_file)
+        cell_lut[offset] = (cell, decode_cell_indexed(data, offset + 8, cell, raw_file))
+
+    frame_width = max(x + w for (x, y, w, h), _ in cell_lut.values())
+    frame_height = max(y + h for ((x, y, w, h), _) in cell_lut.values())
+
+    # create the frames, cells are overlaid as indexes, then the palette is applied in one pass.
+    rgba_lut = pal_to_rgba_lut(pal)
+    frames = []
+    for i in range(num_frames):
+        frame_indexed = np.zeros((frame_height, frame_width), dtype=np.uint8)
+
+        cell_a, cell_b = cell_offsets[i*2], cell_offsets[i*2+1]
+        if cell_a == 0:
+            logging.warning("First frame of sprite was empty: file="+str(raw_file))
+        else:
+            cells = [cell_a] if cell_b == 0 else [cell_a, cell_b]
+            for cell_offset in cells:
+                _, cell_indexed = cell_lut[cell_offset]
+                h, w = cell_indexed.shape
+                np.copyto(frame_indexed[:h, :w], cell_indexed, where=cell_indexed != 0)
+        frames.append(Image.fromarray(np.take(rgba_lut, frame_indexed, axis=0), mode="RGBA"))
+
+    animations = get_animations_in_ccfile_sprite(raw_file.file_name, len(frames), 66, ver, platform)
+    return SpriteAsset(raw_file.file_id, raw_file.file_name, frames, animations)
+
+
+def load_sprite_file_reference(raw_file: RawFile, pal: PalAsset,
+                               ver: MAMVersion, platform: Platform) -> SpriteAsset:
+    """
+    The original, pixel at a time, sprite decoder.
+    It is much slower than load_sprite_file, but is kept as it's easy to follow and to validate the faster version.
+    """
     f = io.BytesIO(bytearray(raw_file.data))
 
     # get the number of frames
@@ -0,0 +1,160 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from chosm.asset_cache import AssetCache
+from chosm.resource_pack import ResourcePack, ResourcePackInfo
+from game_engine.game_state import GameState
+from game_engine.map import Map
+
+
+def write_asset(pack_folder, slug, name, type_name, files):
+    folder = os.path.join(pack_folder, slug)
+    os.makedirs(folder, exist_ok=True)
+    info = dict(id=0, name=name, type_name=type_name, created="2023-01-01T00:00:00+00:00", slug=slug)
+    with open(os.path.join(folder, "info.json"), "wt") as f:
+        json.dump(info, f)
+    for file_name, d in files.items():
+        with open(os.path.join(folder, file_name), "wt") as f:
+            json.dump(d, f)
+
+
+class Test(TestCase):
+    def test_lru(self):
+        cache = AssetCache(max_size=2)
+        for key in ["a", "b", "a", "c"]:
+            cache.get(key, 1, lambda: key.upper())
+        self.assertEqual(3, cache.num_loads)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+    def test_version(self):
+        cache = AssetCache()
+        self.assertEqual("v1", cache.get("a", 1, lambda: "v1"))
+        self.assertEqual("v1", cache.get("a", 1, lambda: "v2"))
+        self.assertEqual("v2", cache.get("a", 2, lambda: "v2"))
+        cache.invalidate("a")
+        self.assertEqual("v3", cache.get("a", 2, lambda: "v3"))
+
+    def test_pinning(self):
+        cache = AssetCache(max_size=1)
+        cache.get("a", 1, lambda: "a")
+        cache.pin("a")
+        for key in ["b", "c", "d"]:
+            cache.get(key, 1, lambda: key)
+        self.assertIn("a", cache)
+        self.assertEqual(2, len(cache))  # a (pinned) + the most recent
+
+        # pins carry over to a new version
+        cache.get("a", 2, lambda: "a2")
+        cache.get("e", 1, lambda: "e")
+        self.assertIn("a", cache)
+
+        cache.unpin("a")
+        cache.get("f", 1, lambda: "f")
+        self.assertNotIn("a", cache)
+
+    def test_single_flight(self):
+        cache = AssetCache()
+        results = []
+
+        def slow_load():
+            time.sleep(0.1)
+            return object()
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get("a", 1, slow_load))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(1, cache.num_loads)
+        self.assertEqual(1, len(set(id(r) for r in results)))
+
+    def test_failed_load_is_retried(self):
+        cache = AssetCache()
+
+        def fail():
+            raise ValueError("bad map")
+        self.assertRaises(ValueError, lambda: cache.get("a", 1, fail))
+        self.assertEqual("ok", cache.get("a", 1, lambda: "ok"))
+
+    def test_resource_pack_maps(self):
+        with tempfile.TemporaryDirectory() as folder:
+            ResourcePackInfo("test-pack", "admin", True).save_info_file(folder)
+            for name in ["m1", "m2", "unused"]:
+                write_asset(folder, f"map-{name}", name, "map", {"map.json": Map(name, 3, 2, ["height"], []).asdict()})
+            world_info = dict(world_name="world", map_names=["m1", "m2"], spell_names=[], default_map="m1")
+            write_asset(folder, "world-main", "main", "world", {"world_info.json": world_info})
+            pack = ResourcePack(folder)
+
+            world_1 = pack.load_world("main")
+            world_2 = pack.load_world("main")
+            self.assertEqual(["m1", "m2"], world_1.as_dict()["map_names"])
+            self.assertIs(world_1.get_map("m1"), world_2.get_map("m1"))
+            self.assertEqual(2, pack._map_cache.num_loads)  # "unused" is not loaded
+
+            # a game pins its world's maps, until released
+            game = GameState(world_1, pack)
+            self.assertEqual(1, pack._map_cache._entries["map-m1"].pins)
+            game.release()
+            self.assertEqual(0, pack._map_cache._entries["map-m1"].pins)
+
+            # the map is reloaded if map.json changes
+            old_map = world_1.get_map("m2")
+            path = os.path.join(folder, "map-m2", "map.json")
+            write_asset(folder, "map-m2", "m2", "map", {"map.json": Map("m2", 4, 4, ["height"], []).asdict()})
+            os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+            new_map = pack.load_world("main").get_map("m2")
+            self.assertIsNot(old_map, new_map)
+            self.assertEqual("m2", new_map.name)
+            self.assertEqual(4, new_map.width)
+
+    def test_pinning_more_maps_than_the_cache(self):
+        with tempfile.TemporaryDirectory() as folder:
+            ResourcePackInfo("test-pack", "admin", True).save_info_file(folder)
+            map_names = ["m0", "m1", "m2", "m3"]
+            for name in map_names:
+                write_asset(folder, f"map-{name}", name, "map", {"map.json": Map(name, 3, 2, ["height"], []).asdict()})
+            world_info = dict(world_name="world", map_names=map_names, spell_names=[], default_map="m0")
+            write_asset(folder, "world-main", "main", "world", {"world_info.json": world_info})
+            pack = ResourcePack(folder)
+            pack._map_cache.max_size = 2
+
+            # the maps are pinned as they load, so the early ones aren't evicted by the later ones
+            game_1 = GameState(pack.load_world("main", pin=True), pack, maps_pinned=True)
+            game_2 = GameState(pack.load_world("main", pin=True), pack, maps_pinned=True)
+            self.assertEqual(4, pack._map_cache.num_loads)
+            self.assertEqual({f"map-{n}": 2 for n in map_names},
+                             {k: e.pins for k, e in pack._map_cache._entries.items()})
+
+            # a game only releases its own pins
+            game_1.release()
+            game_1.release()
+            self.assertEqual({f"map-{n}": 1 for n in map_names},
+                             {k: e.pins for k, e in pack._map_cache._entries.items()})
+            game_2.release()
+            self.assertEqual(2, len(pack._map_cache))
+
+            # pin_maps can only pin what is still cached
+            world = pack.load_world("main")
+            game_3 = GameState(world, pack)
+            self.assertEqual(["m2", "m3"], game_3._pinned_maps)
+            game_3.release()
+            self.assertEqual(0, sum(e.pins for e in pack._map_cache._entries.values()))
+
+    def test_failed_world_load_releases_pins(self):
+        with tempfile.TemporaryDirectory() as folder:
+            ResourcePackInfo("test-pack", "admin", True).save_info_file(folder)
+            for name in ["m0", "m1"]:
+                write_asset(folder, f"map-{name}", name, "map", {"map.json": Map(name, 3, 2, ["height"], []).asdict()})
+            write_asset(folder, "map-bad", "bad", "map", {"map.json": {"not": "a map"}})
+            world_info = dict(world_name="world", map_names=["m0", "m1", "bad"], spell_names=[], default_map="m0")
+            write_asset(folder, "world-main", "main", "world", {"world_info.json": world_info})
+            pack = ResourcePack(folder)
+
+            with self.assertRaises(Exception):
+                pack.load_world("main", pin=True)
+            self.assertEqual(0, sum(e.pins for e in pack._map_cache._entries.values()))
@@ -0,0 +1,160 @@
+import datetime
+import gzip
+import os
+import tempfile
+import threading
+import warnings
+from unittest import TestCase
+
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from web.asset_file_server import AssetFileServer, encoding_etag, etag_matches
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from starlette.testclient import TestClient
+
+
+class _AssetRecord:
+    def __init__(self, folder):
+        self.folder = folder
+
+    def get_file_names(self, refresh_from_disk=False):
+        return sorted(os.listdir(self.folder))
+
+    def get_file_path(self, name):
+        return os.path.join(self.folder, name)
+
+
+class _Pack:
+    # just enough of a ResourcePack
+    def __init__(self, folder):
+        self.name = "test-pack"
+        self.assets = {"sprite-a": _AssetRecord(folder)}
+
+    def get_assets(self):
+        return self.assets
+
+    def __getitem__(self, slug):
+        return self.assets[slug]
+
+    def get_modification_time(self):
+        return datetime.datetime(2023, 1, 1)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.data = bytes(range(256)) * 4
+        with open(os.path.join(self.folder.name, "frame_00.png"), "wb") as f:
+            f.write(self.data)
+        with open(os.path.join(self.folder.name, "_animation.css"), "wt") as f:
+            f.write(".a { }" * 100)
+        with open(os.path.join(self.folder.name, "_animation.css.gz"), "wb") as f:
+            f.write(gzip.compress(b".a { }" * 100))
+
+        self.pack = pack = _Pack(self.folder.name)
+        self.server = AssetFileServer(max_cached_file_size=2000)
+        self.server.index_pack(pack)
+
+        async def endpoint(request):
+            return self.server.response(request, pack, request.path_params["slug"], request.path_params["file"])
+        self.client = TestClient(Starlette(routes=[Route("/{slug}/{file}", endpoint)]))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_etag(self):
+        r = self.client.get("/sprite-a/frame_00.png")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.content, self.data)
+        self.assertEqual(r.headers["content-type"], "image/png")
+        etag = r.headers["etag"]
+
+        r = self.client.get("/sprite-a/frame_00.png", headers={"If-None-Match": etag})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(self.client.get("/sprite-a/frame_00.png", headers={"If-None-Match": '"x"'}).status_code, 200)
+        for if_none_match in ["*", f'"x", W/{etag}']:
+            r = self.client.get("/sprite-a/frame_00.png", headers={"If-None-Match": if_none_match})
+            self.assertEqual(r.status_code, 304)
+        self.assertEqual(self.client.get("/sprite-a/missing.png").status_code, 404)
+
+    def test_encoding_etags(self):
+        self.assertEqual('"8a6d-gzip"', encoding_etag('"8a6d"', "gzip"))
+        self.assertEqual('"8a6d"', encoding_etag('"8a6d"', None))
+        self.assertFalse(etag_matches('"8a6d"', encoding_etag('"8a6d"', "br")))
+        self.assertTrue(etag_matches('W/"8a6d-br"', encoding_etag('"8a6d"', "br")))
+        self.assertFalse(etag_matches(None, '"8a6d"'))
+
+    def test_range(self):
+        r = self.client.get("/sprite-a/frame_00.png", headers={"Range": "bytes=10-19"})
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(r.content, self.data[10:20])
+        self.assertEqual(r.headers["content-range"], f"bytes 10-19/{len(self.data)}")
+
+        r = self.client.get("/sprite-a/frame_00.png", headers={"Range": "bytes=-5"})
+        self.assertEqual(r.content, self.data[-5:])
+        r = self.client.get("/sprite-a/frame_00.png", headers={"Range": "bytes=5000-"})
+        self.assertEqual(r.status_code, 416)
+
+        # a range that can't be parsed, or many ranges, is ignored
+        for range_header in ["bytes=0-1,5-9", "items=0-5", "bytes=9-2", "bytes=-"]:
+            r = self.client.get("/sprite-a/frame_00.png", headers={"Range": range_header})
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.content, self.data)
+
+    def test_compressed_sibling(self):
+        r = self.client.get("/sprite-a/_animation.css", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(r.headers["content-encoding"], "gzip")
+        self.assertEqual(r.content, b".a { }" * 100)  # decoded by the client
+        r2 = self.client.get("/sprite-a/_animation.css", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", r2.headers)
+        self.assertNotEqual(r.headers["etag"], r2.headers["etag"])
+
+    def test_invalidate(self):
+        etag = self.client.get("/sprite-a/frame_00.png").headers["etag"]
+        with open(os.path.join(self.folder.name, "frame_00.png"), "wb") as f:
+            f.write(b"changed")
+        self.assertEqual(self.client.get("/sprite-a/frame_00.png").headers["etag"], etag)
+
+        self.server.invalidate("test-pack", "sprite-a")
+        r = self.client.get("/sprite-a/frame_00.png")
+        self.assertEqual(r.content, b"changed")
+        self.assertNotEqual(r.headers["etag"], etag)
+
+    def test_pack_reindex(self):
+        etag = self.client.get("/sprite-a/frame_00.png").headers["etag"]  # the body is cached
+        with open(os.path.join(self.folder.name, "frame_00.png"), "wb") as f:
+            f.write(b"changed")
+        self.pack.get_modification_time = lambda: datetime.datetime(2023, 1, 2)
+        r = self.client.get("/sprite-a/frame_00.png")
+        self.assertEqual(r.content, b"changed")
+        self.assertNotEqual(r.headers["etag"], etag)
+
+    def test_deleted_file(self):
+        self.client.get("/sprite-a/frame_00.png")
+        self.server._bodies = type(self.server._bodies)(self.server._bodies.max_bytes)  # not cached
+        os.remove(os.path.join(self.folder.name, "frame_00.png"))
+        self.assertEqual(self.client.get("/sprite-a/frame_00.png").status_code, 404)
+        self.assertEqual(self.client.get("/sprite-a/frame_00.png").status_code, 404)
+
+    def test_invalidate_while_serving(self):
+        # the PackWatcher invalidates on its own thread, while requests add files to the index
+        stop = threading.Event()
+        errors = []
+
+        def invalidate():
+            while not stop.is_set():
+                try:
+                    self.server.invalidate("test-pack", "sprite-a")
+                except Exception as e:
+                    errors.append(e)
+
+        t = threading.Thread(target=invalidate)
+        t.start()
+        for _ in range(200):
+            self.server.get_info(self.pack, "sprite-a", "frame_00.png")
+        stop.set()
+        t.join()
+        self.assertEqual([], errors)
@@ -0,0 +1,84 @@
+import fnmatch
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import List
+from unittest import TestCase
+
+from chosm.asset_index import AssetIndex, AssetQueryError, compile_glob, parse_query
+from chosm.game_constants import AssetTypes
+from chosm.resource_pack import ResourcePack, ResourcePackInfo
+
+
+@dataclass
+class _Asset:
+    name: str
+    file_id: int
+    type_name: str
+    tags: List[str] = field(default_factory=list)
+
+
+def make_index(assets):
+    return AssetIndex(assets, key_fields=dict(name=lambda a: a.name, id=lambda a: a.file_id),
+                      tag_fields=dict(type=lambda a: [a.type_name], tag=lambda a: a.tags))
+
+
+class Test(TestCase):
+    def setUp(self):
+        names = ["ltree.wal", "dtree.wal", "tree.wal", "grass.srf", "grass.wal", "dirt.srf", "palm.wal", "tree"]
+        self.assets = [_Asset(n, i, "sprite" if i % 3 else "map", ["outdoor"] if "tree" in n else [])
+                       for i, n in enumerate(names)]
+        self.index = make_index(self.assets)
+
+    def test_compile_glob(self):
+        self.assertEqual(("tree.wal", None), compile_glob("tree.wal"))
+        self.assertEqual("tree", compile_glob("tree*")[0])
+        self.assertEqual("", compile_glob("*tree*")[0])
+        self.assertEqual("gr", compile_glob("gr[a]ss*")[0])
+
+    def test_glob_matches_fnmatch(self):
+        for pattern in ["*", "tree*", "*tree*", "grass.*", "?tree.wal", "tree", "missing*", "*.srf", "gr[a]ss.wal"]:
+            expected = [a for a in self.assets if fnmatch.fnmatchcase(a.name, pattern)]
+            self.assertEqual(expected, self.index.find(name=pattern), pattern)
+
+    def test_find(self):
+        self.assertEqual(self.assets, self.index.find())
+        self.assertEqual([self.assets[2]], self.index.find(id=2))
+        self.assertEqual([a for a in self.assets if a.type_name == "map"], self.index.find(type="map"))
+        self.assertEqual([self.assets[i] for i in [1, 2, 7]], self.index.find(type="sprite", tag="outdoor"))
+        self.assertEqual([self.assets[1], self.assets[2]], self.index.find(type="sprite", tag="outdoor", name="*.wal"))
+        self.assertEqual([], self.index.find(tag="missing"))
+        self.assertRaises(AssetQueryError, lambda: self.index.find(colour="red"))
+
+    def test_query(self):
+        self.assertEqual({"type": "sprite", "tag": ["a", "b"], "name": "*tree*"},
+                         parse_query("type=sprite  tag=a,b name=*tree*"))
+        self.assertRaises(AssetQueryError, lambda: parse_query("type=sprite tree"))
+        self.assertEqual(self.index.find(type="sprite", name="*tree*"), self.index.query("type=sprite name=*tree*"))
+
+    def test_extend(self):
+        extra = _Asset("acorn.wal", 100, "sprite", ["outdoor"])
+        self.index.extend([extra])
+        self.assertEqual([extra], self.index.find(name="a*"))
+        self.assertEqual(extra, self.index.find(tag="outdoor")[-1])
+        self.assertEqual(len(self.assets) + 1, len(self.index))
+
+    def test_resource_pack_query(self):
+        with tempfile.TemporaryDirectory() as folder:
+            ResourcePackInfo("test-pack", "admin", True).save_info_file(folder)
+            for a in self.assets:
+                slug = f"{a.type_name}-{a.name.replace('.', '-')}"
+                os.makedirs(os.path.join(folder, slug))
+                with open(os.path.join(folder, slug, "info.json"), "wt") as f:
+                    json.dump(dict(id=a.file_id, name=a.name, type_name=a.type_name, slug=slug,
+                                   created="2023-01-01T00:00:00+00:00", tags=a.tags, env_tags=["outdoor"]), f)
+            pack = ResourcePack(folder)
+
+            self.assertEqual({"sprite-dtree-wal", "sprite-tree-wal", "sprite-tree"},
+                             set(pack.query("type=sprite tag=outdoor").keys()))
+            self.assertEqual({"tree.wal", "tree"}, set(pack.get_assets_by_type(AssetTypes.SPRITE, "tree*").keys()) |
+                             set(pack.get_assets_by_type(AssetTypes.MAP, "tree*").keys()))
+            self.assertEqual({"sprite-grass-wal"}, set(pack.get_assets("sprite-grass*").keys()))
+            self.assertEqual({"map-grass-srf", "sprite-grass-wal"}, set(pack.get_assets("*-grass*").keys()))
+            self.assertEqual(len(self.assets), len(pack.query("env=outdoor")))
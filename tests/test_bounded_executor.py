@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from helpers.bounded_executor import BoundedExecutor, ExecutorBusyError, read_text
+
+
+class Test(TestCase):
+    def test_run(self):
+        executor = BoundedExecutor("test", max_workers=2)
+
+        async def go():
+            return await asyncio.gather(*[executor.run(pow, i, 2) for i in range(10)])
+
+        self.assertEqual([i * i for i in range(10)], asyncio.run(go()))
+        self.assertEqual(0, executor.num_jobs)
+        executor.shutdown()
+
+    def test_does_not_block_loop(self):
+        executor = BoundedExecutor("test", max_workers=1)
+
+        async def go():
+            ticks = 0
+            slow = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+            while not slow.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return ticks
+
+        self.assertGreater(asyncio.run(go()), 5)
+        executor.shutdown()
+
+    def test_backpressure(self):
+        executor = BoundedExecutor("test", max_workers=1, max_pending=2)
+        release = threading.Event()
+
+        async def go():
+            jobs = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(3)]
+            await asyncio.sleep(0)
+            with self.assertRaises(ExecutorBusyError):
+                await executor.run(release.wait)
+            release.set()
+            await asyncio.gather(*jobs)
+            # there is room again
+            return await executor.run(pow, 2, 3)
+
+        self.assertEqual(8, asyncio.run(go()))
+        executor.shutdown()
+
+    def test_single_flight(self):
+        executor = BoundedExecutor("test", max_workers=4)
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return "loaded"
+
+        async def go():
+            return await asyncio.gather(*[executor.run(load, key="a") for _ in range(5)])
+
+        self.assertEqual(["loaded"] * 5, asyncio.run(go()))
+        self.assertEqual(1, len(calls))
+        executor.shutdown()
+
+    def test_error(self):
+        executor = BoundedExecutor("test")
+
+        async def go():
+            await executor.run(int, "not a number")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(go())
+        self.assertEqual(0, executor.num_jobs)
+        executor.shutdown()
+
+    def test_read_text(self):
+        executor = BoundedExecutor("test")
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "a.css")
+            with open(path, "wt") as f:
+                f.write(".a { }")
+            self.assertEqual(".a { }", asyncio.run(read_text(executor, path)))
+        executor.shutdown()
@@ -0,0 +1,93 @@
+import os
+import pickle
+import struct
+import tempfile
+from unittest import TestCase
+
+from PIL import Image
+
+from chosm.asset import Asset
+from chosm.pal_asset import PalAsset
+from chosm.sprite_asset import SpriteAsset
+from helpers.color import Color
+from mam_game.cc_file import CCFile, CCRawFile
+from mam_game.mam_constants import MAMVersion, Platform, RawFile
+
+
+def _encrypt_toc(toc: bytes) -> bytes:
+    # the inverse of CCFile._decrypt_toc
+    out = bytearray()
+    ah = 0xac
+    for b in toc:
+        r = (b - ah) & 0xff
+        out.append(((r >> 2) | (r << 6)) & 0xff)
+        ah += 0x67
+    return bytes(out)
+
+
+def _write_cc_file(path, files, xor_value=0x35):
+    toc = b""
+    body = b""
+    offset = 2 + len(files) * 8
+    for name, data in files:
+        toc += struct.pack("<H", CCFile.get_file_name_hash(name))
+        toc += struct.pack("<I", offset + len(body))[:3] + struct.pack("<HB", len(data), 0)
+        body += bytes(d ^ xor_value for d in data)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<H", len(files)) + _encrypt_toc(toc) + body)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.files = [(f"FILE{i:02d}.BIN", bytes(range(i, i + 20 + i))) for i in range(12)]
+        self.path = os.path.join(self.folder.name, "TEST.CC")
+        _write_cc_file(self.path, self.files)
+        lut = {CCFile.get_file_name_hash(n): n for n, _ in self.files}
+        self.cc_file = CCFile(self.path, lut, MAMVersion.DARKSIDE, Platform.PC_DOS)
+
+    def tearDown(self):
+        self.cc_file = None
+        self.folder.cleanup()
+
+    def test_lazy_decrypt(self):
+        raw_files = self.cc_file.get_raw_files()
+        self.assertEqual(len(raw_files), len(self.files))
+        self.assertFalse(any(r.is_loaded() for r in raw_files))
+
+        for name, data in self.files:
+            raw = self.cc_file.get_raw_files(name.lower())[0]
+            self.assertEqual(bytes(raw.data), data)
+            self.assertTrue(raw.is_loaded())
+
+    def test_pickle(self):
+        raw = self.cc_file.get_raw_files("file03.bin")[0]
+        self.assertIsInstance(raw, CCRawFile)
+        copied = pickle.loads(pickle.dumps(raw))
+        self.assertIsInstance(copied, RawFile)
+        self.assertEqual((copied.file_id, copied.file_name, copied.data), (raw.file_id, raw.file_name, raw.data))
+
+    def test_merge_copy(self):
+        merged = self.cc_file.merge(self.cc_file, to_copy=True)
+        self.assertEqual(len(merged.get_raw_files()), 2 * len(self.files))
+        self.assertEqual(len(self.cc_file.get_raw_files()), len(self.files))
+
+    def test_resource_index(self):
+        sprites = [SpriteAsset(i, f"tree{i}.wal", [Image.new("RGBA", (4, 4))], []) for i in range(3)]
+        sprites[1].tag("outdoor")
+        pal = PalAsset(0, "default.pal", [Color(0, 0, 0)] * 256)
+        self.cc_file._resources += sprites
+        self.assertEqual(sprites, self.cc_file.get_resources(SpriteAsset))
+
+        # resources added after the index is built are found
+        self.cc_file._resources.append(pal)
+        self.assertEqual(sprites + [pal], self.cc_file.get_resources(Asset))
+        self.assertIs(pal, self.cc_file.get_resource(PalAsset, "DEFAULT.PAL"))
+        self.assertIs(sprites[2], self.cc_file.get_resource(SpriteAsset, 2))
+        self.assertEqual([sprites[1]], self.cc_file.find_resources(SpriteAsset, tag="outdoor"))
+        self.assertEqual(sprites[1:], self.cc_file.get_resources(SpriteAsset, "tree[12]*"))
+        self.assertRaises(KeyError, lambda: self.cc_file.get_resource(PalAsset, 2))
+
+        merged = self.cc_file.merge(self.cc_file, to_copy=True)
+        self.assertEqual(2 * len(sprites), len(merged.get_resources(SpriteAsset)))
+        self.assertEqual(len(sprites), len(self.cc_file.get_resources(SpriteAsset)))
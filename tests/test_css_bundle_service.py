@@ -0,0 +1,99 @@
+import datetime
+import gzip
+import os
+import tempfile
+from unittest import TestCase
+
+from chosm.css_bundle_service import CssBundleService, patch_css
+from chosm.game_constants import AssetTypes
+
+
+class _Sprite:
+    def __init__(self, folder, slug):
+        self.slug = slug
+        self.name = slug
+        self.folder = os.path.join(folder, slug)
+        os.makedirs(self.folder)
+        with open(self.get_file_path('_animation.css'), "wt") as f:
+            f.write(f".anim_{slug} {{ background-image: url('_anim_idle.png'); }}")
+
+    def get_file_path(self, file_name):
+        return os.path.join(self.folder, file_name)
+
+
+class _Map:
+    def __init__(self, folder, slug, atlas_css):
+        self.slug = slug
+        self.folder = os.path.join(folder, slug)
+        os.makedirs(self.folder)
+        self.file_names = []
+        if atlas_css is not None:
+            self.file_names.append("_atlas.css")
+            with open(self.get_file_path("_atlas.css"), "wt") as f:
+                f.write("div.anim_sprite-b_idle { background-image: url('_atlas_00.png'); }")
+
+    def get_file_names(self):
+        return self.file_names
+
+    def get_file_path(self, file_name):
+        return os.path.join(self.folder, file_name)
+
+
+class _Pack:
+    # just enough of a ResourcePack
+    def __init__(self, folder):
+        self.name = "test-pack"
+        self.sprites = {s: _Sprite(folder, s) for s in ["sprite-a", "sprite-b", "sprite-c"]}
+        self.maps = {"some-map": _Map(folder, "map-some-map", None), "atlas-map": _Map(folder, "map-atlas-map", "")}
+        self.modified = datetime.datetime(2023, 1, 1)
+
+    def get_assets_by_type(self, asset_type):
+        return self.sprites if asset_type == AssetTypes.SPRITE else {}
+
+    def get_sprites_for_map(self, map_name):
+        return [self.sprites["sprite-b"]]
+
+    def __getitem__(self, key):
+        asset_type, name = key
+        return self.maps[name]
+
+    def get_modification_time(self):
+        return self.modified
+
+
+class Test(TestCase):
+    def test_patch_css(self):
+        self.assertEqual(patch_css("url('a.png') url(\"b.png\")", "/x/y"), "url('/x/y/a.png') url(\"/x/y/b.png\")")
+
+    def test_bundles(self):
+        with tempfile.TemporaryDirectory() as folder:
+            pack = _Pack(folder)
+            service = CssBundleService(lambda pack_name, slug: f"/download/{pack_name}/{slug}")
+            service.build(pack)
+
+            whole = service.get_bundle(pack)
+            css = whole.css.decode()
+            self.assertEqual(css.count(".anim_"), 3)
+            self.assertIn("url('/download/test-pack/sprite-a/_anim_idle.png')", css)
+            self.assertEqual(gzip.decompress(whole.gzip), whole.css)
+            self.assertEqual(whole.get_encoded("gzip, deflate")[1], "gzip")
+            self.assertEqual(whole.get_encoded("")[0], whole.css)
+
+            for_map = service.get_bundle(pack, "some-map")
+            self.assertEqual(for_map.css.decode().count(".anim_"), 1)
+            self.assertNotEqual(for_map.etag, whole.etag)
+
+            # maps baked with an atlas are bundled from their _atlas.css
+            self.assertEqual(service.get_bundle(pack, "atlas-map").css.decode(),
+                             "div.anim_sprite-b_idle { background-image: url('/download/test-pack/map-atlas-map/_atlas_00.png'); }")
+
+            # warm requests don't read the files
+            os.remove(pack.sprites["sprite-a"].get_file_path('_animation.css'))
+            self.assertIs(service.get_bundle(pack), whole)
+
+            # bundles are rebuilt when the pack changes
+            with open(pack.sprites["sprite-a"].get_file_path('_animation.css'), "wt") as f:
+                f.write(".anim_new {}")
+            pack.modified = datetime.datetime(2023, 1, 2)
+            self.assertIn(".anim_new", service.get_bundle(pack).css.decode())
+            self.assertEqual(service.get_bundle(pack, "some-map").etag, for_map.etag)
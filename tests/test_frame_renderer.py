@@ -0,0 +1,42 @@
+import io
+from unittest import TestCase
+
+import numpy as np
+from PIL import Image
+
+from game_engine.frame_renderer import FrameRenderer
+from game_engine.map import Map, MapInstance, AssetLut
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from mam_game.mam_constants import Direction
+
+COLOURS = {"sky": (0, 0, 255, 255), "grass": (0, 255, 0, 255), "water": (0, 0, 128, 255), "tree": (255, 0, 0, 255)}
+
+
+class Test(TestCase):
+    def setUp(self):
+        svp = SingleVanishingPointPainting([], [], size=(320, 200), view_dist=4)
+        self.renderer = FrameRenderer(svp, lambda slug: Image.new("RGBA", (8, 8), COLOURS[slug]), sky_slug="sky")
+        luts = [AssetLut("ground", {0: None, 1: "grass", 2: "water"}), AssetLut("env", {0: None, 1: "tree"})]
+        self.base = Map("test", 9, 9, ["ground", "env"], luts)
+        self.base.set_layers({"ground": [1] * 81})
+
+    def test_render(self):
+        frame = self.renderer.render(self.base, 4, 4, Direction.NORTH)
+        self.assertEqual(frame.shape, (200, 320, 3))
+        self.assertEqual(tuple(frame[10, 160]), (0, 0, 255))  # sky
+        self.assertEqual(tuple(frame[195, 160]), (0, 255, 0))  # the tile the party is on
+
+        instance = MapInstance(self.base)
+        instance[4, 5] = {"env": 1}  # a tree, one step in front
+        frame = self.renderer.render(instance, 4, 4, Direction.NORTH)
+        self.assertIn((255, 0, 0), set(map(tuple, frame.reshape(-1, 3).tolist())))
+
+    def test_frame_cache(self):
+        instance = MapInstance(self.base)
+        data = self.renderer.get_frame(instance, 4, 4, Direction.EAST)
+        self.assertEqual(Image.open(io.BytesIO(data)).format, "WEBP")
+        self.assertIs(self.renderer.get_frame(MapInstance(self.base), 4, 4, Direction.EAST), data)
+
+        # a changed map is rendered again
+        instance[5, 4] = {"ground": 2}
+        self.assertIsNot(self.renderer.get_frame(instance, 4, 4, Direction.EAST), data)
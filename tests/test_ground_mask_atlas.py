@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from game_engine.ground_mask_atlas import ViewConfig, build_ground_mask_atlases, get_mask_steps, mask_class_name
+
+
+class Test(TestCase):
+    def test_build_ground_mask_atlases(self):
+        configs = [ViewConfig(size=(160, 100), view_dist=4), ViewConfig(size=(96, 64), view_dist=3)]
+        atlases = build_ground_mask_atlases(configs, scale=1, workers=None)
+        self.assertEqual(list(atlases.keys()), configs)
+
+        config = configs[0]
+        atlas = atlases[config]
+        self.assertEqual(set(atlas.cells.keys()), set(get_mask_steps(config)))
+        self.assertEqual(atlas.tile_size, (160, 50))
+        tile_w, tile_h = atlas.tile_size
+        for (steps_f, steps_r), (col, row) in atlas.cells.items():
+            cell = atlas.image.crop((col * tile_w, row * tile_h, (col + 1) * tile_w, (row + 1) * tile_h))
+            mask = config.make_composer().draw_mask(steps_f, steps_r)
+            self.assertTrue(np.array_equal(np.array(cell), np.array(mask)))
+
+        with tempfile.TemporaryDirectory() as folder:
+            files = atlas.save(folder)
+            self.assertTrue(all(os.path.isfile(f) for f in files))
+            with open(files[1], "rt") as f:
+                index = json.load(f)
+            self.assertEqual(index["image"], config.slug + ".webp")
+            self.assertEqual(len(index["masks"]), len(atlas.cells))
+            with open(files[2], "rt") as f:
+                self.assertIn("." + mask_class_name(0, -1) + " {", f.read())
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from PIL import Image
+
+from chosm.map_asset import MapAsset
+from chosm.sprite_asset import SpriteAsset, AnimLoop
+from game_engine.map import Map
+from helpers.atlas_packer import ShelfPacker, pack_images
+
+
+def _frames(n, size, seed):
+    rng = np.random.default_rng(seed)
+    return [Image.fromarray(rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8), "RGBA") for _ in range(n)]
+
+
+class Test(TestCase):
+    def test_shelf_packer(self):
+        packer = ShelfPacker((100, 100))
+        self.assertEqual(packer.add_group([(60, 40), (40, 40)]), [(0, 0, 0), (0, 60, 0)])
+        self.assertEqual(packer.add_group([(30, 30)]), [(0, 0, 40)])
+        # a group that does not fit goes (entirely) into a new bin
+        self.assertEqual(packer.add_group([(50, 30), (100, 50)]), [(1, 0, 0), (1, 0, 30)])
+        # a group that is larger than max_size gets its own (larger) bin
+        self.assertEqual(packer.add_group([(150, 10)]), [(2, 0, 0)])
+        self.assertEqual(packer.get_bin_sizes(), [(100, 70), (100, 80), (150, 10)])
+
+    def test_pack_images(self):
+        groups = [_frames(3, (20, 10), 1), _frames(2, (16, 32), 2), []]
+        atlases, positions = pack_images(groups, max_size=(64, 64))
+        for group, group_positions in zip(groups, positions):
+            self.assertEqual(len(group), len(group_positions))
+            for img, (atlas_idx, x, y) in zip(group, group_positions):
+                cell = atlases[atlas_idx].crop((x, y, x + img.width, y + img.height))
+                self.assertTrue(np.array_equal(np.array(cell), np.array(img)))
+
+    def test_map_atlas_bake(self):
+        tree = SpriteAsset(1, "tree", _frames(3, (20, 30), 3), [AnimLoop.make_simple("idle", 2, 100)])
+        grass = SpriteAsset(2, "grass", _frames(1, (40, 10), 4), [AnimLoop.make_static(0, "idle")])
+        the_map = Map("test", 2, 2, ["ground", "env"], [])
+        map_asset = MapAsset(3, "test", the_map)
+        map_asset.set_luts({"ground": {0: None, 1: grass}, "env": {0: None, 1: tree, 2: tree}})
+
+        with tempfile.TemporaryDirectory() as folder:
+            map_asset._bake_atlas(folder)
+            with open(os.path.join(folder, "_atlas.json")) as f:
+                index = json.load(f)
+            with open(os.path.join(folder, "_atlas.css")) as f:
+                css = f.read()
+
+            self.assertEqual(sorted(index["sprites"].keys()), [grass.slug, tree.slug])
+            # only the frames used by an animation are packed
+            self.assertEqual(sorted(index["sprites"][tree.slug]["frames"].keys()), ["0", "1"])
+            atlas_idx, x, y = index["sprites"][tree.slug]["frames"]["1"]
+            atlas = Image.open(os.path.join(folder, index["atlases"][atlas_idx]["file"]))
+            self.assertTrue(np.array_equal(np.array(atlas.crop((x, y, x + 20, y + 30))), np.array(tree.frames[1])))
+
+            self.assertIn(f"div.anim_{tree.slug}_idle {{", css)
+            self.assertIn(f"@keyframes play_{tree.slug}_idle", css)
+            self.assertIn(f"div.anim_{grass.slug}_idle {{", css)
@@ -0,0 +1,51 @@
+import io
+import random
+from unittest import TestCase
+
+import helpers.stream_helpers as sh
+
+
+class Test(TestCase):
+    def setUp(self):
+        random.seed(5)
+        self.data = random.randbytes(8 * 100)
+
+    def test_read_records_matches_read_dict(self):
+        record_format = [("file_id", "uint16"), ("offset", "uint24"), ("length", "uint16"), ("_", "byte")]
+        expected = sh.read_dict(io.BytesIO(self.data), record_format, n=100)
+
+        records = sh.read_records(io.BytesIO(self.data), record_format, 100)
+        self.assertEqual(records.dtype.names, ("file_id", "offset", "length"))
+        self.assertEqual([dict(zip(records.dtype.names, r)) for r in records.tolist()], expected)
+
+    def test_read_record_tuples_matches_read_list(self):
+        values = "uint32,uint16,byte,byte"
+        f_old, f_new = io.BytesIO(self.data), io.BytesIO(self.data)
+        expected = [tuple(sh.read_list(f_old, values)) for _ in range(10)]
+        self.assertEqual(sh.read_record_tuples(f_new, values, n=10), expected)
+        self.assertEqual(f_old.tell(), f_new.tell())
+        self.assertEqual(sh.read_record_tuples(f_new, values), tuple(sh.read_list(f_old, values)))
+
+    def test_arrays_and_strings(self):
+        data = b"abc\0\0d" + bytes([1, 2, 3, 4, 5, 6, 7])
+        name, values, uint24s = sh.read_record_tuples(io.BytesIO(data), [("name", "str6"), ("v", "byte"),
+                                                                         ("w", "uint24[2]")])
+        self.assertEqual(name, sh.read_string(io.BytesIO(data), size=6))
+        self.assertEqual(values, 1)
+        self.assertEqual(uint24s, [0x040302, 0x070605])
+
+    def test_string_arrays(self):
+        data = b"ab\0\0c\0de" + b"wxyz\0\0\0\0"
+        labels, = sh.read_record_tuples(io.BytesIO(data), [("labels", "str4[2]")])
+        self.assertEqual(labels, ["ab", "cde"])
+        records = sh.read_records(io.BytesIO(data * 2), [("labels", "str4[2]"), ("more", "str4[2]")], 1)
+        self.assertEqual(sh.compile_record_format([("labels", "str4[2]"), ("more", "str4[2]")]).to_tuples(records),
+                         [(["ab", "cde"], ["wxyz", ""])])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            sh.compile_record_format([("a", "uint64")])
+        with self.assertRaises(ValueError):
+            sh.compile_record_format([("a", "byte"), ("a", "byte")])
+        with self.assertRaises(EOFError):
+            sh.read_records(io.BytesIO(b"\0"), "uint16", 1)
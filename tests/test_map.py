@@ -0,0 +1,103 @@
+import json
+from unittest import TestCase
+
+import numpy as np
+
+from game_engine.map import Map, ColumnarMap, MapInstance, AssetLut, load_map_from_dict
+from helpers.archetyped_table import ArchetypedTable
+from helpers.columnar_table import ColumnarTable
+
+
+class Test(TestCase):
+    def test_set_layers(self):
+        bulk = Map("test", 4, 3, ["height", "is water"], [])
+        heights = np.arange(12).reshape(3, 4) % 5
+        bulk.set_layers({"height": heights, "is water": (heights == 0)})
+
+        expected = Map("test", 4, 3, ["height", "is water"], [])
+        for y in range(3):
+            for x in range(4):
+                expected[x, y] = {"height": int(heights[y, x]), "is water": bool(heights[y, x] == 0)}
+        expected.recompress_map()
+
+        self.assertEqual(bulk.asdict(), expected.asdict())
+        self.assertIs(bulk[0, 0, "is water"], True)
+
+        # layers not given are unaltered
+        bulk.set_layers({"is-water": [False] * 12})
+        self.assertEqual(bulk.get_layers()["height"], heights.reshape(-1).tolist())
+
+        with self.assertRaises(KeyError):
+            bulk.set_layers({"depth": heights})
+        with self.assertRaises(ValueError):
+            bulk.set_layers({"height": [1, 2]})
+
+    def test_from_columns(self):
+        columns = {"a": [1, 1, 2, 1], "b": ["x", "y", "y", "y"]}
+        table = ArchetypedTable.from_columns(columns)
+        self.assertEqual(table[:], ArchetypedTable([{"a": a, "b": b} for a, b in zip(*columns.values())])[:])
+        self.assertEqual(table.get_difference_table(), [{"b": "x"}, {}, {"a": 2}, {}])
+        self.assertEqual(table.get_columns(), columns)
+
+    def test_columnar_table_widening(self):
+        table = ColumnarTable({"a": [1, 2], "b": [True, False], "c": [1, 2], "d": [1, 2]})
+        table[0, "a"] = 1.1
+        self.assertEqual(1.1, table[0, "a"])
+        self.assertEqual(2, table[1, "a"])
+        table[0, "d"] = 1e300
+        self.assertEqual(1e300, table[0, "d"])
+
+        # bool <-> number is a change of type, so neither value is changed
+        table[0, "b"] = 5
+        self.assertEqual(5, table[0, "b"])
+        self.assertIs(False, table[1, "b"])
+        table[0, "c"] = True
+        self.assertIs(True, table[0, "c"])
+        self.assertEqual(2, table[1, "c"])
+        self.assertIsNot(True, table[1, "c"])
+
+        # widening keeps the dtype numeric
+        table[1, "a"] = 70000
+        self.assertEqual(np.dtype(np.float64), table.column("a").dtype)
+        self.assertEqual([1.1, 70000], table.get_columns()["a"])
+
+    def test_columnar_map(self):
+        the_map = Map("test", 5, 4, ["height", "ground", "has grate"], [AssetLut("ground", {0: None, 1: "grass"})])
+        rng = np.random.default_rng(3)
+        the_map.set_layers({"height": rng.integers(0, 3, 20), "ground": rng.integers(0, 400, 20),
+                            "has grate": rng.random(20) < 0.5})
+        d = json.loads(json.dumps(the_map.asdict()))
+
+        columnar = load_map_from_dict(d, ColumnarMap)
+        self.assertEqual(columnar.asdict(), load_map_from_dict(d).asdict())
+        self.assertEqual(columnar[2, 3], the_map[2, 3])
+        self.assertTrue(np.array_equal(columnar.region(1, 1, 3, 4, "ground"),
+                                       [[the_map[x, y, "ground"] for x in range(1, 3)] for y in range(1, 4)]))
+        self.assertEqual(columnar.memory_report()["total"], 20 * (1 + 2 + 1))
+
+        # a columnar map can be the base of an instance
+        instance = MapInstance(columnar)
+        instance[2, 3] = {"ground": 1000}
+        self.assertEqual(instance[2, 3, "ground"], 1000)
+        self.assertEqual(columnar[2, 3, "ground"], the_map[2, 3, "ground"])
+
+    def test_instance_overlay(self):
+        base = Map("test", 4, 4, ["height", "ground"], [])
+        base.set_layers({"ground": np.arange(16) % 3})
+        instance = MapInstance(base)
+        self.assertEqual(instance._map.num_altered_rows(), 0)
+        self.assertEqual([instance[x, y] for x, y, _ in base], [base[x, y] for x, y, _ in base])
+
+        instance[1, 2] = {"height": 5, "ground": base[1, 2, "ground"]}
+        instance._map[-1, "ground"] = 9
+        self.assertEqual(instance._map.num_altered_rows(), 2)
+        self.assertEqual(instance[1, 2], {"height": 5, "ground": base[1, 2, "ground"]})
+        self.assertEqual(instance[3, 3, "ground"], 9)
+        self.assertEqual(base[1, 2, "height"], 0)
+        self.assertEqual(len(list(instance._map)), 16)
+
+        # setting a cell back to the base value removes the difference
+        instance._map[-1, "ground"] = base[3, 3, "ground"]
+        self.assertEqual(instance._map.num_altered_rows(), 1)
+        with self.assertRaises(IndexError):
+            _ = instance._map[16]
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from game_engine.map import Map, ColumnarMap, MapInstance, AssetLut, load_map_from_dict
+from game_engine.map_bin import map_to_bin, map_from_bin, save_map_bin, load_map_bin
+from helpers.misc import my_json_dumps
+
+
+def make_map(w=40, h=30):
+    rng = np.random.default_rng(3)
+    luts = [AssetLut("ground", {0: None, 1: "sprite-grass", 2: "sprite-dirt"}),
+            AssetLut("env", {0: None, 7: "sprite-tree"})]
+    the_map = Map("overworld", w, h, ["ground", "env", "height", "is water"], luts)
+    the_map.set_layers({"ground": rng.integers(0, 3, w * h),
+                        "env": rng.choice([0, 7], w * h),
+                        "height": rng.integers(-5, 1000, w * h),
+                        "is water": rng.integers(0, 2, w * h).astype(bool)})
+    return the_map
+
+
+class Test(TestCase):
+    def test_round_trip_vs_map_json(self):
+        the_map = make_map()
+        with tempfile.TemporaryDirectory() as folder:
+            # as per MapAsset.bake
+            with open(os.path.join(folder, "map.json"), "wt") as f:
+                f.write(my_json_dumps(the_map.asdict()))
+            save_map_bin(the_map, os.path.join(folder, "map.bin"))
+
+            with open(os.path.join(folder, "map.json"), "rt") as f:
+                from_json = load_map_from_dict(json.load(f))
+            for map_type in [ColumnarMap, Map]:
+                for use_mmap in [False, True]:
+                    from_bin = load_map_bin(os.path.join(folder, "map.bin"), map_type, use_mmap=use_mmap)
+                    self.assertIsInstance(from_bin, map_type)
+                    self.assertEqual(from_json.asdict(), from_bin.asdict())
+                    for layer_name in from_json.layer_names:
+                        np.testing.assert_array_equal(from_json.layer_array(layer_name),
+                                                      from_bin.layer_array(layer_name))
+                    self.assertEqual(from_json.luts_by_name["ground"][1], from_bin.luts_by_name["ground"][1])
+                    from_bin = None  # release the mmap before the folder is deleted
+
+    def test_layers_are_not_copied(self):
+        data = map_to_bin(make_map())
+        the_map = map_from_bin(data)
+        self.assertFalse(the_map.layer_array("height").flags.owndata)
+        self.assertEqual(np.dtype(np.uint8), the_map.layer_array("ground").dtype)  # the smallest dtype
+        self.assertEqual(np.dtype(bool), the_map.layer_array("is-water").dtype)
+
+    def test_changes(self):
+        the_map = map_from_bin(map_to_bin(make_map()))
+        instance = MapInstance(the_map)
+        instance[1, 2] = {"ground": 2, "height": 5000}
+        self.assertEqual(5000, instance[1, 2, "height"])
+        self.assertNotEqual(5000, the_map[1, 2, "height"])
+
+        # the base map's layers are copied on write
+        the_map[3, 4] = {"env": 0}
+        self.assertEqual(0, the_map[3, 4, "env"])
+
+    def test_changes_wider_than_the_layer(self):
+        the_map = map_from_bin(map_to_bin(make_map()))
+        self.assertEqual(np.dtype(np.uint8), the_map.layer_array("ground").dtype)
+        instance = MapInstance(the_map)
+        instance[1, 2] = {"ground": 300}
+        instance[3, 4] = {"ground": 1.5}
+        row = 2 * the_map.width + 1
+        layer = instance.layer_array("ground")
+        self.assertEqual(300, layer[row])
+        self.assertEqual(1.5, layer[4 * the_map.width + 3])
+        on_map, values = instance.gather(np.array([1, 3]), np.array([2, 4]), "ground")
+        self.assertEqual([300, 1.5], values.tolist())
+        self.assertEqual(np.dtype(np.uint8), the_map.layer_array("ground").dtype)  # the base map is unchanged
+
+    def test_errors(self):
+        the_map = Map("text", 2, 2, ["label"], [])
+        the_map[0, 0] = {"label": "a sign"}
+        self.assertRaises(ValueError, lambda: map_to_bin(the_map))
+        self.assertRaises(ValueError, lambda: map_from_bin(b"NOTAMAP!" + bytes(8)))
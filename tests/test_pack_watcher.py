@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from chosm.game_constants import AssetTypes
+from chosm.pack_watcher import PackWatcher
+from chosm.resource_pack import ResourcePack, ResourcePackInfo, AssetChange
+
+
+def write_asset(pack_folder, slug, name, file_id):
+    folder = os.path.join(pack_folder, slug)
+    os.makedirs(folder, exist_ok=True)
+    info = dict(id=file_id, name=name, type_name="sprite", created="2023-01-01T00:00:00+00:00", slug=slug)
+    with open(os.path.join(folder, "info.json"), "wt") as f:
+        json.dump(info, f)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pack_folder = os.path.join(self.folder.name, "test-pack")
+        os.makedirs(self.pack_folder)
+        ResourcePackInfo("test-pack", "admin", True).save_info_file(self.pack_folder)
+        for i in range(3):
+            write_asset(self.pack_folder, f"sprite-thing-{i}", f"thing-{i}", i)
+        self.pack = ResourcePack(self.pack_folder)
+        self.watcher = PackWatcher({self.pack.name: self.pack}, poll_interval=0.05, debounce_ms=50)
+        self.events = []
+        self.watcher.subscribe(self.events.append)
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.folder.cleanup()
+
+    def test_handle_paths(self):
+        write_asset(self.pack_folder, "sprite-thing-new", "thing-new", 10)
+        shutil.rmtree(os.path.join(self.pack_folder, "sprite-thing-0"))
+        write_asset(self.pack_folder, "sprite-thing-1", "thing-renamed", 1)
+        changes = self.watcher.handle_paths([os.path.join(self.pack_folder, "sprite-thing-new", "info.json"),
+                                             os.path.join(self.pack_folder, "sprite-thing-0"),
+                                             os.path.join(self.pack_folder, "sprite-thing-1", "info.json"),
+                                             os.path.join(self.pack_folder, ".index", "pack_index.bin")])
+
+        self.assertEqual({("sprite-thing-new", AssetChange.ADDED),
+                          ("sprite-thing-0", AssetChange.REMOVED),
+                          ("sprite-thing-1", AssetChange.MODIFIED)}, {(c.slug, c.change) for c in changes})
+        self.assertEqual(changes, self.events)
+
+        sprites = self.pack.get_assets_by_type(AssetTypes.SPRITE)
+        self.assertEqual({"thing-new", "thing-renamed", "thing-2"}, set(sprites.keys()))
+        self.assertEqual({"sprite-thing-new", "sprite-thing-1", "sprite-thing-2"}, set(self.pack.get_assets().keys()))
+
+        # the index was updated
+        reloaded = ResourcePack(self.pack_folder)
+        self.assertEqual(set(self.pack.get_assets().keys()), set(reloaded.get_assets().keys()))
+
+    def test_unchanged_records_are_kept(self):
+        before = dict(self.pack.get_assets())
+        write_asset(self.pack_folder, "sprite-thing-new", "thing-new", 10)
+        self.watcher.handle_paths([os.path.join(self.pack_folder, "sprite-thing-new")])
+        for slug, rec in before.items():
+            self.assertIs(rec, self.pack[slug])
+
+    def test_invalid_asset(self):
+        os.makedirs(os.path.join(self.pack_folder, "sprite-not-yet"))
+        self.assertEqual([], self.watcher.handle_paths([os.path.join(self.pack_folder, "sprite-not-yet")]))
+        self.assertEqual([], self.pack.find_changed_assets())
+
+    def test_poll(self):
+        self.assertEqual([], self.watcher.poll())
+        time.sleep(0.01)
+        write_asset(self.pack_folder, "sprite-thing-new", "thing-new", 10)
+        shutil.rmtree(os.path.join(self.pack_folder, "sprite-thing-0"))
+        changes = self.watcher.poll()
+        self.assertEqual({("sprite-thing-new", AssetChange.ADDED),
+                          ("sprite-thing-0", AssetChange.REMOVED)}, {(c.slug, c.change) for c in changes})
+        self.assertEqual([], self.watcher.poll())
+
+    def _wait_for_event(self, slug, force_polling):
+        self.watcher.force_polling = force_polling
+        received = threading.Event()
+        self.watcher.subscribe(lambda change: received.set() if change.slug == slug else None)
+        self.watcher.start()
+        time.sleep(0.2)  # let the watcher start
+        write_asset(self.pack_folder, slug, "thing-new", 10)
+        self.assertTrue(received.wait(5))
+        self.assertIn(slug, self.pack.get_assets())
+
+    def test_watch(self):
+        self._wait_for_event("sprite-thing-new", force_polling=False)
+
+    def test_watch_polling(self):
+        self._wait_for_event("sprite-thing-new", force_polling=True)
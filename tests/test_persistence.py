@@ -0,0 +1,114 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from game_engine.game_state import GameState, GameAction
+from game_engine.map import Map
+from game_engine.persistence import game_state_to_bytes, game_state_from_bytes, WriteBehindSaver, \
+    SqlitePersistenceBackend, FilePersistenceBackend, PersistenceBackend
+from game_engine.session import SessionStore
+from game_engine.world import World
+from mam_game.mam_constants import Direction
+
+
+class _Pack:
+    def pin_maps(self, map_names):
+        return list(map_names)
+
+    def unpin_maps(self, map_names):
+        pass
+
+
+def make_world():
+    maps = []
+    for name in ["town", "cave"]:
+        the_map = Map(name, 64, 64, ["ground", "env"], [])
+        the_map.set_layers({"ground": np.full(64 * 64, 2), "env": np.zeros(64 * 64, dtype=int)})
+        maps.append(the_map)
+    return World("test_world", maps, [], default_map="town")
+
+
+def play(game_state: GameState):
+    game_state.attempt_to_take_action(GameAction.MOVE_FWD)
+    game_state.attempt_to_take_action(GameAction.TURN_RIGHT)
+    game_state.current_map[3, 4] = {"env": 7}
+    game_state.current_world.get_map("cave")[10, 0] = {"ground": 5, "env": 1}
+
+
+class _SlowBackend(PersistenceBackend):
+    def __init__(self):
+        self.saved = {}
+        self.num_batches = 0
+
+    def save_many(self, saves):
+        time.sleep(0.01)
+        self.saved.update(saves)
+        self.num_batches += 1
+
+    def load(self, user_name):
+        return self.saved.get(user_name)
+
+
+class Test(TestCase):
+    def test_round_trip(self):
+        world = make_world()
+        game_state = GameState(world, _Pack())
+        play(game_state)
+        data = game_state_to_bytes(game_state)
+        self.assertLess(len(data), 200)
+
+        restored = GameState(world, _Pack())
+        restored.apply_save_data(game_state_from_bytes(data))
+        self.assertEqual(game_state.party.get_pos(), restored.party.get_pos())
+        self.assertEqual(Direction.EAST, restored.party.facing)
+        self.assertEqual(7, restored.current_map[3, 4]["env"])
+        self.assertEqual({"ground": 5, "env": 1}, restored.current_world.get_map("cave")[10, 0])
+        # the world's maps are unchanged
+        self.assertEqual(0, world.get_map("cave")[10, 0]["env"])
+        self.assertNotEqual(0, restored.current_map.version)
+
+    def test_backends(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for backend in [SqlitePersistenceBackend(os.path.join(folder, "saves.db")),
+                            FilePersistenceBackend(os.path.join(folder, "saves"))]:
+                self.assertIsNone(backend.load("alice"))
+                backend.save_many({"alice": b"a1", "Bob": b"b1"})
+                backend.save_many({"alice": b"a2", "bob": b"b2"})
+                self.assertEqual(b"a2", backend.load("alice"))
+                self.assertEqual(b"b1", backend.load("Bob"))
+                self.assertEqual(b"b2", backend.load("bob"))
+                backend.close()
+
+    def test_write_behind(self):
+        world = make_world()
+        backend = _SlowBackend()
+        saver = WriteBehindSaver(backend, flush_interval=60)
+        saver.start()
+        game_state = GameState(world, _Pack())
+        for _ in range(10):
+            game_state.attempt_to_take_action(GameAction.MOVE_FWD)
+            saver.save("alice", game_state)
+        self.assertEqual(0, backend.num_batches)  # nothing written yet
+        self.assertEqual(game_state.party.pos_y, saver.load("alice")["party"][1])
+
+        saver.stop()
+        self.assertEqual(1, backend.num_batches)
+        self.assertEqual(1, saver.num_writes)  # only the latest save
+        self.assertEqual(game_state.party.pos_y, game_state_from_bytes(backend.saved["alice"])["party"][1])
+
+    def test_session_timeout_saves(self):
+        world = make_world()
+        backend = _SlowBackend()
+        saver = WriteBehindSaver(backend, flush_interval=60)
+        store = SessionStore(time_out_in_minutes=1)
+        store.saver = saver
+
+        session_id = store.create_session("alice", lambda user_name: GameState(world, _Pack()))
+        play(store.get(session_id).game_state)
+        store.tick(time.monotonic() + 120)
+        self.assertFalse(store.get(session_id).is_open())
+        # flushed by the tick
+        self.assertEqual((14, 53, "EAST"), tuple(game_state_from_bytes(backend.saved["alice"])["party"]))
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from chosm.game_constants import AssetTypes
+from chosm.resource_pack import ResourcePack, ResourcePackInfo, PACK_INDEX_FOLDER
+
+
+def make_asset(pack_folder, slug, name, file_id):
+    folder = os.path.join(pack_folder, slug)
+    os.makedirs(folder)
+    info = dict(id=file_id, name=name, type_name="sprite", created="2023-01-01T00:00:00+00:00", slug=slug,
+                animations=[dict(slug="idle", frame_idx_list=[0, 1])])
+    with open(os.path.join(folder, "info.json"), "wt") as f:
+        json.dump(info, f)
+    with open(os.path.join(folder, "frame_00.png"), "wb") as f:
+        f.write(b"png")
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pack_folder = os.path.join(self.folder.name, "test-pack")
+        os.makedirs(self.pack_folder)
+        ResourcePackInfo("test-pack", "admin", True).save_info_file(self.pack_folder)
+        for i in range(3):
+            make_asset(self.pack_folder, f"sprite-thing-{i}", f"thing-{i}", i)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_index_written(self):
+        pack = ResourcePack(self.pack_folder)
+        self.assertTrue(os.path.isfile(os.path.join(self.pack_folder, PACK_INDEX_FOLDER, "pack_index.bin")))
+        self.assertEqual(3, len(pack.get_assets()))
+        # the index folder is not an asset
+        self.assertNotIn(PACK_INDEX_FOLDER, [a.folder for a in pack.get_assets().values()])
+
+    def test_warm_load_matches_cold_load(self):
+        cold = ResourcePack(self.pack_folder)
+        warm = ResourcePack(self.pack_folder)
+        self.assertEqual(cold.get_modification_time(), warm.get_modification_time())
+        self.assertEqual(sorted(cold.get_assets().keys()), sorted(warm.get_assets().keys()))
+        for slug, rec in cold.get_assets().items():
+            other = warm[slug]
+            self.assertEqual(rec.info, other.info)
+            self.assertEqual((rec.file_id, rec.name, rec.asset_type), (other.file_id, other.name, other.asset_type))
+            self.assertEqual(rec.idle_animation, other.idle_animation)
+            self.assertEqual(rec.get_file_names(), other.get_file_names())
+            # the record does not need to re-read info.json
+            self.assertFalse(other.refresh())
+        self.assertEqual(3, len(warm.get_assets_by_type(AssetTypes.SPRITE)))
+
+    def test_warm_load_does_not_read_asset_info(self):
+        ResourcePack(self.pack_folder)
+        # removing a file does not change the pack folder's mtime, so the index is used.
+        os.remove(os.path.join(self.pack_folder, "sprite-thing-0", "info.json"))
+        pack = ResourcePack(self.pack_folder)
+        self.assertIn("sprite-thing-0", pack.get_assets())
+
+    def test_new_asset_invalidates_index(self):
+        ResourcePack(self.pack_folder)
+        time.sleep(0.01)
+        make_asset(self.pack_folder, "sprite-thing-new", "thing-new", 10)
+        pack = ResourcePack(self.pack_folder)
+        self.assertIn("sprite-thing-new", pack.get_assets())
+
+    def test_removed_asset_invalidates_index(self):
+        ResourcePack(self.pack_folder)
+        time.sleep(0.01)
+        shutil.rmtree(os.path.join(self.pack_folder, "sprite-thing-1"))
+        pack = ResourcePack(self.pack_folder)
+        self.assertNotIn("sprite-thing-1", pack.get_assets())
+        self.assertEqual(2, len(pack.get_assets()))
+
+    def test_corrupt_index_is_ignored(self):
+        ResourcePack(self.pack_folder)
+        with open(os.path.join(self.pack_folder, PACK_INDEX_FOLDER, "pack_index.bin"), "wb") as f:
+            f.write(b"not an index")
+        pack = ResourcePack(self.pack_folder)
+        self.assertEqual(3, len(pack.get_assets()))
@@ -0,0 +1,86 @@
+import threading
+import time
+from unittest import TestCase
+
+from game_engine.session import SessionStore, SessionException
+
+
+class _GameState:
+    def __init__(self):
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+class Test(TestCase):
+    def test_create_session(self):
+        store = SessionStore()
+        session_id = store.create_session("alice", lambda user_name: _GameState())
+        self.assertEqual(session_id, store.create_session("alice", lambda user_name: _GameState()))
+        self.assertNotEqual(session_id, store.create_session("bob", lambda user_name: _GameState()))
+        self.assertEqual(2, store.num_open)
+
+        session = store.get_active_session(session_id)
+        self.assertEqual("alice", session.user_name)
+        session.close()
+        self.assertTrue(session.game_state.released)
+        self.assertIsNone(store.get_active_session(session_id))
+        self.assertEqual(1, store.num_open)
+
+        # a closed session is replaced on the next login
+        self.assertNotEqual(session_id, store.create_session("alice", lambda user_name: _GameState()))
+
+    def test_max_sessions(self):
+        store = SessionStore(max_sessions=2)
+        a = store.create_session("a", lambda user_name: _GameState())
+        store.create_session("b", lambda user_name: _GameState())
+        with self.assertRaises(SessionException):
+            store.create_session("c", lambda user_name: _GameState())
+        store.get_active_session(a).close()
+        store.create_session("c", lambda user_name: _GameState())
+        self.assertEqual(2, store.num_open)
+
+    def test_tick(self):
+        store = SessionStore(time_out_in_minutes=1, purge_time_in_minutes=10)
+        a = store.create_session("a", lambda user_name: _GameState())
+        b = store.create_session("b", lambda user_name: _GameState())
+        now = time.monotonic()
+
+        self.assertEqual([], store.tick(now + 30))
+        store.get(b)._last_ping = now + 50  # b was pinged since
+        closed = store.tick(now + 61)
+        self.assertEqual([a], [s.session_id for s in closed])
+        self.assertTrue(store.get(b).is_open())
+        self.assertEqual([b], [s.session_id for s in store.tick(now + 111)])
+
+        # closed sessions are forgotten after the purge time (since their last ping)
+        store.tick(now + 60 * 10 - 10)
+        self.assertIsNotNone(store.get(a))
+        store.tick(now + 60 * 10 + 10)
+        self.assertIsNone(store.get(a))
+        self.assertIsNotNone(store.get(b))
+        store.tick(now + 60 * 11 + 60)
+        self.assertIsNone(store.get(a))
+        self.assertIsNone(store.get(b))
+        self.assertEqual(0, len(store))
+
+    def test_concurrent_logins(self):
+        store = SessionStore()
+        num_loads = []
+
+        def load_game(user_name):
+            num_loads.append(user_name)
+            time.sleep(0.01)
+            return _GameState()
+
+        session_ids = []
+        threads = [threading.Thread(target=lambda: session_ids.append(store.create_session("alice", load_game)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(1, len(set(session_ids)))
+        self.assertEqual(1, len(num_loads))
+        self.assertEqual(1, store.num_open)
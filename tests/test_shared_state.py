@@ -0,0 +1,183 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from chosm.dynamic_file_manager import DynamicFileManager
+from game_engine.game_state import GameState, GameAction
+from game_engine.persistence import WriteBehindSaver, game_state_from_bytes
+from game_engine.session import SessionException
+from game_engine.shared_state import SharedStateDB, SharedSessionStore
+from tests.test_persistence import make_world, _Pack, _SlowBackend, play
+
+
+class Test(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "shared.db")
+        self.world = make_world()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_worker(self, worker_id, **kwargs) -> SharedSessionStore:
+        # each worker has its own connection, as a separate process would
+        return SharedSessionStore(SharedStateDB(self.db_path), lambda user_name: GameState(self.world, _Pack()),
+                                  worker_id=worker_id, **kwargs)
+
+    def load_game(self, user_name):
+        return GameState(self.world, _Pack())
+
+    def test_worker_handoff(self):
+        a, b = self.make_worker("a"), self.make_worker("b")
+        session_id = a.create_session("alice", self.load_game)
+        session = a.get_active_session(session_id)
+        play(session.game_state)
+        session.save_game()
+
+        # the next request goes to another worker, which has the game so far
+        session_b = b.get_active_session(session_id)
+        self.assertEqual(session.game_state.party.get_pos(), session_b.game_state.party.get_pos())
+        self.assertEqual(7, session_b.game_state.current_map[3, 4]["env"])
+        session_b.game_state.attempt_to_take_action(GameAction.MOVE_FWD)
+        session_b.save_game()
+
+        # and back again, worker a's copy is out of date
+        session_a = a.get_active_session(session_id)
+        self.assertIsNot(session, session_a)
+        self.assertFalse(session.is_open())
+        self.assertEqual(session_b.game_state.party.get_pos(), session_a.game_state.party.get_pos())
+        # an unchanged session isn't reloaded
+        self.assertIs(session_a, a.get_active_session(session_id))
+        self.assertEqual(1, a.shared.count_open_sessions())
+
+    def test_one_session_per_user(self):
+        a, b = self.make_worker("a"), self.make_worker("b")
+        session_id = a.create_session("alice", self.load_game)
+        self.assertEqual(session_id, b.create_session("alice", self.load_game))
+
+        # logout on one worker, is a logout on all of them
+        b.get_active_session(session_id).close()
+        self.assertIsNone(a.get_active_session(session_id))
+        self.assertNotEqual(session_id, a.create_session("alice", self.load_game))
+
+    def test_login_on_another_worker_after_logout(self):
+        backend = _SlowBackend()
+        a, b = self.make_worker("a"), self.make_worker("b")
+        a.saver = WriteBehindSaver(backend, flush_interval=60)
+        b.saver = WriteBehindSaver(backend, flush_interval=60)
+
+        def load_game(user_name):
+            game_state = GameState(self.world, _Pack())
+            save_data = b.saver.load(user_name)
+            if save_data is not None:
+                game_state.apply_save_data(save_data)
+            return game_state
+
+        session = a.get_active_session(a.create_session("alice", load_game))
+        play(session.game_state)
+        session.close()  # logout on worker a
+
+        # the game was written when the session closed, not a flush_interval later
+        session_b = b.get_active_session(b.create_session("alice", load_game))
+        self.assertEqual((14, 53), session_b.game_state.party.get_pos()[:2])
+        self.assertEqual(7, session_b.game_state.current_map[3, 4]["env"])
+
+    def test_max_sessions(self):
+        a, b = self.make_worker("a", max_sessions=2), self.make_worker("b", max_sessions=2)
+        a.create_session("alice", self.load_game)
+        b.create_session("bob", self.load_game)
+        with self.assertRaises(SessionException):
+            a.create_session("carol", self.load_game)
+
+    def test_adopted_sessions_are_not_counted_twice(self):
+        a, b = self.make_worker("a", max_sessions=2), self.make_worker("b", max_sessions=2)
+        alice = a.create_session("alice", self.load_game)
+        b.get_active_session(alice)
+
+        # worker a's copy of alice is out of date, it doesn't stop a login
+        a.create_session("bob", self.load_game)
+        a.tick()
+        self.assertEqual(1, a.num_open)
+        self.assertIsNone(a.get(alice))
+        self.assertEqual(1, b.num_open)
+
+    def test_failed_adoption(self):
+        a = self.make_worker("a")
+        session_id = a.create_session("alice", self.load_game)
+        session = a.get_active_session(session_id)
+        released = []
+
+        class _BadGameState(GameState):
+            def apply_save_data(self, d):
+                raise ValueError("bad save")
+
+            def release(self):
+                released.append(self)
+                super().release()
+
+        b = SharedSessionStore(SharedStateDB(self.db_path), lambda user_name: _BadGameState(self.world, _Pack()),
+                               worker_id="b")
+        with self.assertRaises(ValueError):
+            b.get_active_session(session_id)
+        self.assertEqual(1, len(released))
+        self.assertEqual(0, b.num_open)
+        # worker a still owns the session, and its copy is current
+        self.assertIs(session, a.get_active_session(session_id))
+
+    def test_affinity(self):
+        a, b = self.make_worker("a", affinity=True), self.make_worker("b", affinity=True)
+        session_id = a.create_session("alice", self.load_game)
+        session = a.get_active_session(session_id)
+        b.get_active_session(session_id).game_state.attempt_to_take_action(GameAction.MOVE_FWD)
+        # worker a trusts its own copy
+        self.assertIs(session, a.get_active_session(session_id))
+
+    def test_abandoned_sessions(self):
+        a, b = self.make_worker("a", time_out_in_minutes=1), self.make_worker("b", time_out_in_minutes=1)
+        b.saver = WriteBehindSaver(_SlowBackend(), flush_interval=60)
+        session_id = a.create_session("alice", self.load_game)
+        session = a.get_active_session(session_id)
+        play(session.game_state)
+        session.save_game()
+
+        # worker a dies, worker b closes the session once it times out, and saves it.
+        a.tick()
+        b.tick()
+        self.assertEqual(1, b.shared.count_open_sessions())
+        with b.shared._connect() as con:
+            con.execute("UPDATE sessions SET last_ping = ?", (time.time() - 120,))
+        b.tick()
+        self.assertEqual(0, b.shared.count_open_sessions())
+        self.assertIsNone(b.get_active_session(session_id))
+        saved = game_state_from_bytes(b.saver.backend.saved["alice"])
+        self.assertEqual((14, 53, "EAST"), tuple(saved["party"]))
+
+    def test_pings_are_shared(self):
+        a = self.make_worker("a")
+        session_id = a.create_session("alice", self.load_game)
+        with a.shared._connect() as con:
+            con.execute("UPDATE sessions SET last_ping = 0")
+        a.get_active_session(session_id)
+        a.tick()
+        self.assertGreater(a.shared.get_session(session_id).last_ping, time.time() - 60)
+
+    def test_generated_files(self):
+        folder = os.path.join(self._tmp.name, "dynamic_files")
+        os.makedirs(folder)
+        shared = SharedStateDB(self.db_path)
+        expiration_time = time.time() + 100
+        a = DynamicFileManager(folder, expiration_time_stamp=expiration_time, shared_state=shared)
+        b = DynamicFileManager(folder, expiration_time_stamp=expiration_time, shared_state=shared)
+
+        path, valid = a.query(["masks"], "m.webp")
+        with open(path, "wb") as f:
+            f.write(b"old")
+        os.utime(path, (expiration_time - 10, expiration_time - 10))
+        self.assertFalse(b.query(["masks"], "m.webp")[1])  # cached by b, expired
+
+        # worker a regenerates it
+        os.utime(path, (expiration_time + 10, expiration_time + 10))
+        a.invalidate_cache(["masks"], "m.webp")
+        self.assertTrue(a.query(["masks"], "m.webp")[1])
+        self.assertTrue(b.query(["masks"], "m.webp")[1])
@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting, intersection
+
+
+class Test(TestCase):
+    def test_intersection(self):
+        self.assertEqual(intersection(((0, 0), (2, 2)), ((0, 2), (2, 0))), (1.0, 1.0))
+        self.assertEqual(intersection(((0, 5), (1, 5)), ((3, 0), (3, 1))), (3.0, 5.0))
+        with self.assertRaises(ValueError):
+            intersection(((0, 0), (1, 1)), ((0, 1), (1, 2)))
+
+    def test_fov_table(self):
+        # the analytic fov table matches rasterizing each tile's mask
+        for kwargs in [dict(size=(320, 200), view_dist=5), dict(size=(192, 102), view_dist=6),
+                       dict(size=(160, 120), view_dist=4, horizon_screen_ratio=0.4, local_tile_ratio=0.6,
+                            bird_eye_vs_worm_eye=0.2)]:
+            svp = SingleVanishingPointPainting([], [], **kwargs)
+            for step_f in range(svp.view_dist):
+                fov = svp.fov_table[step_f]
+                for step_r in range(-fov, fov + 1):
+                    self.assertIsNotNone(svp.draw_mask(step_f, step_r))
+                self.assertIsNone(svp.draw_mask(step_f, fov + 1))
+                self.assertIsNone(svp.draw_mask(step_f, -fov - 1))
@@ -0,0 +1,83 @@
+import struct
+from unittest import TestCase
+
+import numpy as np
+
+from mam_game.mam_constants import MAMVersion, Platform, RawFile, MAMFileParseError
+from mam_game.pal_file_decoder import get_default_pal
+from mam_game.sprite_file_decoder import load_sprite_file, load_sprite_file_reference
+
+
+def _line(line_offset, *commands):
+    body = bytes([line_offset]) + b"".join(bytes(c) for c in commands)
+    return bytes([len(body)]) + body
+
+
+def _cell(x, y, w, h, lines):
+    return struct.pack("<4H", x, w, y, h) + b"".join(lines)
+
+
+def _sprite(cells, frames):
+    """
+    Builds a sprite file, frames are pairs of indexes into cells (None for no cell)
+    """
+    header_len = 2 + len(frames) * 4
+    offsets = []
+    pos = header_len
+    for c in cells:
+        offsets.append(pos)
+        pos += len(c)
+    cell_offsets = []
+    for a, b in frames:
+        cell_offsets.append(offsets[a])
+        cell_offsets.append(0 if b is None else offsets[b])
+    return struct.pack(f"<{1 + len(cell_offsets)}H", len(frames), *cell_offsets) + b"".join(cells)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.pal = get_default_pal(MAMVersion.DARKSIDE, Platform.PC_DOS)
+
+        cell_a = _cell(2, 1, 30, 5, [
+            _line(3, [0x02, 5, 6, 7], [(2 << 5) | 1, 9]),          # raw bytes, rle
+            b"\x00\x00",                                            # skip line
+            _line(0, [(4 << 5) | 0, 10, 11], [(5 << 5) | 2],        # two byte pattern, transparent run,
+                  [0b11011101, 20], [0b11110001, 3]),               # pattern up, pattern down (wraps < 0)
+            _line(1, [(3 << 5) | 0, 20, 0]),                        # stream copy
+            _line(25, [0x04, 1, 2, 3, 4, 5], [(5 << 5) | 31]),      # transparent run past the cell edge
+        ])
+        cell_b = _cell(0, 0, 10, 2, [
+            _line(0, [0x03, 0, 40, 41, 0]),
+            _line(4, [(2 << 5) | 0, 60]),
+        ])
+        data = _sprite([cell_a, cell_b], [(0, None), (0, 1), (1, None)])
+        self.raw_file = RawFile(1, "test.mon", data)
+
+    def test_matches_reference_decoder(self):
+        sprite = load_sprite_file(self.raw_file, self.pal, MAMVersion.DARKSIDE, Platform.PC_DOS)
+        reference = load_sprite_file_reference(self.raw_file, self.pal, MAMVersion.DARKSIDE, Platform.PC_DOS)
+
+        self.assertEqual(sprite.num_frames(), reference.num_frames())
+        self.assertEqual(sprite.size, reference.size)
+        for frame, ref_frame in zip(sprite.frames, reference.frames):
+            self.assertEqual(frame.mode, ref_frame.mode)
+            self.assertTrue(np.array_equal(np.array(frame), np.array(ref_frame)))
+
+        # make sure the test sprite actually drew something
+        self.assertGreater(np.array(sprite.frames[1])[:, :, 3].sum(), 0)
+
+    def test_list_data(self):
+        # RawFile.data may also be a list of ints
+        raw_file = RawFile(1, "test.mon", list(self.raw_file.data))
+        sprite = load_sprite_file(raw_file, self.pal, MAMVersion.DARKSIDE, Platform.PC_DOS)
+        expected = load_sprite_file(self.raw_file, self.pal, MAMVersion.DARKSIDE, Platform.PC_DOS)
+        self.assertTrue(np.array_equal(np.array(sprite.frames[0]), np.array(expected.frames[0])))
+
+    def test_bad_line_length(self):
+        # the rle operand is past the stated end of the line
+        cell = _cell(0, 0, 8, 1, [b"\x02\x00" + bytes([(2 << 5) | 0, 7])])
+        raw_file = RawFile(1, "bad.mon", _sprite([cell], [(0, None)]))
+        with self.assertRaises(MAMFileParseError):
+            load_sprite_file_reference(raw_file, self.pal, MAMVersion.DARKSIDE, Platform.PC_DOS)
+        with self.assertRaises(MAMFileParseError):
+            load_sprite_file(raw_file, self.pal, MAMVersion.DARKSIDE, Platform.PC_DOS)
@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+import numpy as np
+
+from game_engine.map import Map, ColumnarMap, MapInstance, AssetLut, load_map_from_dict
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.view_kernel import build_render_lists, lut_to_array
+from mam_game.mam_constants import Direction
+
+
+def render_lists_by_tile(the_map, x, y, facing, svp, map_lut):
+    # the original, tile at a time, render loop.
+    ground_render_list, env_render_list = [], []
+    for step_f in reversed(range(svp.view_dist)):
+        fov = svp.fov_table[step_f]
+        for step_r in range(-fov, fov + 1):
+            tx, ty = facing.right().walk_from(*facing.walk_from(x, y, step_f), step_r)
+            if not (0 <= tx < the_map.width and 0 <= ty < the_map.height):
+                continue
+            tile = the_map[tx, ty]
+            if map_lut["ground"][tile["ground"]] is not None:
+                ground_render_list.append((step_f, step_r, map_lut["ground"][tile["ground"]]))
+            if map_lut["env"][tile["env"]] is not None:
+                b, a, c, d = svp.get_tile_polygon(step_f, step_r)
+                env_render_list.append((max(a[1], b[1], c[1], d[1]) / svp.height, min(a[0], b[0]) / svp.width,
+                                        svp.get_sprite_scale(step_f) * 1.3, map_lut["env"][tile["env"]]))
+    return ground_render_list, env_render_list
+
+
+class Test(TestCase):
+    def test_build_render_lists(self):
+        svp = SingleVanishingPointPainting([], [], size=(320, 200), view_dist=4)
+        luts = [AssetLut("ground", {0: None, 1: "grass", 2: "water"}), AssetLut("env", {0: None, 1: "tree"})]
+        map_lut = {lut.name: {k: (f"{v}-class" if v is not None else None) for k, v in lut.items()} for lut in luts}
+        css_luts = {lut.name: lut_to_array(lut, lambda slug: f"{slug}-class") for lut in luts}
+
+        rng = np.random.default_rng(5)
+        base = Map("test", 9, 7, ["ground", "env"], luts)
+        base.set_layers({"ground": rng.integers(0, 3, 63), "env": rng.integers(0, 2, 63)})
+        instance = MapInstance(base)
+        instance[4, 4] = {"ground": 2, "env": 1}
+        instance[4, 5] = {"ground": 0, "env": 0}
+
+        for the_map in [base, load_map_from_dict(base.asdict(), ColumnarMap), instance]:
+            for facing in Direction:
+                for x, y in [(4, 3), (0, 0), (8, 6), (2, 5)]:
+                    self.assertEqual(build_render_lists(the_map, x, y, facing, svp, css_luts),
+                                     render_lists_by_tile(the_map, x, y, facing, svp, map_lut))
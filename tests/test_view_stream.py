@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import numpy as np
+
+from game_engine.map import Map, AssetLut
+from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.view_kernel import build_view_slots, build_render_lists, lut_to_array, get_view_kernel
+from game_engine.view_stream import ViewStream
+from mam_game.mam_constants import Direction
+
+
+class _Sprite:
+    def __init__(self, slug):
+        self.idle_animation = {"class": f"{slug}-class"}
+
+
+class _Pack:
+    name = "test-pack"
+
+    def __getitem__(self, slug):
+        return _Sprite(slug)
+
+
+def make_map(name="test", w=9, h=7, seed=5):
+    luts = [AssetLut("ground", {0: None, 1: "grass", 2: "water"}), AssetLut("env", {0: None, 1: "tree"})]
+    rng = np.random.default_rng(seed)
+    the_map = Map(name, w, h, ["ground", "env"], luts)
+    the_map.set_layers({"ground": rng.integers(0, 3, w * h), "env": rng.integers(0, 2, w * h)})
+    return the_map
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.svp = SingleVanishingPointPainting([], [], size=(320, 200), view_dist=4)
+        self.pack = _Pack()
+
+    def test_slots_match_render_lists(self):
+        the_map = make_map()
+        css_luts = {lut.name: lut_to_array(lut, lambda slug: f"{slug}-class") for lut in the_map.luts}
+        for facing in Direction:
+            kernel = get_view_kernel(self.svp, facing)
+            for x, y in [(4, 3), (0, 0), (8, 6)]:
+                ground_slots, env_slots = build_view_slots(the_map, x, y, facing, self.svp, css_luts)
+                self.assertEqual(len(kernel), len(ground_slots))
+                ground_render_list, env_render_list = build_render_lists(the_map, x, y, facing, self.svp, css_luts)
+                self.assertEqual([c for c in ground_slots if c is not None], [q[-1] for q in ground_render_list])
+                self.assertEqual([c for c in env_slots if c is not None], [q[-1] for q in env_render_list])
+
+    def test_diffs_rebuild_the_view(self):
+        the_map = make_map()
+        stream = ViewStream(self.svp)
+        classes, ground, env = {}, None, None
+        moves = [(4, 3, Direction.NORTH), (4, 2, Direction.NORTH), (4, 2, Direction.EAST),
+                 (5, 2, Direction.EAST), (5, 2, Direction.EAST), (0, 0, Direction.SOUTH)]
+        for i, (x, y, facing) in enumerate(moves):
+            msg = stream.update(self.pack, the_map, x, y, facing)
+            self.assertEqual("full" if i == 0 else "diff", msg["type"])
+            self.assertEqual([x, y, str(facing)], msg["pos"])
+            classes.update(msg.get("classes", {}))
+            if ground is None:
+                ground, env = [None] * len(msg["ground"]), [None] * len(msg["env"])
+            for slot, class_id in msg["ground"]:
+                ground[slot] = classes[class_id] if class_id is not None else None
+            for slot, class_id in msg["env"]:
+                env[slot] = classes[class_id] if class_id is not None else None
+
+            expected = build_view_slots(the_map, x, y, facing, self.svp,
+                                        {lut.name: lut_to_array(lut, lambda slug: f"{slug}-class")
+                                         for lut in the_map.luts})
+            self.assertEqual(expected, (ground, env))
+
+        # no move, no change
+        msg = stream.update(self.pack, the_map, 0, 0, Direction.SOUTH)
+        self.assertEqual(([], []), (msg["ground"], msg["env"]))
+        self.assertNotIn("classes", msg)
+
+    def test_classes_sent_once(self):
+        the_map = make_map()
+        stream = ViewStream(self.svp)
+        sent = []
+        for x in range(1, 8):
+            sent += list(stream.update(self.pack, the_map, x, 3, Direction.NORTH).get("classes", {}).values())
+        self.assertEqual(len(sent), len(set(sent)))
+        self.assertLessEqual(len(sent), 3)
+
+    def test_new_map_is_full(self):
+        stream = ViewStream(self.svp)
+        stream.update(self.pack, make_map("a"), 4, 3, Direction.NORTH)
+        msg = stream.update(self.pack, make_map("b", seed=6), 4, 3, Direction.NORTH)
+        self.assertEqual("full", msg["type"])
+        self.assertEqual("b", msg["map"])
+        self.assertEqual(len(get_view_kernel(self.svp, Direction.NORTH)), len(msg["ground"]))
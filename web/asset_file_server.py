@@ -0,0 +1,269 @@
+import collections
+import datetime
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import xxhash
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response, FileResponse
+
+# pre-compressed siblings, eg: "_anim_idle.png.br", by preference.
+_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def encoding_etag(etag: str, encoding: Optional[str]) -> str:
+    """
+    Each content encoding of a body is its own representation, so has its own etag, eg: '"8a6d"' -> '"8a6d-gzip"'
+    """
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match uses the weak comparison (RFC 9110), so a "W/" prefix is ignored, and "*" matches any etag.
+    """
+    if if_none_match is None:
+        return False
+    tags = [q.strip() for q in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in [q.removeprefix("W/") for q in tags]
+
+
+def _parse_range(range_header: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    :return: (first, last) of a single byte range, eg: "bytes=-500" is (None, 500).
+             None if it's not one well formed range, which is ignored (the whole file is sent, see: RFC 9110).
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if match is None or match.group(1) + match.group(2) == "":
+        return None
+    first = int(match.group(1)) if match.group(1) != "" else None
+    last = int(match.group(2)) if match.group(2) != "" else None
+    if first is not None and last is not None and last < first:
+        return None
+    return first, last
+
+
+@dataclass(frozen=True)
+class AssetFileInfo:
+    path: str
+    size: int
+    etag: str  # strong, from the content hash
+    media_type: str
+    encodings: Dict[str, Tuple[str, int]] = field(default_factory=dict)  # {content encoding: (sibling path, size)}
+
+
+class _BytesLRU:
+    """
+    An LRU cache bounded by the total size (in bytes) of the values.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self._items: collections.OrderedDict[str, bytes] = collections.OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.num_bytes -= len(self._items.pop(key))
+            self._items[key] = value
+            self.num_bytes += len(value)
+            while self.num_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.num_bytes -= len(evicted)
+
+    def pop(self, key: str):
+        with self._lock:
+            if key in self._items:
+                self.num_bytes -= len(self._items.pop(key))
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _hash_file(path: str) -> str:
+    h = xxhash.xxh64()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return f'"{h.hexdigest()}"'
+
+
+class AssetFileServer:
+    """
+    Serves the files of resource pack assets.
+
+    Notes:
+      - ETags are computed from the file contents when a pack is indexed (at pack load time).
+      - Small file bodies are kept in memory (an LRU, bounded by bytes), larger files are streamed from disk.
+      - If-None-Match (304), single Range requests (206) and pre-compressed .br/.gz siblings are supported.
+      - If the pack's modification time changes, the pack is re-indexed.
+      - A pack's index is replaced (not mutated), so requests (on io threads) can read it while the PackWatcher
+        invalidates assets.
+    """
+    def __init__(self, max_cache_bytes: int = 64 * 1024 * 1024, max_cached_file_size: int = 512 * 1024):
+        self.max_cached_file_size = max_cached_file_size
+        self._bodies = _BytesLRU(max_cache_bytes)
+        # {pack_name: (pack modification time, {(asset_slug, file_name): AssetFileInfo})}
+        self._index: Dict[str, Tuple[datetime.datetime, Dict[Tuple[str, str], AssetFileInfo]]] = {}
+        self._index_lock = Lock()  # held to replace an index
+
+    def index_pack(self, pack):
+        """
+        Hashes every file of every asset in the pack.
+        """
+        modification_time = pack.get_modification_time()
+        index = {}
+        for slug, asset_rec in pack.get_assets().items():
+            file_names = set(asset_rec.get_file_names(refresh_from_disk=True))
+            for file_name in file_names:
+                try:
+                    info = self._make_info(asset_rec.get_file_path(file_name), file_names)
+                except FileNotFoundError:
+                    continue  # deleted since it was listed
+                index[(slug, file_name)] = info
+                # the file may have changed, so its cached body is stale
+                self._drop_bodies(info)
+        with self._index_lock:
+            self._index[pack.name] = (modification_time, index)
+
+    def invalidate(self, pack_name: str, asset_slug: str):
+        """
+        Forgets an asset's files, so they are re-hashed when next requested, eg: because the asset changed.
+        """
+        with self._index_lock:
+            modification_time, index = self._index.get(pack_name, (None, None))
+            if index is None:
+                return
+            dropped = [info for key, info in index.items() if key[0] == asset_slug]
+            self._index[pack_name] = (modification_time, {k: v for k, v in index.items() if k[0] != asset_slug})
+        for info in dropped:
+            self._drop_bodies(info)
+
+    def _drop_bodies(self, info: AssetFileInfo):
+        self._bodies.pop(info.path)
+        for path, _ in info.encodings.values():
+            self._bodies.pop(path)
+
+    @staticmethod
+    def _make_info(path: str, sibling_names) -> AssetFileInfo:
+        file_name = os.path.basename(path)
+        encodings = {enc: (path + ext, os.path.getsize(path + ext))
+                     for enc, ext in _ENCODINGS if file_name + ext in sibling_names}
+        media_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        return AssetFileInfo(path, os.path.getsize(path), _hash_file(path), media_type, encodings)
+
+    def get_info(self, pack, asset_slug: str, file_name: str) -> AssetFileInfo:
+        """
+        :raises KeyError: If the file is not part of the asset.
+        """
+        modification_time, index = self._index.get(pack.name, (None, None))
+        if index is None or modification_time != pack.get_modification_time():
+            self.index_pack(pack)
+            modification_time, index = self._index[pack.name]
+
+        info = index.get((asset_slug, file_name))
+        if info is None:
+            # maybe a file added since the pack was indexed
+            asset_rec = pack[asset_slug]
+            file_names = set(asset_rec.get_file_names(refresh_from_disk=True))
+            if file_name not in file_names:
+                raise KeyError(f"{asset_slug}/{file_name}")
+            info = self._make_info(asset_rec.get_file_path(file_name), file_names)
+            with self._index_lock:
+                modification_time, index = self._index[pack.name]  # may have been replaced since
+                self._index[pack.name] = (modification_time, {**index, (asset_slug, file_name): info})
+        return info
+
+    def _get_body(self, path: str) -> bytes:
+        body = self._bodies.get(path)
+        if body is None:
+            with open(path, "rb") as f:
+                body = f.read()
+            self._bodies.put(path, body)
+        return body
+
+    def response(self, request: Request, pack, asset_slug: str, file_name: str,
+                 cache_control: str = "public, max-age=3600") -> Response:
+        """
+        A response for an asset file, that honors If-None-Match, Range and Accept-Encoding.
+        """
+        try:
+            info = self.get_info(pack, asset_slug, file_name)
+        except (KeyError, FileNotFoundError):
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+        try:
+            return self._response(request, info, cache_control)
+        except FileNotFoundError:
+            # deleted since it was indexed
+            self.invalidate(pack.name, asset_slug)
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    def _response(self, request: Request, info: AssetFileInfo, cache_control: str) -> Response:
+
+        headers = {"ETag": info.etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+        if len(info.encodings) > 0:
+            headers["Vary"] = "Accept-Encoding"
+
+        # ranges are of the uncompressed file
+        range_header = request.headers.get("range")
+        byte_range = _parse_range(range_header) if range_header is not None else None
+        path, size, encoding = info.path, info.size, None
+        if byte_range is None:
+            accepted = [q.split(";")[0].strip() for q in request.headers.get("accept-encoding", "").split(",")]
+            encoding = next((enc for enc, _ in _ENCODINGS if enc in info.encodings and enc in accepted), None)
+        if encoding is not None:
+            path, size = info.encodings[encoding]
+            # each representation has its own (strong) etag
+            headers["ETag"] = encoding_etag(info.etag, encoding)
+            headers["Content-Encoding"] = encoding
+
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if byte_range is not None:
+            return self._range_response(info, byte_range, headers)
+        if size > self.max_cached_file_size:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(path)
+            return FileResponse(path, media_type=info.media_type, headers=headers)
+        return Response(content=self._get_body(path), media_type=info.media_type, headers=headers)
+
+    def _range_response(self, info: AssetFileInfo, byte_range: Tuple[Optional[int], Optional[int]],
+                        headers: Dict[str, str]) -> Response:
+        first, last = byte_range
+        if first is None:
+            # a suffix, eg: "bytes=-500" is the last 500 bytes
+            start, end = max(info.size - last, 0), info.size - 1
+        else:
+            start, end = first, min(last, info.size - 1) if last is not None else info.size - 1
+        if start > end or start >= info.size:
+            headers["Content-Range"] = f"bytes */{info.size}"
+            return Response(status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE, headers=headers)
+
+        if info.size <= self.max_cached_file_size:
+            body = self._get_body(info.path)[start:end + 1]
+        else:
+            with open(info.path, "rb") as f:
+                f.seek(start)
+                body = f.read(end + 1 - start)
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        return Response(content=body, status_code=status.HTTP_206_PARTIAL_CONTENT,
+                        media_type=info.media_type, headers=headers)
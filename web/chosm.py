@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 import logging
 import os
@@ -9,7 +8,7 @@ import xxhash
 import urllib.parse
 
 from PIL import Image
-from fastapi import FastAPI, Request, Response, Cookie
+from fastapi import FastAPI, Request, Response, Cookie, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -18,16 +17,26 @@ from slugify import slugify
 from starlette import status
 from starlette.responses import RedirectResponse, PlainTextResponse
 
+from chosm.asset_index import AssetQueryError
 from chosm.asset_record import AssetRecord
 from chosm.dynamic_file_manager import DynamicFileManager
-from chosm.game_constants import AssetTypes
-from chosm.resource_pack import ResourcePack
+from chosm.css_bundle_service import CssBundleService, patch_css
+from chosm.pack_watcher import PackWatcher
+from chosm.resource_pack import ResourcePack, PackChange
+from game_engine.frame_renderer import FrameRenderer, load_idle_frame
 from game_engine.game_state import GameState, GameAction
 from game_engine.map import Map
+from game_engine.persistence import SqlitePersistenceBackend, WriteBehindSaver
 from game_engine.session import Session, SessionManager
+from game_engine.shared_state import SharedStateDB, SharedSessionStore
 from game_engine.single_vanishing_point_painting import SingleVanishingPointPainting
+from game_engine.ground_mask_atlas import ViewConfig, build_ground_mask_atlases, mask_class_name
+from game_engine.view_kernel import build_view_slots, get_css_class_luts, clear_css_class_luts, get_view_kernel
+from game_engine.view_stream import ViewStream
 from game_engine.world import World
 
+from helpers.bounded_executor import BoundedExecutor, ExecutorBusyError, read_text
+from web.asset_file_server import AssetFileServer, encoding_etag, etag_matches
 from web.route_user import user_router
 
 logging.basicConfig(level=logging.WARNING)
@@ -46,30 +55,77 @@ chosm_version = "0.05"
 dynamic_folder = ""
 dyna_file_manager: DynamicFileManager = None
 
+frame_renderers: Dict[str, FrameRenderer] = {}  # by pack name, see: /game/frame.webp
+
+game_saver: WriteBehindSaver = None  # see: load_game, and Session.save_game()
+
+shared_state: SharedStateDB = None  # set when running many workers, see: CHOSM_SHARED_STATE
+
+asset_files = AssetFileServer()  # see: get_file
+
+css_bundles = CssBundleService(get_sprite_css_path=lambda pack_name, slug: get_sprite_css_path(pack_name, slug))
+
+pack_watcher = PackWatcher(resource_packs)
+
+# Blocking work runs off the event loop, in bounded pools (see: BoundedExecutor), so one slow request
+# (eg: regenerating a ground mask) doesn't stall the other players' /do_action calls.
+render_executor = BoundedExecutor("render", max_workers=4, max_pending=32)  # rendering and parsing (cpu bound)
+io_executor = BoundedExecutor("io", max_workers=8, max_pending=256)  # file reads
+
 default_svp_composer: SingleVanishingPointPainting = None
+default_view_config = ViewConfig(size=(1920, 1024),  # not 1080, see rendering_layout.md
+                                 view_dist=6,
+                                 horizon_screen_ratio=0.5,
+                                 local_tile_ratio=0.9,
+                                 bird_eye_vs_worm_eye=0)
 
 
-def save_game(user_name, game_state: GameState):
-    pass
+async def get_active_session(session_id: Optional[str]) -> Optional[Session]:
+    """
+    SessionManager.get_active_session(...) for async handlers. With shared state (many workers) the lookup may
+    adopt the session from another worker, which loads a game, so it runs in the render executor.
+    """
+    if shared_state is None or session_id is None:
+        return SessionManager.get_active_session(session_id)
+    # keyed, so concurrent requests of a session share one adoption
+    return await render_executor.run(SessionManager.get_active_session, session_id, key=("session", session_id))
 
 
-def load_game(user_name) -> GameState:
-    # TODO: for now just create a new game
+def new_game(user_name) -> GameState:
     mam5_pack: ResourcePack = resource_packs['dark-cccur-darkside-pc-dos']
-    mam5_world = mam5_pack.load_world("main_world")
-    return GameState(mam5_world, mam5_pack)
+    mam5_world = mam5_pack.load_world("main_world", pin=True)
+    return GameState(mam5_world, mam5_pack, maps_pinned=True)
+
+
+def load_game(user_name) -> GameState:
+    game_state = new_game(user_name)
+
+    # a saved game is the changes to a new game
+    try:
+        save_data = game_saver.load(user_name)
+        if save_data is not None:
+            game_state.apply_save_data(save_data)
+    except Exception as e:
+        logging.error(f"Could not load saved game, starting a new game: user='{user_name}', error='{e}'")
+        game_state.release()
+        game_state = new_game(user_name)
+    return game_state
 
 
 @app.on_event("startup")
 async def startup_event():
-    global resource_folder, resource_packs, dynamic_folder, dyna_file_manager, default_svp_composer
+    global resource_folder, resource_packs, dynamic_folder, dyna_file_manager, default_svp_composer, game_saver, \
+        shared_state
     print("CWD: " + os.getcwd())
 
-    default_svp_composer = SingleVanishingPointPainting([], [], size=(1920, 1024),  # not 1080, see rendering_layout.md
-                                                        view_dist=6,
-                                                        horizon_screen_ratio=0.5,
-                                                        local_tile_ratio=0.9,
-                                                        bird_eye_vs_worm_eye=0)
+    # many worker processes (eg: uvicorn --workers N) share sessions, and generated file metadata, through this.
+    if (shared_state_path := os.environ.get("CHOSM_SHARED_STATE")) is not None:
+        shared_state = SharedStateDB(shared_state_path)
+        affinity = os.environ.get("CHOSM_SESSION_AFFINITY", "0").lower() in ("1", "true", "yes")
+        SessionManager.use_store(SharedSessionStore(shared_state, new_game, affinity=affinity))
+        print(f"Sharing state between workers: path={shared_state_path}, affinity={affinity}, pid={os.getpid()}")
+
+    default_svp_composer = default_view_config.make_composer()
 
     resource_folder = "game_files/baked"
     assert os.path.exists(resource_folder)
@@ -77,12 +133,23 @@ async def startup_event():
     for d in os.scandir(resource_folder):
         rp = ResourcePack(d.path)
         resource_packs[rp.name] = rp
+        css_bundles.build(rp)
+        asset_files.index_pack(rp)
+    pack_watcher.subscribe(on_pack_change)
+    pack_watcher.start()
 
     dynamic_folder = "game_files/dynamic_files"
     assert os.path.exists(dynamic_folder)
     exp_timestamp = datetime.datetime.fromisoformat("2023-02-10").timestamp()
     dyna_file_manager = DynamicFileManager(dynamic_folder,
-                                           expiration_time_stamp=exp_timestamp)
+                                           expiration_time_stamp=exp_timestamp,
+                                           shared_state=shared_state)
+    update_ground_mask_atlases([default_view_config])
+
+    game_saver = WriteBehindSaver(SqlitePersistenceBackend("game_files/server_files/saved_games.db"))
+    game_saver.start()
+    SessionManager.set_saver(game_saver)
+    await remove_expired_tokens_task()
 
     # create an initial session
     # print(resource_packs)
@@ -100,6 +167,39 @@ async def startup_event():
     logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    pack_watcher.stop()
+    # so a restart doesn't lose progress
+    for session in SessionManager.sessions():
+        session.save_game()
+    if game_saver is not None:
+        game_saver.stop()
+    if shared_state is not None:
+        shared_state.close()
+    render_executor.shutdown(wait=False)
+    io_executor.shutdown(wait=False)
+
+
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request: Request, e: ExecutorBusyError):
+    # backpressure, the client should retry rather than the server queueing work without bound.
+    logging.warning(f"Shedding load: path={request.url.path}, error='{e}'")
+    return PlainTextResponse("Server busy, try again.", status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                             headers={"Retry-After": "1"})
+
+
+def on_pack_change(change: PackChange):
+    """
+    Invalidates what depends on an asset that changed on disk (see: PackWatcher).
+    Maps are loaded from the (new) asset record, so they are not cached here.
+    """
+    css_bundles.invalidate(change.pack_name)
+    asset_files.invalidate(change.pack_name, change.slug)
+    clear_css_class_luts(change.pack_name)
+    frame_renderers.pop(change.pack_name, None)
+
+
 @repeat_every(seconds=30)
 def remove_expired_tokens_task() -> None:
     SessionManager.tick()
@@ -109,7 +209,7 @@ def remove_expired_tokens_task() -> None:
 async def root(request: Request, session_id: Optional[str] = Cookie(default=None, alias="sessionID")):
     print("Session: " + str(session_id))
     user_name = None
-    if (session := SessionManager.get_active_session(session_id)) is not None:
+    if (session := await get_active_session(session_id)) is not None:
         user_name = session.user_name
 
     context = dict(version=chosm_version,
@@ -150,24 +250,23 @@ async def manage_asset_files(pack_name, asset_name):
     global resource_folder, resource_packs
 
     path = resource_packs[pack_name].get_asset_path(asset_name)
-    files = os.listdir(path)
+    files = await io_executor.run(os.listdir, path)
     return ORJSONResponse(files)
 
 
 @app.get("/download/resource-packs/{pack_name}/by_slug/{asset_slug}/{file_name}")
-async def get_file(pack_name, asset_slug, file_name):
+async def get_file(request: Request, pack_name, asset_slug, file_name):
     global resource_folder, resource_packs
     pack = resource_packs[pack_name]
-    file_path = pack[asset_slug].get_file_path(file_name)
-    return FileResponse(path=file_path)
+    # may hash the pack's files (the first time), or read the file
+    return await io_executor.run(asset_files.response, request, pack, asset_slug, file_name)
 
 
 @app.get("/download/resource-packs/{pack_name}/by_type/{asset_type}/by_name/{asset_name}/{file_name}")
-async def get_file(pack_name, asset_type, asset_name, file_name):
+async def get_file(request: Request, pack_name, asset_type, asset_name, file_name):
     global resource_folder, resource_packs
     pack = resource_packs[pack_name]
-    file_path = pack[asset_type, asset_name].get_file_path(file_name)
-    return FileResponse(path=file_path)
+    return await io_executor.run(asset_files.response, request, pack, pack[asset_type, asset_name].slug, file_name)
 
 
 @app.get("/download/css_cache/patched/{pack_name}/{asset_slug}/patched_animation.css")
@@ -199,17 +298,20 @@ async def load_and_patch_css_file(request: Request, pack_name, asset_slug):
     sprite_css_path = os.path.split(sprite_css_url)[0]
 
     css_file_path = resource_packs[pack_name][asset_slug].get_file_path('_animation.css')
-    old_tokens = ["url('", 'url("']
-    new_tokens = [f"url('{sprite_css_path}/", f'url("{sprite_css_path}/']
-    with open(css_file_path, "rt") as f:
-        css = f.read()
-        for old_token, new_token in zip(old_tokens, new_tokens):
-            css = css.replace(old_token, new_token)
+    css = patch_css(await read_text(io_executor, css_file_path), sprite_css_path)
     #
     # return PlainTextResponse(css + "\n")
     return css
 
 
+def get_sprite_css_path(pack_name: str, asset_slug: str) -> str:
+    """
+    The url path of the folder a sprite's _animation.css is served from, see: load_and_patch_css_file
+    """
+    sprite_css_url = app.url_path_for('get_file', pack_name=pack_name, asset_slug=asset_slug, file_name='_animation.css')
+    return os.path.split(str(sprite_css_url))[0]
+
+
 @app.get("/download/css_cache/asset_packs/whole/{pack_name}.css")
 @app.get("/download/css_cache/asset_packs/for_map/{pack_name}/{map_name}.css")
 async def resource_pack_css_download(request: Request,
@@ -244,52 +346,22 @@ async def resource_pack_css_download(request: Request,
     :param map_name: if present loads just the sprites in the maps luts. Can be a map name, or its slug.
     """
 
-    # TODO: This seems to work, but I have suspicions that it needs more testing.
-    # TODO: Sometimes the browser seems to cache this, and other times the endpoint gets called again.
-    #       If the file is updated, the browser of course is happy with its cache.
-    #       But if the file is not updated, the browser hits this endpoint for a new copy.
-
+    # The bundles are built at startup (or when the pack changes), and kept in memory, pre-compressed.
+    # A (re)build reads every sprite's .css, so it's done off the event loop.
     pack = resource_packs[pack_name]
-    last_pack_modification = pack.get_modification_time()
-
-    # setup where the cached copy will go
-    if map_name is None:
-        file_name = pack_name + ".css"
-        categories = ["pack_css_cache"]
-    else:
-        file_name = map_name + ".css"
-        categories = ["map_css_cache", pack_name]
-
-    # check for ached copy
-    path, is_valid = dyna_file_manager.query(categories, file_name, expiration_time=last_pack_modification)
-
-    if not is_valid:
-        print("##########################################################\n")
-        print(f"#         Regenerating {file_name}\n")
-        print("##########################################################\n")
+    bundle = await io_executor.run(css_bundles.get_bundle, pack, map_name, key=("css_bundle", pack_name, map_name))
 
-        # find sprites
-        if map_name is None:
-            sprites = pack.get_assets_by_type(AssetTypes.SPRITE).values()
-        else:
-            sprites = pack.get_sprites_for_map(map_name)
-
-        # get, and patch, all the css files
-        awaitables = [load_and_patch_css_file(request, pack_name, spite.slug) for spite in sprites]
-        css = await asyncio.gather(*awaitables)
-        css = "\n".join(css)
-
-        # save cached copy
-        with open(path, "wt") as f:
-            f.write(css)
-        dyna_file_manager.invalidate_cache(["pack_css_cache"], file_name)
-
-    # done
-    response = FileResponse(path=path)
     # calling this valid for 2.5 hours; the hope being that a browser will just see this css include and
-    # be happy with what it has.
-    response.headers["Cache-Control"] = "public, max-age=9000"
-    return response
+    # be happy with what it has. After that, the etag lets the browser revalidate its copy cheaply.
+    data, encoding = bundle.get_encoded(request.headers.get("accept-encoding", ""))
+    # each encoding has its own etag, so a cache can't answer with the wrong one
+    headers = {"ETag": encoding_etag(bundle.etag, encoding), "Cache-Control": "public, max-age=9000",
+               "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=data, media_type="text/css", headers=headers)
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -314,7 +386,14 @@ async def editor_view(request: Request, pack_name=None, asset_slug=None, sort_on
     resources = {}
     if pack_name is not None:
         pack = resource_packs[pack_name]
-        resources = pack.get_assets(glob_exp)
+        if glob_exp is not None and "=" in glob_exp:
+            # a query, eg: "type=sprite tag=outdoor name=*tree*"
+            try:
+                resources = pack.query(glob_exp)
+            except AssetQueryError as e:
+                logging.warning(f"Bad asset query: {e}")
+        else:
+            resources = pack.get_assets(glob_exp)
 
     if sort_on == "name":
         # ugly little oneliner: works because dict preserves insertion order
@@ -343,23 +422,54 @@ async def edit_asset_view(request: Request, pack_name, asset_slug):
     return templates.TemplateResponse(f'edit_{asset_rec.asset_type_as_string}.html', context)
 
 
+def update_ground_mask_atlases(configs: List[ViewConfig]):
+    """
+    (Re)builds the ground mask atlases that are missing or expired, all in one pass.
+    """
+    to_build = []
+    for config in configs:
+        _, is_valid = dyna_file_manager.query(["ground_mask_atlas"], config.slug + ".json")
+        if not is_valid:
+            to_build.append(config)
+
+    if len(to_build) > 0:
+        print(f"Building ground mask atlases: {', '.join(c.slug for c in to_build)}")
+        atlases = build_ground_mask_atlases(to_build, workers=0)
+        for config, atlas in atlases.items():
+            path, _ = dyna_file_manager.query(["ground_mask_atlas"], config.slug + ".json")
+            for file in atlas.save(os.path.dirname(path)):
+                dyna_file_manager.invalidate_cache(["ground_mask_atlas"], os.path.basename(file))
+
+
+@app.get("/download/ground_mask_atlas/{file_name}")
+async def ground_mask_atlas(file_name: str):
+    """
+    The ground mask atlas files (.webp, .json and .css) of a view config, see update_ground_mask_atlases(...)
+    """
+    path, is_valid = dyna_file_manager.query(["ground_mask_atlas"], file_name)
+    if not is_valid:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return FileResponse(path=path)
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 @app.get("/game/main")
-async def game_view(request: Request, session_id: Optional[str] = Cookie(default=None, alias="sessionID")):
-    session = SessionManager.get_active_session(session_id)
+async def game_view(request: Request, session_id: Optional[str] = Cookie(default=None, alias="sessionID"),
+                    server_render: bool = False):
+    session = await get_active_session(session_id)
 
     if session is None and os.path.isfile("dev_login.txt"):
-        with open("dev_login.txt", "rt") as f:
-            print("Using developer auto login: dev_login.txt")
-            lines = f.readlines()
-            un = lines[0]
-            pw = lines[1]
-            session_id = SessionManager.create_session(un, load_game=load_game)
-            session = SessionManager.get_active_session(session_id)
-            response = HTMLResponse("Developer auto login of user: " + un + ". Press refresh to continue.")
-            response.set_cookie(key="sessionID", value=session_id)
-            # return a simple response, that sets the session cookie.ground_render_list
-            return response
+        print("Using developer auto login: dev_login.txt")
+        lines = (await read_text(io_executor, "dev_login.txt")).splitlines(keepends=True)
+        un = lines[0]
+        pw = lines[1]
+        # loading the game parses the world, so it's done off the event loop
+        session_id = await render_executor.run(SessionManager.create_session, un, load_game)
+        session = await get_active_session(session_id)
+        response = HTMLResponse("Developer auto login of user: " + un + ". Press refresh to continue.")
+        response.set_cookie(key="sessionID", value=session_id)
+        # return a simple response, that sets the session cookie.ground_render_list
+        return response
 
     if session is None:
         return templates.TemplateResponse(f'world_view.html', dict(request=request, session=None))
@@ -368,61 +478,56 @@ async def game_view(request: Request, session_id: Optional[str] = Cookie(default
     current_map = session.game_state.current_map
     pack_name = game_state.pack.name
     pack = game_state.pack
-    # TODO: this loop is needlessly done every frame
-    map_lut = {lut.name: {i: pack[slug].idle_animation['class'] if slug is not None else None
-                          for i, slug in lut.items()}
-               for lut in current_map.luts}
-
-    # work out all the sprites needed to render the ground
-    ground_render_list = []
-    env_render_list = []
-    svp = default_svp_composer
-
-    for step_f in reversed(range(svp.view_dist)):
-        fov = svp.fov_table[step_f]
-        for step_r in range(-fov, fov+1):
-            tile = game_state.get_tile(step_f, step_r, None)
-            if tile is not None:
-                gnd_idx = tile["ground"]
-                gnd_class = map_lut["ground"][gnd_idx]
-                if gnd_class is not None:
-                    ground_render_list.append((step_f, step_r, gnd_class))
-
-                env_idx = tile["env"]
-                env_class = map_lut["env"][env_idx]
-                if env_class is not None:
-                    b, a, c, d = svp.get_tile_polygon(step_f, step_r)
-                    # print(a, b, c, d)
-                    # horizon = (svp.height * svp.horizon_screen_ratio)
-                    # bottom_pix = (a[1] + c[1]) / 2
-                    bottom_pix = max(a[1], b[1], c[1], d[1])
-                    bottom_per = bottom_pix / svp.height
-
-                    left_pix = min(a[0], b[0])
-                    left_per = left_pix / svp.width
-
-                    # TODO: this is only a simplified scale taken ath the base of the polygon.
-                    # scale = abs(b[0] - a[0]) / svp.width
-                    # scale = abs(b[0] - a[0]) / svp.width
-                    scale = svp.get_sprite_scale(step_f) * 1.3
-
-                    env_render_list.append((bottom_per, left_per, scale, env_class))
-
+    # css classes for the map's luts are cached per map, and the view offsets are cached per facing.
+    map_lut = get_css_class_luts(pack, current_map)
+    party = game_state.party
+    # a div per view slot, empty slots are hidden. Moves then update the slots in place, see: /game/ws
+    kernel = get_view_kernel(default_svp_composer, party.facing)
+    ground_slots, env_slots = build_view_slots(current_map, party.pos_x, party.pos_y, party.facing,
+                                               default_svp_composer, map_lut)
 
     context = dict(request=request,
                    pack=pack, pack_name=pack_name,
                    session=session, game_state=game_state,
                    current_map=current_map,
                    map_lut=map_lut,
-                   ground_render_list=ground_render_list,
-                   env_render_list=env_render_list)
+                   ground_mask_css=f"{default_view_config.slug}.css",
+                   server_render=server_render,
+                   mask_class_name=mask_class_name,
+                   ground_slots=[item + (c,) for item, c in zip(kernel.ground_items, ground_slots)],
+                   env_slots=[item + (c,) for item, c in zip(kernel.env_items, env_slots)])
 
     return templates.TemplateResponse(f'world_view.html', context)
 
+def get_frame_renderer(pack: ResourcePack) -> FrameRenderer:
+    if pack.name not in frame_renderers:
+        frame_renderers[pack.name] = FrameRenderer(default_svp_composer, lambda slug: load_idle_frame(pack[slug]),
+                                                   size=(960, 512))
+    return frame_renderers[pack.name]
+
+
+@app.get("/game/frame.jpg")
+@app.get("/game/frame.webp")  # the url_for('game_frame') route, as it is registered first
+async def game_frame(request: Request, session_id: Optional[str] = Cookie(default=None, alias="sessionID")):
+    """
+    The view, rendered on the server as a single image. For clients where compositing the view with css is too slow.
+    """
+    session = await get_active_session(session_id)
+    if session is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    game_state = session.game_state
+    party = game_state.party
+    fmt = "jpeg" if request.url.path.endswith(".jpg") else "webp"
+    data = await render_executor.run(get_frame_renderer(game_state.pack).get_frame, game_state.current_map,
+                                     party.pos_x, party.pos_y, party.facing, fmt)
+    return Response(content=data, media_type=f"image/{fmt}", headers={"Cache-Control": "no-store"})
+
+
 @app.post("/do_action", response_class=ORJSONResponse)
 async def do_action(request: Request,
                     session_id: Optional[str] = Cookie(default=None, alias="sessionID")):
-    session = SessionManager.get_active_session(session_id)
+    session = await get_active_session(session_id)
     if session is None:
         return ORJSONResponse({"message": "not logged in"}, status_code=status.HTTP_404_NOT_FOUND)
 
@@ -431,11 +536,73 @@ async def do_action(request: Request,
     action = GameAction[data.get("action").strip().upper()]
     print(f"Received action request: session={session_id}, action={action}")
 
-    game_state.attempt_to_take_action(action)
+    if game_state.attempt_to_take_action(action):
+        session.save_game()
 
     return ORJSONResponse({"message": "Move received"})
 
 
+def draw_ground_mask(view_config: ViewConfig, steps_fwd: int, steps_right: int, path: str):
+    img = view_config.make_composer().draw_mask(steps_fwd, steps_right)
+    # img.save(path)
+
+    # convert the greyscale image to an alpha channel, because a greyscale
+    # image mask does not seem to work on all browsers
+    img2 = Image.new("LA", img.size, (255, 255))
+    img2.putalpha(img)
+    # written then renamed, so another worker process never serves a half written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    img2.save(tmp_path, format=Image.registered_extensions()[os.path.splitext(path)[1].lower()])
+    os.replace(tmp_path, path)
+
+
+@app.websocket("/game/ws")
+async def game_ws(websocket: WebSocket, session_id: Optional[str] = Cookie(default=None, alias="sessionID")):
+    """
+    The game channel. The client sends actions, eg: {"action": "MOVE_FWD"}, and gets back only the view
+    slots that changed (see: ViewStream), rather than re-loading the page each move.
+    """
+    session = await get_active_session(session_id)
+    if session is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    game_state = session.game_state
+    view = ViewStream(default_svp_composer)
+
+    def view_update() -> dict:
+        party = game_state.party
+        return view.update(game_state.pack, game_state.current_map, party.pos_x, party.pos_y, party.facing)
+
+    try:
+        await websocket.send_json(view_update())
+        while True:
+            data = await websocket.receive_json()
+            if not isinstance(data, dict):
+                await websocket.send_json({"type": "error", "message": "Expected an object, eg: {\"action\": \"MOVE_FWD\"}"})
+                continue
+            try:
+                action = GameAction[str(data.get("action")).strip().upper()]
+            except KeyError:
+                await websocket.send_json({"type": "error", "message": f"Unknown action: {data.get('action')}"})
+                continue
+
+            if not session.is_open():
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return
+            session.ping()
+            why = game_state.attempt_to_take_action(action)
+            msg = view_update()
+            if why:
+                session.save_game()
+            else:
+                msg["message"] = str(why)
+            await websocket.send_json(msg)
+    except WebSocketDisconnect:
+        pass
+
+
 @app.get("/download/ground_mask/{size_x}/{size_y}/{steps_fwd}/{steps_right}")
 @app.get("/download/ground_mask/default/{steps_fwd}/{steps_right}")
 async def ground_mask(steps_fwd: int, steps_right: int,
@@ -462,19 +629,13 @@ async def ground_mask(steps_fwd: int, steps_right: int,
         print("==========================================================\n")
         print(f"=         Regenerating {file_name}\n")
         print("==========================================================\n")
-        svp_composer = SingleVanishingPointPainting([], [], size=(size_x, size_y),
-                                                    bird_eye_vs_worm_eye=bird_eye_vs_worm_eye, view_dist=view_dist,
-                                                    horizon_screen_ratio=horizon_screen_ratio,
-                                                    local_tile_ratio=local_tile_ratio)
-
-        img = svp_composer.draw_mask(steps_fwd, steps_right)
-        # img.save(path)
-
-        # convert the greyscale image to an alpha channel, because a greyscale
-        # image mask does not seem to work on all browsers
-        img2 = Image.new("LA", img.size, (255, 255))
-        img2.putalpha(img)
-        img2.save(path)
+        # note: the whole scene's masks are also available as one file, see update_ground_mask_atlases(...)
+        view_config = ViewConfig(size=(int(size_x), int(size_y)), view_dist=int(view_dist),
+                                 horizon_screen_ratio=float(horizon_screen_ratio),
+                                 local_tile_ratio=float(local_tile_ratio),
+                                 bird_eye_vs_worm_eye=float(bird_eye_vs_worm_eye))
+        # keyed by path, so concurrent requests for the same mask share one regeneration
+        await render_executor.run(draw_ground_mask, view_config, steps_fwd, steps_right, path, key=path)
         dyna_file_manager.invalidate_cache(["ground_mask", fmt], file_name)
 
     # done
@@ -19,7 +19,8 @@ from starlette.templating import Jinja2Templates
 
 from game_engine.i18n.languages import get_supported_languages
 from game_engine.session import SessionManager
-from web.user_db import get_user_by_name, verify_password, manager, create_user
+from helpers.bounded_executor import ExecutorBusyError
+from web.user_db import get_user_by_name_async, verify_password, manager, create_user_async
 
 
 user_router = APIRouter(
@@ -35,7 +36,7 @@ def show_cookie(response: Response, session_id: Optional[str] = Cookie(default=N
     if (session := SessionManager.get_active_session(session_id)) is not None:
         d["user_name"] = session.user_name
 
-    d["sessions"] = [str(s) for s in SessionManager._sessions]
+    d["sessions"] = [str(s) for s in SessionManager.sessions()]
 
     return d
 
@@ -52,7 +53,7 @@ def index(request: Request, session_id: Optional[str] = Cookie(default=None, ali
 
 
 @user_router.post('/login')
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Logs in the user provided by form_data.username and form_data.password.
     A session id is stored in a cookie.
@@ -63,25 +64,28 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     print("-                    In login form                       -")
     print("----------------------------------------------------------")
     print("----------------------------------------------------------")
-    user = get_user_by_name(form_data.username)
+    from web.chosm import load_game, render_executor
+    user = await get_user_by_name_async(form_data.username)
     if user is None:
         raise InvalidCredentialsException
 
     if not user.can_login():
         raise InvalidCredentialsException
 
-    if not verify_password(form_data.password, user.pw_hash):
+    # bcrypt is deliberately slow, and loading a game parses its world, so both are done off the event loop
+    if not await render_executor.run(verify_password, form_data.password, user.pw_hash):
         raise InvalidCredentialsException
 
     try:
-        from web.chosm import load_game
         print("\n-----------------------------")
         print("User logging in: user=" + user.username)
-        session_id = SessionManager.create_session(user.username, load_game=load_game)
-        # print("  - all sessions: " + ", ".join([str(s) for s in SessionManager._sessions]))
+        session_id = await render_executor.run(SessionManager.create_session, user.username, load_game)
+        # print("  - all sessions: " + ", ".join([str(s) for s in SessionManager.sessions()]))
         print(f"New Session id created : user={user.username}, session={session_id}")
         print("-----------------------------\n")
 
+    except ExecutorBusyError:
+        raise  # a 503, see: web.chosm.executor_busy_handler
     except Exception as e:
         traceback.print_exc()
         logging.error(f"Error logging in user: user={user.username}, error='{str(e)}'")
@@ -126,12 +130,13 @@ async def register(request: Request):
     pw = form_data["password"]
 
     try:
-        user = create_user(username, email, pw)
+        user = await create_user_async(username, email, pw)
         if user is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user data not valid")
 
 
-        session_id = SessionManager.create_session(user.username)
+        from web.chosm import load_game, render_executor
+        session_id = await render_executor.run(SessionManager.create_session, user.username, load_game)
         response = fastapi.responses.RedirectResponse('/', status_code=status.HTTP_302_FOUND)
         response.set_cookie(key="sessionID", value=session_id)
         return response
@@ -145,11 +150,11 @@ async def register(request: Request):
 
 
 @user_router.get('/{username}')
-def read_user(username, active_user=Depends(manager)):
+async def read_user(username, active_user=Depends(manager)):
     """
     Shows information about the user
     """
-    user = get_user_by_name(username)
+    user = await get_user_by_name_async(username)
 
     if user is None or (user.username != active_user.username):
         raise HTTPException("You shall not pass with out the secret code.")
@@ -1,3 +1,4 @@
+import asyncio
 import pathlib
 from typing import Callable, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
@@ -5,6 +6,7 @@ from datetime import datetime, timedelta
 import sqlalchemy
 from sqlalchemy import select
 from sqlalchemy import Table, Column, Integer, String, DateTime, Boolean
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base, Session
 from sqlalchemy.orm import sessionmaker
 
@@ -60,6 +62,10 @@ db_engine = sqlalchemy.create_engine('sqlite:///game_files/server_files/chosm.db
 Base.metadata.create_all(db_engine)
 ChosmDBSession = sessionmaker(bind=db_engine)
 
+# the server's handlers use the async engine (aiosqlite), so a query doesn't block the event loop.
+async_db_engine = create_async_engine('sqlite+aiosqlite:///game_files/server_files/chosm.db')
+AsyncChosmDBSession = async_sessionmaker(bind=async_db_engine, expire_on_commit=False)
+
 # ----------------------------------------------------------------------------------------------------------------------
 # Controller
 # ----------------------------------------------------------------------------------------------------------------------
@@ -78,7 +84,6 @@ def verify_password(plaintext: str, hashed: str):
     return bcrypt.checkpw(plaintext.encode(), hashed)
 
 
-@manager.user_loader()
 def get_user_by_name(name: str) -> Optional[User]:
     # with ChosmDBSession().begin() as db:
     with ChosmDBSession() as session:
@@ -86,6 +91,13 @@ def get_user_by_name(name: str) -> Optional[User]:
     return user
 
 
+@manager.user_loader()
+async def get_user_by_name_async(name: str) -> Optional[User]:
+    async with AsyncChosmDBSession() as session:
+        result = await session.execute(select(User).where(User.username == name))
+        return result.scalars().first()
+
+
 def create_user(name: str, email: str, password: str) -> User:
     hashed_pw = hash_password(password)
     with ChosmDBSession() as session:
@@ -97,6 +109,16 @@ def create_user(name: str, email: str, password: str) -> User:
     return None
 
 
+async def create_user_async(name: str, email: str, password: str) -> User:
+    # bcrypt is deliberately slow, so it's hashed off the event loop
+    hashed_pw = await asyncio.to_thread(hash_password, password)
+    async with AsyncChosmDBSession() as session:
+        user = User(username=name, email=email, pw_hash=hashed_pw)
+        print("new user: ", user)
+        session.add(user)
+        await session.commit()
+        return user
+
 
 def main():
     duckman = User(username="duckman",